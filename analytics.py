@@ -0,0 +1,397 @@
+"""
+AMIC MMS - Dashboard Analytics
+Aggregations behind the dashboards, cached per table version and filter
+"""
+
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from data_store import AppendTable
+from search import search_work_orders
+
+RECENT_COLUMNS = ['ID', 'Vehicle_Number', 'Workshop_Name', 'Work_Order_Status',
+                  'Malfunction_Date', 'Technician_Name']
+
+# Work-order columns page_dashboard() reads: recent orders, KPI counters and
+# the daily rollup. A read-only dashboard store loads only these.
+DASHBOARD_COLUMNS = {
+    'work_orders': RECENT_COLUMNS + ['Malfunction_Type', 'Vehicle_Type', 'MNG_Work_Order_Creation_Date',
+                                     'Work_Order_Completion_Date'],
+}
+
+# ============================================================================
+# FILTERS
+# ============================================================================
+
+def filter_work_orders(df_wo, df_workshop, region='All', workshop='All', status='All', system='All'):
+    """Apply the manager dashboard filters (a workshop overrides its region)"""
+    if workshop != 'All':
+        df_wo = df_wo[df_wo['Workshop_Name'] == workshop]
+    elif region != 'All':
+        workshops_in_region = df_workshop[df_workshop['Region'] == region]['Workshop_Name'].tolist()
+        df_wo = df_wo[df_wo['Workshop_Name'].isin(workshops_in_region)]
+
+    if status != 'All':
+        df_wo = df_wo[df_wo['Work_Order_Status'] == status]
+
+    if system != 'All':
+        df_wo = df_wo[df_wo['Malfunction_Type'] == system]
+
+    return df_wo
+
+def average_completion_days(df_wo):
+    """Mean days from WO creation to completion, or None when nothing is completed"""
+    completed = df_wo[df_wo['Work_Order_Status'] == 'Completed']
+    if completed.empty or not completed['Work_Order_Completion_Date'].notna().any():
+        return None
+    days = (completed['Work_Order_Completion_Date'] - completed['MNG_Work_Order_Creation_Date']).dt.days
+    return days.mean()
+
+# ============================================================================
+# INCREMENTAL KPI COUNTERS
+# ============================================================================
+
+COUNTER_DIMENSIONS = ['Workshop_Name', 'Work_Order_Status', 'Malfunction_Type', 'Region']
+
+class WorkOrderCounters:
+    """Running work-order counts per (Workshop_Name, Work_Order_Status, Malfunction_Type, Region)
+
+    Built with one groupby, then kept current from store writes, so KPI reads
+    cost O(number of keys) however many work orders exist.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+
+        df_workshop = store.table('workshop')
+        self._regions = {workshop: None if _missing(region) else region
+                         for workshop, region in zip(df_workshop['Workshop_Name'], df_workshop['Region'])}
+
+        df_wo = store.table('work_orders')
+        keys = df_wo[COUNTER_DIMENSIONS[:3]].assign(
+            Region=df_wo['Workshop_Name'].map(self._regions)
+        )
+        sizes = keys.groupby(COUNTER_DIMENSIONS, dropna=False, observed=True).size()
+        # Missing values as None, the same keys _key() builds from written rows
+        self._counts = Counter()
+        for key, n in sizes.items():
+            self._counts[tuple(None if _missing(value) else value for value in key)] += int(n)
+
+    def _move_workshops(self, rows, before):
+        """Re-key the counts after workshop rows changed, from the written rows alone
+
+        Reading work_orders here instead would count writes still queued
+        for this listener twice.
+        """
+        for row in before or []:
+            self._regions.pop(row.get('Workshop_Name'), None)
+        for row in rows:
+            self._regions[row.get('Workshop_Name')] = None if _missing(row.get('Region')) else row.get('Region')
+        counts = Counter()
+        for (workshop, status, system, _), n in self._counts.items():
+            counts[(workshop, status, system, self._regions.get(workshop))] += n
+        self._counts = counts
+
+    def _key(self, row):
+        workshop = row.get('Workshop_Name')
+        key = (workshop, row.get('Work_Order_Status'), row.get('Malfunction_Type'), self._regions.get(workshop))
+        return tuple(None if _missing(value) else value for value in key)
+
+    def on_change(self, name, op, rows, before):
+        if name == 'workshop':
+            with self._lock:
+                self._move_workshops(rows, before)
+            return
+        if name != 'work_orders':
+            return
+
+        with self._lock:
+            for row in before or []:
+                self._counts[self._key(row)] -= 1
+            for row in rows:
+                self._counts[self._key(row)] += 1
+
+    def counts(self, by, region='All', workshop='All', status='All', system='All'):
+        """Counts grouped by one dimension, largest first, under the dashboard filters"""
+        position = COUNTER_DIMENSIONS.index(by)
+        totals = Counter()
+
+        with self._lock:
+            for key, n in self._counts.items():
+                key_workshop, key_status, key_system, key_region = key
+                if workshop != 'All':
+                    if key_workshop != workshop:
+                        continue
+                elif region != 'All' and key_region != region:
+                    continue
+                if status != 'All' and key_status != status:
+                    continue
+                if system != 'All' and key_system != system:
+                    continue
+                if n:
+                    totals[key[position]] += n
+
+        return pd.Series(dict(totals.most_common()), name='count', dtype='int64')
+
+def work_order_counters(store):
+    """The store's incrementally maintained KPI counters"""
+    return store.maintained('work_order_counters', WorkOrderCounters)
+
+# ============================================================================
+# DAILY ROLLUP
+# ============================================================================
+
+ROLLUP_DIMENSIONS = ['Workshop_Name', 'Malfunction_Type', 'Vehicle_Type']
+
+def _missing(value):
+    return value is None or (not isinstance(value, str) and pd.isna(value))
+
+def _day(value):
+    return None if _missing(value) else pd.Timestamp(value).normalize()
+
+class DailyRollup:
+    """Work orders created and completed per (day, Workshop_Name, Malfunction_Type, Vehicle_Type)
+
+    Built with one groupby, then kept current from store writes: a write
+    moves the counts of the few days and dimension values its rows touch.
+    Trend queries read this table, sized by days x dimension values, and
+    never the work orders. Regions come from the workshop table at query
+    time, so moving a workshop needs no rebuild.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self.version = 0
+
+        df_wo = store.table('work_orders')
+        dims = df_wo[ROLLUP_DIMENSIONS]
+        completed = df_wo['Work_Order_Status'].eq('Completed')
+        events = pd.concat([
+            dims.assign(Date=df_wo['MNG_Work_Order_Creation_Date'].dt.normalize(), Created=1, Completed=0),
+            dims[completed].assign(Date=df_wo.loc[completed, 'Work_Order_Completion_Date'].dt.normalize(),
+                                   Created=0, Completed=1),
+        ])
+        rollup = (events.groupby(['Date'] + ROLLUP_DIMENSIONS, observed=True, dropna=False)[['Created', 'Completed']]
+                  .sum().reset_index())
+        rollup = rollup[rollup['Date'].notna()].reset_index(drop=True)
+
+        self._table = AppendTable(rollup)
+        # Same key shape as _events() builds from rows: Timestamp day, then values with None for missing
+        columns = [rollup['Date'].tolist()] + [
+            rollup[col].astype(object).where(rollup[col].notna(), None).tolist() for col in ROLLUP_DIMENSIONS
+        ]
+        keys = list(zip(*columns))
+        self._positions = dict(zip(keys, range(len(keys))))
+        self._counts = {key: [created, done] for key, created, done
+                        in zip(keys, rollup['Created'].tolist(), rollup['Completed'].tolist())}
+
+    def _events(self, row):
+        """[(key, 0 for created / 1 for completed)] that one work order row contributes"""
+        dims = tuple(None if _missing(row.get(col)) else row.get(col) for col in ROLLUP_DIMENSIONS)
+        events = []
+        created = _day(row.get('MNG_Work_Order_Creation_Date'))
+        if created is not None:
+            events.append(((created,) + dims, 0))
+        if row.get('Work_Order_Status') == 'Completed':
+            done = _day(row.get('Work_Order_Completion_Date'))
+            if done is not None:
+                events.append(((done,) + dims, 1))
+        return events
+
+    def _add(self, key, field, n):
+        pos = self._positions.get(key)
+        if pos is None:
+            pos = self._positions[key] = len(self._table)
+            self._counts[key] = [0, 0]
+            self._table.append([dict(zip(['Date'] + ROLLUP_DIMENSIONS, key), Created=0, Completed=0)])
+        counts = self._counts[key]
+        counts[field] += n
+        self._table.set([pos], {('Created', 'Completed')[field]: counts[field]})
+
+    def on_change(self, name, op, rows, before):
+        if name != 'work_orders':
+            return
+
+        old = [event for row in before or [] for event in self._events(row)]
+        new = [event for row in rows for event in self._events(row)]
+        if old == new:
+            # Comments, versions and other columns the rollup does not count
+            return
+        with self._lock:
+            for key, field in old:
+                self._add(key, field, -1)
+            for key, field in new:
+                self._add(key, field, 1)
+            self.version += 1
+
+    def frame(self):
+        """Copy of the rollup: Date, the dimensions, Created and Completed"""
+        with self._lock:
+            return self._table.frame().copy()
+
+def daily_rollup(store):
+    """The store's incrementally maintained daily work order rollup"""
+    return store.maintained('daily_rollup', DailyRollup)
+
+def work_order_trends(store, start, end, region='All', workshop='All', system='All', vehicle_type='All', freq='D'):
+    """Created, Completed and Backlog per day (or per freq period) from start to end, from the rollup only
+
+    Backlog is the number of work orders created and not yet completed at
+    the end of each period, so it counts history before start as well.
+    """
+    rollup = daily_rollup(store)
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    key = ('work_order_trends', rollup.version, store.version('workshop'),
+           (start, end, region, workshop, system, vehicle_type, freq))
+
+    def compute():
+        df = rollup.frame()
+        if workshop != 'All':
+            df = df[df['Workshop_Name'] == workshop]
+        elif region != 'All':
+            df_workshop = store.table('workshop')
+            df = df[df['Workshop_Name'].isin(df_workshop.loc[df_workshop['Region'] == region, 'Workshop_Name'])]
+        if system != 'All':
+            df = df[df['Malfunction_Type'] == system]
+        if vehicle_type != 'All':
+            df = df[df['Vehicle_Type'] == vehicle_type]
+
+        daily = df[df['Date'] <= end].groupby('Date')[['Created', 'Completed']].sum()
+        first = min(daily.index.min(), start) if len(daily) else start
+        daily = daily.reindex(pd.date_range(first, end, freq='D', name='Date'), fill_value=0)
+        daily['Backlog'] = (daily['Created'] - daily['Completed']).cumsum()
+        daily = daily.loc[start:]
+        if freq != 'D':
+            daily = daily.resample(freq).agg({'Created': 'sum', 'Completed': 'sum', 'Backlog': 'last'})
+        return daily.reset_index()
+
+    return store.cache.get_or_compute(key, compute)
+
+# ============================================================================
+# CACHED SUMMARIES
+# ============================================================================
+
+def recent_work_orders(store, workshop=None):
+    """First ten work orders (optionally for one workshop) for page_dashboard()"""
+
+    def compute(df_wo):
+        if workshop:
+            df_wo = df_wo[df_wo['Workshop_Name'] == workshop]
+        return df_wo[RECENT_COLUMNS].head(10)
+
+    return store.cached_query('recent_work_orders', ('work_orders',), (workshop,), compute)
+
+def work_order_list(store, employee_id=None, workshop=None, status='All', vehicle='All', search=''):
+    """Work orders for one technician or workshop under the list filters, with vehicle options"""
+
+    def compute(df_wo, df_malfunction):
+        if employee_id is not None:
+            df_wo = df_wo[df_wo['Employee_ID'] == employee_id]
+        if workshop:
+            df_wo = df_wo[df_wo['Workshop_Name'] == workshop]
+        vehicles = sorted(df_wo['Vehicle_Number'].dropna().unique().tolist())
+
+        if status != 'All':
+            df_wo = df_wo[df_wo['Work_Order_Status'] == status]
+        if vehicle != 'All':
+            df_wo = df_wo[df_wo['Vehicle_Number'] == vehicle]
+        if search.strip():
+            df_wo = df_wo[df_wo['ID'].isin(search_work_orders(store, search))]
+        return {'work_orders': df_wo, 'vehicles': vehicles}
+
+    # Search also matches malfunction text, so malfunction writes invalidate too
+    return store.cached_query('work_order_list', ('work_orders', 'malfunction'),
+                              (employee_id, workshop, status, vehicle, search.strip()), compute)
+
+def manager_summary(store, region='All', workshop='All', status='All', system='All'):
+    """Filtered orders, completion time and top malfunction codes for page_manager_dashboard()"""
+
+    def compute(df_wo, df_malfunction, df_workshop):
+        df_wo = filter_work_orders(df_wo, df_workshop, region, workshop, status, system)
+        mal_df = df_malfunction[df_malfunction['Work_Order_ID'].isin(df_wo['ID'])]
+        return {
+            'work_orders': df_wo,
+            'avg_days': average_completion_days(df_wo),
+            # Categorical value_counts lists unused codes too; keep only real ones
+            'top_failures': mal_df['Malfunction_Code'].value_counts().loc[lambda s: s > 0].head(5),
+        }
+
+    return store.cached_query('manager_summary', ('work_orders', 'malfunction', 'workshop'),
+                              (region, workshop, status, system), compute)
+
+# ============================================================================
+# MATERIALIZED VIEWS
+# ============================================================================
+
+SUPPLY_REQUEST_VIEW_COLUMNS = ['ID', 'Work_Order_ID', 'Vehicle_Number', 'Workshop_Name', 'Part_ID',
+                               'Part_Number', 'English_Description', 'Quantity_Requested', 'Status']
+
+# Source columns copied into the view, per joined table
+_WORK_ORDER_FIELDS = ['Vehicle_Number', 'Workshop_Name']
+_PART_FIELDS = ['Part_Number', 'English_Description']
+
+class SupplyRequestView:
+    """Supply requests joined with their work order and part, kept current from store writes
+
+    Built with one pair of merges; afterwards an insert or update on
+    supply_request, work_orders or part only touches the affected view rows,
+    found through hash indexes on ID, Work_Order_ID and Part_ID.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._store = store
+
+        df_sr = store.table('supply_request')
+        df_view = df_sr.merge(
+            store.table('work_orders')[['ID'] + _WORK_ORDER_FIELDS].rename(columns={'ID': 'Work_Order_ID'}),
+            on='Work_Order_ID',
+            how='left'
+        ).merge(
+            store.table('part')[['ID'] + _PART_FIELDS].rename(columns={'ID': 'Part_ID'}),
+            on='Part_ID',
+            how='left'
+        )
+        self._table = AppendTable(df_view[SUPPLY_REQUEST_VIEW_COLUMNS], indexes=('ID', 'Work_Order_ID', 'Part_ID'))
+
+    def _joined(self, sr):
+        """View row for one supply request (dict), looking up its work order and part"""
+        wo = self._store.get('work_orders', sr.get('Work_Order_ID')) or {}
+        part = self._store.get('part', sr.get('Part_ID')) or {}
+        row = {col: sr.get(col) for col in SUPPLY_REQUEST_VIEW_COLUMNS if col in sr}
+        row.update({col: wo.get(col) for col in _WORK_ORDER_FIELDS})
+        row.update({col: part.get(col) for col in _PART_FIELDS})
+        return row
+
+    def _refresh(self, key_col, rows, before, fields):
+        """Copy source fields onto every view row that references a changed source row"""
+        for row, old in zip(rows, before or [{}] * len(rows)):
+            if old and all(row.get(col) == old.get(col) for col in fields):
+                continue
+            positions = self._table.positions(key_col, row['ID'])
+            if len(positions):
+                self._table.set(positions, {col: row.get(col) for col in fields})
+
+    def on_change(self, name, op, rows, before):
+        with self._lock:
+            if name == 'supply_request':
+                if op == 'insert':
+                    self._table.append([self._joined(row) for row in rows])
+                else:
+                    for row in rows:
+                        self._table.set(self._table.positions('ID', row['ID']), self._joined(row))
+            elif name == 'work_orders':
+                self._refresh('Work_Order_ID', rows, before, _WORK_ORDER_FIELDS)
+            elif name == 'part':
+                self._refresh('Part_ID', rows, before, _PART_FIELDS)
+
+    def frame(self):
+        """The joined view (shares memory with the view, never mutates it)"""
+        with self._lock:
+            return self._table.frame().copy(deep=False)
+
+def supply_request_view(store):
+    """The store's incrementally maintained supply request x work order x part view"""
+    return store.maintained('supply_request_view', SupplyRequestView)
@@ -0,0 +1,380 @@
+"""
+AMIC MMS - HTTP API
+Headless JSON endpoints over the shared store and write services, for telematics and other systems
+
+Run alongside the Streamlit app against the same database:
+
+    AMIC_DATABASE_URL=... python api.py --port 8000
+
+Both processes validate and write through services.py; IDs come from the
+database and each process picks up the other's writes within
+$AMIC_SYNC_SECONDS.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from analytics import work_order_list
+from catalogue_index import LEVELS, CatalogueIndex
+from data_store import ConflictError, get_store
+from models import MalfunctionRecord, WorkOrderRecord
+from services import ValidationFailed, create_work_orders, insert_records, update_records, update_work_order
+
+# Largest batch accepted by one request
+MAX_BATCH = 5000
+
+# Largest page of a work order listing
+MAX_PAGE = 1000
+
+# Fields of a flat work order payload that belong to its malfunction
+MALFUNCTION_FIELDS = set(MalfunctionRecord.model_fields) - set(WorkOrderRecord.model_fields)
+
+# ============================================================================
+# JSON
+# ============================================================================
+
+class ApiError(Exception):
+    """An error answered with its HTTP status and message"""
+
+    def __init__(self, status, message):
+        self.status = status
+        super().__init__(message)
+
+def _json_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat() if value == value.normalize() else value.isoformat()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _record(row):
+    """A store row with missing values as None"""
+    return {col: None if value is not None and not isinstance(value, str) and pd.isna(value) else value
+            for col, value in row.items()}
+
+def _records(df):
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def _error_list(errors):
+    return [{'index': position, 'field': field, 'message': message}
+            for position, messages in sorted(errors.items()) for field, message in messages]
+
+class ApiResponse(JSONResponse):
+    def render(self, content):
+        return json.dumps(content, default=_json_value, ensure_ascii=False, separators=(',', ':')).encode()
+
+# ============================================================================
+# REQUEST HANDLING
+# ============================================================================
+
+def endpoint(handler):
+    """Route handler that runs handler(request, body) -> (status, payload) in the thread pool
+
+    Store access blocks (locks, database writes), so it stays off the event
+    loop; the loop only parses and serializes JSON.
+    """
+    async def run(request):
+        token = os.environ.get('AMIC_API_TOKEN')
+        if token and request.headers.get('authorization') != f'Bearer {token}':
+            return ApiResponse({'error': 'Missing or invalid API token'}, 401)
+
+        body = None
+        if request.method in ('POST', 'PATCH'):
+            try:
+                body = await request.json()
+            except ValueError:
+                return ApiResponse({'error': 'Request body is not valid JSON'}, 400)
+
+        try:
+            status, payload = await run_in_threadpool(handler, request, body)
+        except ValidationFailed as e:
+            return ApiResponse({'errors': _error_list(e.errors)}, 422)
+        except ConflictError as e:
+            return ApiResponse({'error': 'Changed by someone else since it was read', 'conflicts': e.keys}, 409)
+        except ApiError as e:
+            return ApiResponse({'error': str(e)}, e.status)
+        return ApiResponse(payload, status)
+
+    return run
+
+def _path_id(request):
+    try:
+        return int(request.path_params['id'])
+    except ValueError:
+        raise ApiError(404, 'Not found')
+
+def _query_int(request, name, default, maximum=None):
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    if value < 0:
+        raise ApiError(400, f"{name} must not be negative")
+    return min(value, maximum) if maximum else value
+
+def _object(body):
+    if not isinstance(body, dict):
+        raise ApiError(400, 'Expected a JSON object')
+    return body
+
+def _batch(body):
+    """Items of a batch body: a JSON list, or an object with an 'items' list"""
+    items = body.get('items') if isinstance(body, dict) else body
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ApiError(400, "Expected a list of objects (or {'items': [...]})")
+    if len(items) > MAX_BATCH:
+        raise ApiError(413, f"At most {MAX_BATCH} items per request")
+    return items
+
+def _atomic(request):
+    return request.query_params.get('atomic', '').lower() in ('1', 'true', 'yes')
+
+def _split_work_order(payload):
+    """(work order, malfunction) from one flat work order object"""
+    work_order = {field: value for field, value in payload.items() if field not in MALFUNCTION_FIELDS}
+    malfunction = {field: value for field, value in payload.items() if field in MALFUNCTION_FIELDS}
+    return work_order, malfunction
+
+def _audit(store, action, name, ids):
+    store.append('audit_log', {
+        'ID': store.next_id('audit_log'),
+        'Timestamp': datetime.now(),
+        'Employee_ID': None,
+        'Action': action,
+        'Table_Name': name,
+        'Record_Count': len(ids),
+        'Details': json.dumps({'ids': [int(i) for i in ids], 'source': 'api'}),
+    })
+
+def _synced_store():
+    """The shared store, caught up with writes from other processes before a write"""
+    store = get_store()
+    store.sync()
+    return store
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+@endpoint
+def health(request, body):
+    store = get_store()
+    return 200, {'status': 'ok', 'work_orders': len(store.table('work_orders'))}
+
+@endpoint
+def catalogue_options(request, body):
+    """Choices for the next catalogue level, or the entry once all four levels are given"""
+    params = request.query_params
+    path = []
+    for level in LEVELS:
+        value = params.get(level.lower())
+        if not value:
+            break
+        path.append(value)
+
+    index = get_store().derived('catalogue_index', ('failure_catalogue',), CatalogueIndex)
+    if len(path) == len(LEVELS):
+        entry = index.details(*path)
+        if entry is None:
+            raise ApiError(404, 'No catalogue entry for that path')
+        return 200, _record(entry)
+    return 200, {'level': LEVELS[len(path)], 'options': index.options(*path)}
+
+@endpoint
+def catalogue_entry(request, body):
+    entry = get_store().get('failure_catalogue', request.path_params['code'], key_col='Malfunction_Code')
+    if entry is None:
+        raise ApiError(404, 'No catalogue entry with that Malfunction_Code')
+    return 200, _record(entry)
+
+@endpoint
+def list_work_orders(request, body):
+    params = request.query_params
+    employee_id = _query_int(request, 'employee_id', 0) or None
+    limit = _query_int(request, 'limit', 100, MAX_PAGE)
+    offset = _query_int(request, 'offset', 0)
+
+    df_wo = work_order_list(
+        get_store(),
+        employee_id=employee_id,
+        workshop=params.get('workshop') or None,
+        status=params.get('status') or 'All',
+        vehicle=params.get('vehicle') or 'All',
+        search=params.get('search', ''),
+    )['work_orders']
+    return 200, {'total': len(df_wo), 'items': _records(df_wo.iloc[offset:offset + limit])}
+
+@endpoint
+def get_work_order(request, body):
+    store = get_store()
+    wo_id = _path_id(request)
+    wo = store.get('work_orders', wo_id)
+    if wo is None:
+        raise ApiError(404, f"No work order with ID {wo_id}")
+    df_mal = store.table('malfunction')
+    return 200, dict(_record(wo), malfunctions=_records(df_mal[df_mal['Work_Order_ID'] == wo_id]))
+
+@endpoint
+def create_work_order(request, body):
+    store = _synced_store()
+    created, _ = create_work_orders(store, [_split_work_order(_object(body))], all_or_nothing=True)
+    return 201, _record(created[0])
+
+@endpoint
+def create_work_order_batch(request, body):
+    items = _batch(body)
+    store = _synced_store()
+    with store.locked('work_orders', 'malfunction', 'audit_log'):
+        created, errors = create_work_orders(store, [_split_work_order(item) for item in items],
+                                             all_or_nothing=_atomic(request))
+        if created:
+            _audit(store, 'api_create', 'work_orders', [wo['ID'] for wo in created.values()])
+    return 200, {
+        'created': [{'index': i, 'ID': wo['ID'], 'AIC_Work_Order_Number': wo['AIC_Work_Order_Number']}
+                    for i, wo in sorted(created.items())],
+        'errors': _error_list(errors),
+    }
+
+def _expected_version(changes):
+    """Pop the Row_Version a client read (sent to make the update compare-and-swap)"""
+    version = changes.pop('Row_Version', None)
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        raise ApiError(400, 'Row_Version must be an integer')
+    return version
+
+@endpoint
+def update_work_order_endpoint(request, body):
+    """Update one work order; include the Row_Version you read to fail with 409 if it changed since"""
+    store = _synced_store()
+    wo_id = _path_id(request)
+    if store.get('work_orders', wo_id) is None:
+        raise ApiError(404, f"No work order with ID {wo_id}")
+    changes = dict(_object(body))
+    version = _expected_version(changes)
+    return 200, _record(update_work_order(store, wo_id, changes, expected_version=version))
+
+def _update_batch(request, body, name):
+    """Apply [{'ID': ..., field: value}] as one write; the index of an error is the ID
+
+    Items that carry a Row_Version are only applied if the row still has
+    it; any conflict fails the whole batch with 409.
+    """
+    items = _batch(body)
+    changes = {}
+    expected = {}
+    for item in items:
+        item = dict(item)
+        key = item.pop('ID', None)
+        if not isinstance(key, int) or isinstance(key, bool):
+            raise ApiError(400, 'Every item needs an integer ID')
+        version = _expected_version(item)
+        if version is not None:
+            expected[key] = version
+        changes[key] = item
+    store = _synced_store()
+    with store.locked(name, 'audit_log'):
+        applied, errors = update_records(store, name, changes, all_or_nothing=_atomic(request),
+                                         expected_versions=expected)
+        if applied:
+            _audit(store, 'api_update', name, list(applied))
+    return 200, {'updated': sorted(applied), 'errors': _error_list(errors)}
+
+@endpoint
+def update_work_order_batch(request, body):
+    return _update_batch(request, body, 'work_orders')
+
+def _create_one(name, body):
+    store = _synced_store()
+    created, _ = insert_records(store, name, [_object(body)], all_or_nothing=True)
+    return 201, _record(store.get(name, created[0]))
+
+def _create_batch(request, body, name):
+    items = _batch(body)
+    store = _synced_store()
+    with store.locked(name, 'audit_log'):
+        created, errors = insert_records(store, name, items, all_or_nothing=_atomic(request))
+        if created:
+            _audit(store, 'api_create', name, list(created.values()))
+    return 200, {
+        'created': [{'index': i, 'ID': new_id} for i, new_id in sorted(created.items())],
+        'errors': _error_list(errors),
+    }
+
+@endpoint
+def create_supply_request(request, body):
+    return _create_one('supply_request', body)
+
+@endpoint
+def create_supply_request_batch(request, body):
+    return _create_batch(request, body, 'supply_request')
+
+@endpoint
+def update_supply_request(request, body):
+    store = _synced_store()
+    sr_id = _path_id(request)
+    if store.get('supply_request', sr_id) is None:
+        raise ApiError(404, f"No supply request with ID {sr_id}")
+    update_records(store, 'supply_request', {sr_id: _object(body)})
+    return 200, _record(store.get('supply_request', sr_id))
+
+@endpoint
+def create_purchase_request(request, body):
+    return _create_one('purchase_request', body)
+
+@endpoint
+def create_purchase_request_batch(request, body):
+    return _create_batch(request, body, 'purchase_request')
+
+# ============================================================================
+# APPLICATION
+# ============================================================================
+
+routes = [
+    Route('/health', health),
+    Route('/catalogue', catalogue_options),
+    Route('/catalogue/{code}', catalogue_entry),
+    Route('/work-orders', list_work_orders, methods=['GET']),
+    Route('/work-orders', create_work_order, methods=['POST']),
+    Route('/work-orders', update_work_order_batch, methods=['PATCH']),
+    Route('/work-orders/batch', create_work_order_batch, methods=['POST']),
+    Route('/work-orders/{id}', get_work_order, methods=['GET']),
+    Route('/work-orders/{id}', update_work_order_endpoint, methods=['PATCH']),
+    Route('/supply-requests', create_supply_request, methods=['POST']),
+    Route('/supply-requests/batch', create_supply_request_batch, methods=['POST']),
+    Route('/supply-requests/{id}', update_supply_request, methods=['PATCH']),
+    Route('/purchase-requests', create_purchase_request, methods=['POST']),
+    Route('/purchase-requests/batch', create_purchase_request_batch, methods=['POST']),
+]
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Load (or seed) the store before the first request instead of during it
+    await run_in_threadpool(get_store)
+    yield
+
+app = Starlette(routes=routes, lifespan=lifespan)
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Serve the AMIC MMS HTTP API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    # One worker: the store lives in this process's memory
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
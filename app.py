@@ -3,11 +3,29 @@ AMIC Maintenance Management System (MMS) - Phase 1 Work Order Module
 Complete Demo Application - ERD Compliant with Fixed Dropdown Visibility
 """
 
+import json
+import altair as alt
 import streamlit as st
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-import hashlib
+
+from analytics import (
+    manager_summary, recent_work_orders, supply_request_view, work_order_counters, work_order_list,
+    work_order_trends,
+)
+from catalogue_index import CatalogueIndex
+from data_store import ConflictError, get_store
+from export import FORMATS, export_malfunctions, export_work_orders
+from importer import apply_import, plan_import
+from procurement import part_shortages
+from reliability import REPEAT_WINDOW_DAYS, reliability_report
+from profiling import profiler, span, start_metrics_server, timed
+from schema import SUPPLY_REQUEST_STATUSES, WORK_ORDER_STATUSES
+from search import search_work_orders
+from services import (
+    ValidationFailed, create_purchase_request, create_work_order, format_errors, insert_records,
+    update_records, update_work_order,
+)
 
 # ============================================================================
 # PAGE CONFIGURATION
@@ -181,374 +199,18 @@ h1, h2, h3, h4, h5, h6, p, span, div, label {
 # DATA INITIALIZATION
 # ============================================================================
 
-def hash_password(password):
-    """Simple password hashing"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
+@timed('init')
 def init_data():
-    """Initialize all data tables in session state"""
+    """Attach this session to the shared process-wide data store"""
     
     if 'data_initialized' in st.session_state and st.session_state.data_initialized:
         return
     
-    # ========================================================================
-    # REFERENCE TABLES
-    # ========================================================================
-    
-    # Department
-    st.session_state.df_department = pd.DataFrame({
-        'Department_Code': ['TECH', 'INV', 'PROC', 'OPS', 'ADMIN'],
-        'Department_Name': ['Technical Services', 'Inventory Management', 'Procurement', 'Operations', 'Administration'],
-        'Department_Supervisor': ['Ahmed Al-Rashid', 'Fatima Al-Qasim', 'Mohammed Al-Harbi', 'Khalid Al-Mansour', 'Sara Al-Fahad']
-    })
-    
-    # Region (just region name as PK per ERD)
-    st.session_state.df_region = pd.DataFrame({
-        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern']
-    })
-    
-    # Unit
-    st.session_state.df_unit = pd.DataFrame({
-        'Unit_Name': ['Unit 101', 'Unit 102', 'Unit 103', 'Unit 104', 'Unit 105'],
-        'Workshop_Name': ['Workshop Alpha', 'Workshop Beta', 'Workshop Gamma', 'Workshop Delta', 'Workshop Epsilon'],
-        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern']
-    })
-    
-    # Workshop
-    st.session_state.df_workshop = pd.DataFrame({
-        'Workshop_Name': ['Workshop Alpha', 'Workshop Beta', 'Workshop Gamma', 'Workshop Delta', 'Workshop Epsilon'],
-        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern'],
-        'Unit_Name': ['Unit 101', 'Unit 102', 'Unit 103', 'Unit 104', 'Unit 105']
-    })
-    
-    # Battalion
-    st.session_state.df_battalion = pd.DataFrame({
-        'Battalion_Name': ['Battalion 1A', 'Battalion 1B', 'Battalion 2A', 'Battalion 2B', 'Battalion 3A'],
-        'Unit_Name': ['Unit 101', 'Unit 101', 'Unit 102', 'Unit 102', 'Unit 103'],
-        'Vehicle_Number': ['VEH-001', 'VEH-002', 'VEH-003', 'VEH-004', 'VEH-005']
-    })
+    # Every session reads the same tables; nothing is copied per session
+    store = get_store()
     
-    # ========================================================================
-    # USERS (Main User table)
-    # ========================================================================
-    
-    st.session_state.df_user = pd.DataFrame({
-        'Employee_ID': [1, 2, 3, 4, 5, 6, 7, 8],
-        'Department_Code': ['TECH', 'TECH', 'TECH', 'INV', 'PROC', 'OPS', 'OPS', 'ADMIN'],
-        'Employee_First_Name': ['Ali', 'Omar', 'Yousef', 'Layla', 'Hassan', 'Nora', 'Tariq', 'Admin'],
-        'Employee_Last_Name': ['Al-Saud', 'Al-Harbi', 'Al-Qahtani', 'Al-Otaibi', 'Al-Shammari', 'Al-Dosari', 'Al-Mutairi', 'User'],
-        'Job_Title': ['Technician', 'Supervisor', 'Technician', 'Inventory Specialist', 'Procurement Officer', 'Manager', 'Supervisor', 'System Admin'],
-        'Resource_ID': ['RES001', 'RES002', 'RES003', 'RES004', 'RES005', 'RES006', 'RES007', 'RES008']
-    })
-    
-    # ========================================================================
-    # ROLE-SPECIFIC USER TABLES (per ERD)
-    # ========================================================================
-    
-    # TechnicalUser
-    st.session_state.df_technical_user = pd.DataFrame({
-        'ID': [1, 2],
-        'Employee_ID': [1, 3],  # Ali and Yousef
-        'Username': ['ali.tech', 'yousef.tech'],
-        'Password': [hash_password('tech123'), hash_password('tech123')],
-        'Workshop_Name': ['Workshop Alpha', 'Workshop Beta']
-    })
-    
-    # InventoryUser
-    st.session_state.df_inventory_user = pd.DataFrame({
-        'ID': [1],
-        'Employee_ID': [4],  # Layla
-        'Username': ['layla.inv'],
-        'Password': [hash_password('inv123')]
-    })
-    
-    # ProcurementUser
-    st.session_state.df_procurement_user = pd.DataFrame({
-        'ID': [1],
-        'Employee_ID': [5],  # Hassan
-        'Username': ['hassan.proc'],
-        'Password': [hash_password('proc123')]
-    })
-    
-    # For demo purposes, add supervisor, manager, and admin (not in ERD but needed for app)
-    st.session_state.df_other_users = pd.DataFrame({
-        'ID': [1, 2, 3],
-        'Employee_ID': [2, 6, 8],  # Omar (Supervisor), Nora (Manager), Admin
-        'Username': ['omar.super', 'nora.mgr', 'admin'],
-        'Password': [hash_password('super123'), hash_password('mgr123'), hash_password('admin123')],
-        'Role': ['Supervisor', 'Manager', 'Admin'],
-        'Workshop_Name': ['Workshop Alpha', None, None]
-    })
-    
-    # ========================================================================
-    # VEHICLES
-    # ========================================================================
-    
-    st.session_state.df_vehicle = pd.DataFrame({
-        'Vehicle_Number': ['VEH-001', 'VEH-002', 'VEH-003', 'VEH-004', 'VEH-005', 
-                          'VEH-006', 'VEH-007', 'VEH-008', 'VEH-009', 'VEH-010'],
-        'Unit_Name': ['Unit 101', 'Unit 101', 'Unit 102', 'Unit 102', 'Unit 103', 
-                     'Unit 103', 'Unit 104', 'Unit 104', 'Unit 105', 'Unit 105'],
-        'Battalion_Name': ['Battalion 1A', 'Battalion 1B', 'Battalion 2A', 'Battalion 2B', 'Battalion 3A',
-                          'Battalion 1A', 'Battalion 2A', 'Battalion 2B', 'Battalion 3A', 'Battalion 1B'],
-        'Vehicle_Type': ['MRAP', 'APC', 'Transport', 'MRAP', 'APC', 
-                        'Transport', 'MRAP', 'APC', 'Transport', 'MRAP'],
-        'Vehicle_Brand': ['Oshkosh', 'BAE Systems', 'Mercedes', 'Oshkosh', 'BAE Systems',
-                         'Mercedes', 'Oshkosh', 'BAE Systems', 'Mercedes', 'Oshkosh'],
-        'Vehicle_Chassis_Number': [f'CHAS{i:06d}' for i in range(1, 11)]
-    })
-    
-    # ========================================================================
-    # FAILURE CATALOGUE
-    # ========================================================================
-    
-    st.session_state.df_failure_catalogue = pd.DataFrame({
-        'System': [
-            'HVAC', 'HVAC', 'HVAC', 'HVAC', 'HVAC',
-            'Engine', 'Engine', 'Engine', 'Engine', 'Engine',
-            'Brakes', 'Brakes', 'Brakes', 'Brakes',
-            'Suspension', 'Suspension', 'Suspension',
-            'Electrical', 'Electrical', 'Electrical'
-        ],
-        'Subsystem': [
-            'Air Conditioning', 'Air Conditioning', 'Air Conditioning', 'Heating', 'Heating',
-            'Fuel System', 'Fuel System', 'Ignition', 'Ignition', 'Cooling',
-            'Hydraulic', 'Hydraulic', 'Friction', 'Friction',
-            'Front', 'Front', 'Rear',
-            'Battery', 'Charging', 'Charging'
-        ],
-        'Component': [
-            'Compressor', 'Condenser', 'Blower Motor', 'Heater Core', 'Heater Core',
-            'Fuel Pump', 'Fuel Injectors', 'Spark Plugs', 'Ignition Coils', 'Radiator',
-            'Master Cylinder', 'Brake Lines', 'Brake Pads', 'Rotors',
-            'Struts', 'Control Arms', 'Shock Absorbers',
-            '12V Battery', 'Alternator', 'Alternator'
-        ],
-        'Failure_Mode': [
-            'Mechanical seizure', 'Leak at tubes', 'Motor burnt', 'Core leak', 'Blockage',
-            'Pump failure', 'Injector clogged', 'Fouled plugs', 'Coil failure', 'Radiator leak',
-            'Internal leak', 'Line rupture', 'Worn pads', 'Warped rotor',
-            'Leaking strut', 'Worn bushings', 'Shock failure',
-            'Dead battery', 'No charge', 'Noisy bearing'
-        ],
-        'Malfunction_Code': [
-            'HVAC-AC-001', 'HVAC-AC-010', 'HVAC-AC-020', 'HVAC-HT-001', 'HVAC-HT-002',
-            'ENG-FUEL-001', 'ENG-FUEL-010', 'ENG-IGN-001', 'ENG-IGN-010', 'ENG-COOL-001',
-            'BRK-HYD-001', 'BRK-HYD-010', 'BRK-FRIC-001', 'BRK-FRIC-010',
-            'SUSP-FRT-001', 'SUSP-FRT-010', 'SUSP-REAR-001',
-            'ELEC-BAT-001', 'ELEC-CHG-001', 'ELEC-CHG-002'
-        ],
-        'Cause_Code': [
-            'HVAC-AC-C001', 'HVAC-AC-C010', 'HVAC-AC-C020', 'HVAC-HT-C001', 'HVAC-HT-C002',
-            'ENG-FUEL-C001', 'ENG-FUEL-C010', 'ENG-IGN-C001', 'ENG-IGN-C010', 'ENG-COOL-C001',
-            'BRK-HYD-C001', 'BRK-HYD-C010', 'BRK-FRIC-C001', 'BRK-FRIC-C010',
-            'SUSP-FRT-C001', 'SUSP-FRT-C010', 'SUSP-REAR-C001',
-            'ELEC-BAT-C001', 'ELEC-CHG-C001', 'ELEC-CHG-C002'
-        ],
-        'Resolution_Code': [
-            'HVAC-AC-R001', 'HVAC-AC-R010', 'HVAC-AC-R020', 'HVAC-HT-R001', 'HVAC-HT-R002',
-            'ENG-FUEL-R001', 'ENG-FUEL-R010', 'ENG-IGN-R001', 'ENG-IGN-R010', 'ENG-COOL-R001',
-            'BRK-HYD-R001', 'BRK-HYD-R010', 'BRK-FRIC-R001', 'BRK-FRIC-R010',
-            'SUSP-FRT-R001', 'SUSP-FRT-R010', 'SUSP-REAR-R001',
-            'ELEC-BAT-R001', 'ELEC-CHG-R001', 'ELEC-CHG-R002'
-        ],
-        'Resolution_Description_English': [
-            'Replace compressor; Replace clutch; Flush circuit; Replace filter/drier; Vacuum & recharge',
-            'Replace condenser; Clean fins; Leak test; Vacuum & recharge',
-            'Replace blower motor; Inspect resistor; Verify airflow',
-            'Replace heater core; Flush circuit; Bleed system',
-            'Flush heater core; Check coolant flow; Replace if needed',
-            'Replace fuel pump; Check electrical; Verify fuel quality',
-            'Clean injectors; Replace if needed; Check fuel quality',
-            'Replace spark plugs; Check gap; Verify ignition timing',
-            'Replace ignition coil; Check connections; Test resistance',
-            'Replace radiator; Pressure test; Check coolant level',
-            'Replace master cylinder; Bleed brake system',
-            'Replace brake line; Bleed system; Pressure test',
-            'Replace brake pads; Resurface rotors; Lubricate slides',
-            'Replace or resurface rotor; Replace pads',
-            'Replace strut assembly; Perform alignment',
-            'Replace control arm bushings; Perform alignment',
-            'Replace shock absorbers; Check mounting points',
-            'Test battery; Replace if failed; Check charging system',
-            'Replace alternator; Check belt; Test output',
-            'Replace alternator; Check belt tension'
-        ],
-        'Resolution_Description_Arabic': [
-            'استبدال الضاغط؛ استبدال القابض؛ تنظيف الدائرة؛ استبدال الفلتر؛ شفط وإعادة شحن',
-            'استبدال المكثف؛ تنظيف الزعانف؛ اختبار التسرب؛ شفط وإعادة شحن',
-            'استبدال محرك النفخ؛ فحص المقاومة؛ التحقق من تدفق الهواء',
-            'استبدال قلب السخان؛ تنظيف الدائرة؛ تهوية النظام',
-            'تنظيف قلب السخان؛ فحص تدفق المبرد؛ استبدال إذا لزم الأمر',
-            'استبدال مضخة الوقود؛ فحص الكهرباء؛ التحقق من جودة الوقود',
-            'تنظيف الحاقنات؛ استبدال إذا لزم الأمر؛ فحص جودة الوقود',
-            'استبدال شمعات الإشعال؛ فحص الفجوة؛ التحقق من توقيت الإشعال',
-            'استبدال ملف الإشعال؛ فحص التوصيلات؛ اختبار المقاومة',
-            'استبدال الرادياتير؛ اختبار الضغط؛ فحص مستوى المبرد',
-            'استبدال الأسطوانة الرئيسية؛ تهوية نظام الفرامل',
-            'استبدال خط الفرامل؛ تهوية النظام؛ اختبار الضغط',
-            'استبدال فحمات الفرامل؛ تجديد الأقراص؛ تشحيم المنزلقات',
-            'استبدال أو تجديد القرص؛ استبدال الفحمات',
-            'استبدال مجموعة الدعامة؛ إجراء محاذاة',
-            'استبدال وسائد ذراع التحكم؛ إجراء محاذاة',
-            'استبدال ماصات الصدمات؛ فحص نقاط التثبيت',
-            'اختبار البطارية؛ استبدال إذا فشلت؛ فحص نظام الشحن',
-            'استبدال المولد؛ فحص الحزام؛ اختبار الإخراج',
-            'استبدال المولد؛ فحص شد الحزام'
-        ],
-        'Cause_Description_English': [
-            'Compressor mechanical seizure', 'Condenser tube leak', 'Blower motor electrical failure',
-            'Heater core leak', 'Heater core blockage', 'Fuel pump mechanical failure',
-            'Fuel injector clogged', 'Spark plugs fouled', 'Ignition coil failure',
-            'Radiator leak', 'Master cylinder internal leak', 'Brake line rupture',
-            'Brake pads worn', 'Rotor warped', 'Strut leaking', 'Control arm bushings worn',
-            'Shock absorber failure', 'Battery dead', 'Alternator not charging', 'Alternator bearing noise'
-        ],
-        'Cause_Description_Arabic': [
-            'انحشار ميكانيكي للضاغط', 'تسرب أنبوب المكثف', 'فشل كهربائي لمحرك النفخ',
-            'تسرب قلب السخان', 'انسداد قلب السخان', 'فشل ميكانيكي لمضخة الوقود',
-            'انسداد حاقن الوقود', 'شمعات إشعال متسخة', 'فشل ملف الإشعال',
-            'تسرب الرادياتير', 'تسرب داخلي للأسطوانة الرئيسية', 'انفجار خط الفرامل',
-            'فحمات الفرامل مستهلكة', 'القرص ملتوي', 'الدعامة متسربة', 'وسائد ذراع التحكم مستهلكة',
-            'فشل ماص الصدمات', 'البطارية فارغة', 'المولد لا يشحن', 'ضوضاء في محمل المولد'
-        ]
-    })
-    
-    # ========================================================================
-    # WORK ORDERS & MALFUNCTIONS (ERD compliant field names)
-    # ========================================================================
-    
-    work_orders = []
-    malfunctions = []
-    wo_id_counter = 1
-    mal_id_counter = 1
-    
-    for i in range(20):
-        vehicle = st.session_state.df_vehicle.sample(1).iloc[0]
-        workshop = st.session_state.df_workshop.sample(1).iloc[0]
-        failure = st.session_state.df_failure_catalogue.sample(1).iloc[0]
-        technician_user = st.session_state.df_technical_user.sample(1).iloc[0]
-        technician_employee = st.session_state.df_user[
-            st.session_state.df_user['Employee_ID'] == technician_user['Employee_ID']
-        ].iloc[0]
-        
-        malfunction_date = datetime.now() - timedelta(days=np.random.randint(1, 180))
-        reception_date = malfunction_date + timedelta(days=np.random.randint(0, 2))
-        creation_date = reception_date + timedelta(days=np.random.randint(0, 1))
-        
-        status = np.random.choice(['Open', 'In Progress', 'Completed'], p=[0.3, 0.4, 0.3])
-        require_parts = np.random.choice([True, False], p=[0.6, 0.4])
-        
-        completion_date = None
-        if status == 'Completed':
-            completion_date = creation_date + timedelta(days=np.random.randint(1, 30))
-        
-        work_order = {
-            'ID': wo_id_counter,
-            'Employee_ID': technician_user['Employee_ID'],
-            'Workshop_Name': workshop['Workshop_Name'],
-            'Vehicle_Number': vehicle['Vehicle_Number'],
-            'AlKhorayef_Reception_Date': reception_date.strftime('%Y-%m-%d'),
-            'Equipment_Owning_Unit': vehicle['Unit_Name'],
-            'Vehicle_Type': vehicle['Vehicle_Type'],
-            'Malfunction_Type': failure['System'],
-            'Malfunction_Date': malfunction_date.strftime('%Y-%m-%d'),
-            'MNG_Work_Order_Creation_Date': creation_date.strftime('%Y-%m-%d'),
-            'AIC_Work_Order_Number': f'SP-{datetime.now().year}-{wo_id_counter:05d}',
-            'Technician_Name': f"{technician_employee['Employee_First_Name']} {technician_employee['Employee_Last_Name']}",
-            'Work_Order_Status': status,
-            'Require_Spare_Parts': require_parts,
-            'Work_Order_Completion_Date': completion_date.strftime('%Y-%m-%d') if completion_date else None,
-            'Comments': f"Work order for {failure['System']} - {failure['Subsystem']} issue"
-        }
-        
-        malfunction = {
-            'ID': mal_id_counter,
-            'Vehicle_Number': vehicle['Vehicle_Number'],
-            'Work_Order_ID': wo_id_counter,
-            'Malfunction_Code': failure['Malfunction_Code'],
-            'Resolution_Description_English': failure['Resolution_Description_English'],
-            'Resolution_Description_Arabic': failure['Resolution_Description_Arabic'],
-            'Resolution_Code': failure['Resolution_Code'],
-            'Cause_Description_English': failure['Cause_Description_English'],
-            'Cause_Description_Arabic': failure['Cause_Description_Arabic'],
-            'Cause_Code': failure['Cause_Code'],
-            'Description_English': f"{failure['System']} - {failure['Subsystem']} - {failure['Component']} - {failure['Failure_Mode']}",
-            'Description_Arabic': f"نظام {failure['System']} - نظام فرعي {failure['Subsystem']}"
-        }
-        
-        work_orders.append(work_order)
-        malfunctions.append(malfunction)
-        wo_id_counter += 1
-        mal_id_counter += 1
-    
-    st.session_state.df_work_orders = pd.DataFrame(work_orders)
-    st.session_state.df_malfunction = pd.DataFrame(malfunctions)
-    
-    # ========================================================================
-    # WAREHOUSE & PARTS
-    # ========================================================================
-    
-    st.session_state.df_warehouse = pd.DataFrame({
-        'ID': [1, 2, 3, 4, 5],
-        'Warehouse_Name': ['Central Warehouse', 'Eastern Warehouse', 'Western Warehouse', 'Northern Warehouse', 'Southern Warehouse'],
-        'Part_Number': ['WH-C-001', 'WH-E-001', 'WH-W-001', 'WH-N-001', 'WH-S-001'],
-        'Unit': ['Unit 101', 'Unit 102', 'Unit 103', 'Unit 104', 'Unit 105'],
-        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern']
-    })
-    
-    st.session_state.df_part = pd.DataFrame({
-        'ID': range(1, 21),
-        'Warehouse_Code': ['WH-C', 'WH-E', 'WH-W', 'WH-N', 'WH-S'] * 4,
-        'Part_Number': [f'PN-{i:05d}' for i in range(1, 21)],
-        'OEM_Number': [f'OEM-{i:05d}' for i in range(1, 21)],
-        'English_Description': ['Compressor Assembly', 'Fuel Pump Kit', 'Brake Pad Set', 'Alternator', 'Strut Assembly',
-                               'Ignition Coil', 'Radiator', 'Battery 12V', 'Fuel Injector', 'Heater Core',
-                               'Master Cylinder', 'Shock Absorber', 'Spark Plug Set', 'Brake Rotor', 'Control Arm',
-                               'Condenser', 'Blower Motor', 'Water Pump', 'Thermostat', 'Belt Tensioner'],
-        'Arabic_Description': ['مجموعة الضاغط', 'طقم مضخة الوقود', 'طقم فرامل', 'مولد', 'مجموعة دعامة',
-                              'ملف الإشعال', 'المبرد', 'بطارية 12 فولت', 'حاقن الوقود', 'نواة السخان',
-                              'اسطوانة رئيسية', 'ممتص الصدمات', 'طقم شمعة إشعال', 'قرص الفرامل', 'ذراع التحكم',
-                              'المكثف', 'محرك النفخ', 'مضخة الماء', 'منظم الحرارة', 'شد الحزام'],
-        'Part_Locations': [f'A-{i:02d}' for i in range(1, 21)],
-        'Part_Quantity': np.random.randint(5, 100, 20)
-    })
-    
-    # ========================================================================
-    # SUPPLY REQUEST, PURCHASE REQUEST, ORDERS
-    # ========================================================================
-    
-    st.session_state.df_supply_request = pd.DataFrame({
-        'ID': [1, 2, 3],
-        'Work_Order_ID': [1, 2, 5],
-        'Part_ID': [1, 2, 3],
-        'Quantity_Requested': [2, 1, 4],
-        'Status': ['Pending', 'Approved', 'Issued']
-    })
-    
-    st.session_state.df_purchase_request = pd.DataFrame({
-        'ID': [1, 2],
-        'Supply_Request_ID': [1, 2],
-        'Employee_ID': [5, 5],
-        'PR_Date': [(datetime.now() - timedelta(days=10)).strftime('%Y-%m-%d'),
-                    (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')],
-        'Status': ['Pending', 'Approved']
-    })
-    
-    st.session_state.df_orders = pd.DataFrame({
-        'ID': [1],
-        'PR_ID': [1],
-        'Status': ['In Transit'],
-        'Order_Date': [(datetime.now() - timedelta(days=15)).strftime('%Y-%m-%d')],
-        'Delivery_Date': [(datetime.now() + timedelta(days=5)).strftime('%Y-%m-%d')]
-    })
-    
-    # Counters for new IDs
-    st.session_state.work_order_id_counter = wo_id_counter
-    st.session_state.malfunction_id_counter = mal_id_counter
-    st.session_state.supply_request_id_counter = 4
-    st.session_state.purchase_request_id_counter = 3
-    st.session_state.order_id_counter = 2
+    # Prometheus endpoint for rerun timings (only when AMIC_METRICS_PORT is set)
+    start_metrics_server(gauges=lambda: {f'query_cache_{k}': v for k, v in store.cache.stats().items()})
     
     st.session_state.data_initialized = True
 
@@ -623,13 +285,11 @@ def role_selection_page():
         
         if st.button("🚀 Start Demo", use_container_width=True, type="primary"):
             # Get employee details
-            employee = st.session_state.df_user[
-                st.session_state.df_user['Employee_ID'] == role_info['employee_id']
-            ].iloc[0]
+            employee = get_store().get('user', role_info['employee_id'], key_col='Employee_ID')
             
             st.session_state.logged_in = True
             st.session_state.current_user = {
-                **employee.to_dict(),
+                **employee,
                 'Role': selected_role,
                 'Workshop_Name': role_info['workshop']
             }
@@ -646,107 +306,621 @@ def change_role():
 # HELPER FUNCTIONS
 # ============================================================================
 
+def format_date(value):
+    """Format a date column value for display ('' when missing)"""
+    return value.strftime('%Y-%m-%d') if pd.notna(value) else ''
+
+def get_catalogue_index():
+    """Hierarchical catalogue index, rebuilt only when the catalogue changes"""
+    return get_store().derived('catalogue_index', ('failure_catalogue',), CatalogueIndex)
+
 def get_cascading_options(system=None, subsystem=None, component=None):
     """Get cascading dropdown options from failure catalogue"""
-    df = st.session_state.df_failure_catalogue
+    path = [level for level in (system, subsystem, component) if level is not None]
+    return get_catalogue_index().options(*path)
+
+def get_failure_details(system, subsystem, component, failure_mode):
+    """Get failure details from catalogue"""
+    return get_catalogue_index().details(system, subsystem, component, failure_mode)
+
+# ============================================================================
+# WORK ORDER LISTS
+# ============================================================================
+
+WO_PAGE_SIZES = [10, 25, 50, 100]
+
+WO_LIST_COLUMNS = ['ID', 'AIC_Work_Order_Number', 'Vehicle_Number', 'Workshop_Name',
+                   'Work_Order_Status', 'Malfunction_Date', 'Technician_Name']
+
+def paginate(df, key):
+    """Page-size and page controls; returns only the rows of the current page"""
+    col1, col2, col3 = st.columns([1, 1, 2])
+    
+    with col1:
+        page_size = st.selectbox("Rows per page", WO_PAGE_SIZES, key=f"{key}_page_size")
+    
+    n_pages = max(1, -(-len(df) // page_size))
+    # Filters or a larger page size can shrink the page count under the stored page
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
     
-    if system is None:
-        return sorted(df['System'].unique().tolist())
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}_page")
+    
+    with col3:
+        st.caption(f"Page {page} of {n_pages}")
+    
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+BULK_EDIT_COLUMNS = ['Work_Order_Status', 'Work_Order_Completion_Date', 'Comments']
+
+def collect_bulk_changes(original, edited, bulk_status=None, completion_date=None):
+    """Diff the edited grid against the page into {ID: changed values}
+    
+    Rows ticked in the Select column take bulk_status; rows newly completed
+    without a completion date get completion_date.
+    """
+    edited = edited.copy()
+    edited['Work_Order_Completion_Date'] = pd.to_datetime(edited['Work_Order_Completion_Date'])
     
-    df = df[df['System'] == system]
-    if subsystem is None:
-        return sorted(df['Subsystem'].unique().tolist())
+    if bulk_status:
+        edited.loc[edited['Select'], 'Work_Order_Status'] = bulk_status
     
-    df = df[df['Subsystem'] == subsystem]
-    if component is None:
-        return sorted(df['Component'].unique().tolist())
+    newly_completed = edited['Work_Order_Status'].eq('Completed') & original['Work_Order_Status'].ne('Completed')
+    undated = newly_completed & edited['Work_Order_Completion_Date'].isna()
+    edited.loc[undated, 'Work_Order_Completion_Date'] = pd.Timestamp(completion_date)
     
-    df = df[df['Component'] == component]
-    return sorted(df['Failure_Mode'].unique().tolist())
+    changed = pd.DataFrame({
+        col: edited[col].ne(original[col]) & ~(edited[col].isna() & original[col].isna())
+        for col in BULK_EDIT_COLUMNS
+    })
+    rows = changed.any(axis=1)
+    
+    changes = {}
+    for wo_id, flags, values in zip(edited.loc[rows, 'ID'], changed[rows].to_numpy(),
+                                    edited.loc[rows, BULK_EDIT_COLUMNS].to_numpy(dtype=object)):
+        changes[int(wo_id)] = {col: value for col, flag, value in zip(BULK_EDIT_COLUMNS, flags, values) if flag}
+    return changes
 
-def get_failure_details(system, subsystem, component, failure_mode):
-    """Get failure details from catalogue"""
-    df = st.session_state.df_failure_catalogue
-    result = df[
-        (df['System'] == system) & 
-        (df['Subsystem'] == subsystem) & 
-        (df['Component'] == component) & 
-        (df['Failure_Mode'] == failure_mode)
-    ]
-    
-    if not result.empty:
-        return result.iloc[0].to_dict()
-    return None
+def render_bulk_status_editor(page_df, user):
+    """Editable grid over one page of work orders, applied as a single batch update"""
+    grid = page_df[['ID', 'Vehicle_Number', 'Technician_Name'] + BULK_EDIT_COLUMNS].reset_index(drop=True)
+    grid = grid.astype({'Vehicle_Number': object, 'Technician_Name': object, 'Work_Order_Status': object})
+    grid.insert(0, 'Select', False)
+    
+    editor_key = f"bulk_editor_{grid['ID'].iloc[0]}_{len(grid)}"
+    versions_key = f"{editor_key}_versions"
+    if editor_key not in st.session_state:
+        # Versions the grid was filled from; saving over a newer version is refused
+        st.session_state[versions_key] = dict(zip(page_df['ID'].tolist(), page_df['Row_Version'].tolist()))
+    if st.session_state.pop("bulk_conflict", None):
+        st.warning("⚠️ Some of these work orders were changed by someone else while you were editing. "
+                   "The grid has been reloaded with their changes; re-apply yours.")
+    
+    edited = st.data_editor(
+        grid,
+        use_container_width=True,
+        hide_index=True,
+        disabled=['ID', 'Vehicle_Number', 'Technician_Name'],
+        column_config={
+            'Select': st.column_config.CheckboxColumn('Select'),
+            'Work_Order_Status': st.column_config.SelectboxColumn('Status', options=WORK_ORDER_STATUSES, required=True),
+            'Work_Order_Completion_Date': st.column_config.DateColumn('Completion Date'),
+            'Comments': st.column_config.TextColumn('Comments'),
+        },
+        key=editor_key
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        bulk_status = st.selectbox("Set selected rows to", ['(keep edits)'] + WORK_ORDER_STATUSES, key="bulk_status")
+    
+    with col2:
+        completion_date = st.date_input("Completion date for newly completed orders", datetime.now(), key="bulk_completion")
+    
+    with col3:
+        st.markdown("")
+        apply = st.button("💾 Apply changes", type="primary", use_container_width=True, key="bulk_apply")
+    
+    if apply:
+        changes = collect_bulk_changes(
+            grid, edited,
+            bulk_status=None if bulk_status == '(keep edits)' else bulk_status,
+            completion_date=completion_date
+        )
+        if not changes:
+            st.info("No changes to apply")
+            return
+        
+        store = get_store()
+        columns = sorted(set().union(*changes.values()))
+        versions = st.session_state.get(versions_key, {})
+        with store.locked('work_orders', 'audit_log'):
+            try:
+                update_records(store, 'work_orders', changes,
+                               expected_versions={wo_id: versions[wo_id] for wo_id in changes if wo_id in versions})
+            except ValidationFailed as e:
+                st.error("❌ " + "; ".join(format_errors(e.errors)))
+                return
+            except ConflictError:
+                st.session_state.pop(editor_key, None)
+                st.session_state["bulk_conflict"] = True
+                st.rerun()
+            store.append('audit_log', {
+                'ID': store.next_id('audit_log'),
+                'Timestamp': datetime.now(),
+                'Employee_ID': user['Employee_ID'],
+                'Action': 'bulk_update',
+                'Table_Name': 'work_orders',
+                'Record_Count': len(changes),
+                'Details': json.dumps({'ids': list(changes), 'columns': columns})
+            })
+        
+        # Drop the grid's pending edits so the next run starts from the saved rows
+        del st.session_state[editor_key]
+        st.session_state.pop(versions_key, None)
+        st.success(f"✅ Updated {len(changes)} work orders")
+        st.rerun()
+
+def work_order_label(wo):
+    """Expander / picker label for a work order"""
+    return f"WO-{wo['ID']:05d} - {wo['Vehicle_Number']} - {wo['Work_Order_Status']}"
+
+def render_work_order_list(df_wo, key, render):
+    """Paginated work-order list; render(wo) builds the widgets for one order
+    
+    In the default lazy mode the page is a plain table and only the selected
+    order gets its detail widgets, so the cost follows the page size.
+    """
+    page_df = paginate(df_wo, key)
+    
+    lazy = st.toggle("Show details for one work order at a time", value=True, key=f"{key}_lazy")
+    
+    with span('work_order_table', 'widgets'):
+        if not lazy:
+            for idx, wo in page_df.iterrows():
+                with st.expander(work_order_label(wo)):
+                    render(wo)
+            return
+        
+        st.dataframe(
+            page_df[WO_LIST_COLUMNS],
+            use_container_width=True,
+            hide_index=True,
+            column_config={'Malfunction_Date': st.column_config.DateColumn('Malfunction_Date')}
+        )
+    
+    labels = {wo['ID']: work_order_label(wo) for idx, wo in page_df.iterrows()}
+    if st.session_state.get(f"{key}_selected") not in labels:
+        st.session_state.pop(f"{key}_selected", None)
+    
+    selected = st.selectbox("Work order details", list(labels), format_func=labels.get, key=f"{key}_selected")
+    
+    with span('work_order_detail', 'widgets'), st.container(border=True):
+        render(page_df[page_df['ID'] == selected].iloc[0])
+
+def render_work_order_details(wo):
+    """Read-only details of one work order"""
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown(f"**Work Order ID:** WO-{wo['ID']:05d}")
+        st.markdown(f"**AIC Number:** {wo['AIC_Work_Order_Number']}")
+        st.markdown(f"**Vehicle:** {wo['Vehicle_Number']}")
+        st.markdown(f"**Workshop:** {wo['Workshop_Name']}")
+        st.markdown(f"**Status:** {wo['Work_Order_Status']}")
+    
+    with col2:
+        st.markdown(f"**Malfunction Date:** {format_date(wo['Malfunction_Date'])}")
+        st.markdown(f"**Reception Date:** {format_date(wo['AlKhorayef_Reception_Date'])}")
+        st.markdown(f"**Creation Date:** {format_date(wo['MNG_Work_Order_Creation_Date'])}")
+        st.markdown(f"**Require Parts:** {'Yes' if wo['Require_Spare_Parts'] else 'No'}")
+        if pd.notna(wo['Work_Order_Completion_Date']):
+            st.markdown(f"**Completion Date:** {format_date(wo['Work_Order_Completion_Date'])}")
+    
+    if wo['Comments']:
+        st.markdown("**Comments:**")
+        st.info(wo['Comments'])
+
+def render_work_order_editor(wo):
+    """Supervisor view of one work order with status, completion and comment edits
+    
+    The order's Row_Version is remembered when its widgets are created and
+    after each save, and the update is refused if someone else saved the
+    order since.
+    """
+    version_key = f"version_{wo['ID']}"
+    if f"status_{wo['ID']}" not in st.session_state:
+        st.session_state[version_key] = int(wo['Row_Version'])
+    if st.session_state.pop(f"conflict_{wo['ID']}", None):
+        st.warning("⚠️ Someone else updated this work order while you were editing it. "
+                   "It has been reloaded with their changes; re-apply yours.")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown(f"**Work Order ID:** WO-{wo['ID']:05d}")
+        st.markdown(f"**AIC Number:** {wo['AIC_Work_Order_Number']}")
+        st.markdown(f"**Vehicle:** {wo['Vehicle_Number']}")
+        st.markdown(f"**Technician:** {wo['Technician_Name']}")
+        st.markdown(f"**Malfunction Date:** {format_date(wo['Malfunction_Date'])}")
+    
+    with col2:
+        # Editable status
+        new_status = st.selectbox(
+            "Status",
+            ['Open', 'In Progress', 'Completed'],
+            index=['Open', 'In Progress', 'Completed'].index(wo['Work_Order_Status']),
+            key=f"status_{wo['ID']}"
+        )
+        
+        completion_date = None
+        if new_status == 'Completed':
+            completion_date = st.date_input(
+                "Completion Date",
+                value=wo['Work_Order_Completion_Date'] if pd.notna(wo['Work_Order_Completion_Date']) else datetime.now(),
+                key=f"completion_{wo['ID']}"
+            )
+        
+        new_comments = st.text_area(
+            "Comments",
+            value=wo['Comments'] if wo['Comments'] else '',
+            key=f"comments_{wo['ID']}"
+        )
+    
+    # Update button
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("💾 Update", key=f"update_{wo['ID']}", use_container_width=True):
+            # Update work order
+            changes = {'Work_Order_Status': new_status, 'Comments': new_comments}
+            if new_status == 'Completed' and completion_date:
+                changes['Work_Order_Completion_Date'] = completion_date
+            
+            try:
+                saved = update_work_order(get_store(), wo['ID'], changes,
+                                          expected_version=st.session_state.get(version_key))
+            except ValidationFailed as e:
+                st.error("❌ " + "; ".join(format_errors(e.errors)))
+                return
+            except ConflictError:
+                # Drop this session's edits so the widgets reload from the saved order
+                for key in ('status', 'completion', 'comments'):
+                    st.session_state.pop(f"{key}_{wo['ID']}", None)
+                st.session_state[f"conflict_{wo['ID']}"] = True
+                st.rerun()
+            
+            # The widgets keep the saved values, so the next save starts from this version
+            st.session_state[version_key] = int(saved['Row_Version'])
+            st.success("✅ Work order updated!")
+            st.rerun()
+    
+    with col2:
+        if wo['Require_Spare_Parts'] and st.button("📦 Create Supply Request", key=f"supply_{wo['ID']}", use_container_width=True):
+            st.info("Supply request feature - to be implemented")
 
 # ============================================================================
-# PAGES
+# EXPORTS
 # ============================================================================
 
-def page_dashboard():
-    """Home dashboard for all users"""
-    st.title("📊 Dashboard")
+def start_export_job(key, job):
+    """Keep one export per panel, deleting the file of the one it replaces"""
+    previous = st.session_state.get(key)
+    if previous is not None:
+        previous.cleanup()
+    st.session_state[key] = job
+
+def clear_export_job(key):
+    """Close a panel's export once downloaded (reading it deleted its file)"""
+    st.session_state.pop(key, None)
+
+def render_export_progress(job):
+    """Progress of a running export; reruns the page once it has finished"""
+    if job.done:
+        st.rerun()
+    rows = f"{job.rows_written:,} / {job.total_rows:,} rows" if job.total_rows is not None else "Preparing..."
+    st.progress(job.fraction, text=f"Exporting {job.file_name}: {rows}")
+
+def render_export_panel(df_wo, key):
+    """XLSX / CSV export of a filtered work order set and of its malfunctions"""
+    st.markdown("**Export**")
+    col1, col2, col3 = st.columns([1, 2, 2])
     
-    user = st.session_state.current_user
+    with col1:
+        fmt = st.radio("Format", list(FORMATS), horizontal=True, format_func=str.upper, key=f"{key}_format")
     
-    st.markdown("---")
+    stamp = datetime.now().strftime('%Y%m%d_%H%M')
+    with col2:
+        if st.button(f"⬇️ Work orders ({len(df_wo):,})", key=f"{key}_work_orders", use_container_width=True):
+            start_export_job(f"{key}_job", export_work_orders(df_wo, fmt, f"work_orders_{stamp}"))
     
-    # Filter work orders based on role
-    df_wo = st.session_state.df_work_orders.copy()
+    with col3:
+        if st.button("⬇️ Malfunctions of these work orders", key=f"{key}_malfunctions", use_container_width=True):
+            df_malfunction = get_store().table('malfunction')
+            start_export_job(f"{key}_job", export_malfunctions(df_wo, df_malfunction, fmt, f"malfunctions_{stamp}"))
     
-    if user['Role'] in ['Technician', 'Supervisor'] and user.get('Workshop_Name'):
-        df_wo = df_wo[df_wo['Workshop_Name'] == user['Workshop_Name']]
+    job = st.session_state.get(f"{key}_job")
+    if job is None:
+        return
+    
+    if not job.done:
+        # Only this fragment polls; the rest of the page stays idle while the file is written
+        st.fragment(render_export_progress, run_every=1)(job)
+    elif job.error is not None:
+        st.error(f"Export failed: {job.error}")
+    else:
+        # Read only when clicked, so the file is not held in memory until then
+        st.download_button(
+            f"💾 Download {job.file_name} ({job.total_rows:,} rows)",
+            data=job.read,
+            file_name=job.file_name,
+            mime=job.mime,
+            on_click=clear_export_job,
+            args=(f"{key}_job",),
+            key=f"{key}_download"
+        )
+
+# ============================================================================
+# BULK IMPORT
+# ============================================================================
+
+def render_bulk_import(name, key, user, help_text):
+    """Upload a sheet, show what it would change and its rejected rows, then merge it in one write"""
+    store = get_store()
+    uploaded = st.file_uploader("Excel (.xlsx) or CSV file", type=['xlsx', 'csv'], key=f"{key}_file", help=help_text)
+    if uploaded is None:
+        return
     
-    # KPIs
+    # Validate once per uploaded file, not on every rerun
+    cached = st.session_state.get(f"{key}_plan")
+    if cached is None or cached[0] != uploaded.file_id:
+        with st.spinner(f"Validating {uploaded.name}..."):
+            cached = (uploaded.file_id, plan_import(name, uploaded, uploaded.name))
+        st.session_state[f"{key}_plan"] = cached
+    plan = cached[1]
+    
+    inserts, updates = plan.split(store)
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Work Orders", len(df_wo))
+        st.metric("Rows Read", f"{plan.rows_read:,}")
     
     with col2:
-        open_count = len(df_wo[df_wo['Work_Order_Status'] == 'Open'])
-        st.metric("Open", open_count)
+        st.metric("New", f"{len(inserts):,}")
     
     with col3:
-        in_progress = len(df_wo[df_wo['Work_Order_Status'] == 'In Progress'])
-        st.metric("In Progress", in_progress)
+        st.metric("Already Present", f"{len(updates):,}")
     
     with col4:
-        completed = len(df_wo[df_wo['Work_Order_Status'] == 'Completed'])
-        st.metric("Completed", completed)
+        st.metric("Rejected", f"{len(plan.errors):,}")
+    
+    if plan.ignored_columns:
+        st.caption(f"Ignored columns: {', '.join(plan.ignored_columns)}")
     
-    # Charts
+    if plan.errors:
+        st.warning("Rejected rows are left out of the import")
+        st.dataframe(plan.error_frame().head(1000), use_container_width=True, hide_index=True)
+        if len(plan.errors) > 1000:
+            st.caption(f"Showing the first 1,000 of {len(plan.errors):,} errors")
+    
+    update_existing = st.checkbox(
+        f"Overwrite existing {plan.key} entries with the sheet's values",
+        value=True,
+        key=f"{key}_update_existing"
+    )
+    
+    if st.button(f"📥 Import {len(plan.records):,} valid rows", type="primary",
+                 disabled=not plan.records, key=f"{key}_apply"):
+        with store.locked(name, 'audit_log'):
+            inserted, updated, skipped = apply_import(store, plan, update_existing)
+            store.append('audit_log', {
+                'ID': store.next_id('audit_log'),
+                'Timestamp': datetime.now(),
+                'Employee_ID': user['Employee_ID'],
+                'Action': 'bulk_import',
+                'Table_Name': name,
+                'Record_Count': inserted + updated,
+                'Details': json.dumps({'file': plan.file_name, 'inserted': inserted, 'updated': updated,
+                                       'skipped': skipped, 'rejected': len(plan.errors)})
+            })
+        
+        # Clear the upload so the same sheet is not merged twice by accident
+        st.session_state.pop(f"{key}_plan", None)
+        st.session_state.pop(f"{key}_file", None)
+        st.success(f"✅ Imported {plan.file_name}: {inserted:,} added, {updated:,} updated, {skipped:,} skipped")
+
+def render_trends(store, workshop='All'):
+    """Created, completed and backlog trend charts over a chosen date range, read from the daily rollup"""
     st.markdown("---")
+    st.subheader("Trends")
+    
+    today = datetime.now().date()
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        dates = st.date_input("Date range", (today - timedelta(days=90), today), max_value=today, key='trend_dates')
+    
+    with col2:
+        # A technician's or supervisor's dashboard is already limited to one workshop
+        regions = ['All'] + sorted(store.table('region')['Region'].tolist())
+        region = st.selectbox("Region", regions, key='trend_region', disabled=workshop != 'All')
+    
+    with col3:
+        system = st.selectbox("System", ['All'] + get_cascading_options(), key='trend_system')
+    
+    with col4:
+        vehicle_types = ['All'] + sorted(store.table('vehicle')['Vehicle_Type'].dropna().unique().tolist())
+        vehicle_type = st.selectbox("Vehicle Type", vehicle_types, key='trend_vehicle_type')
+    
+    if len(dates) != 2:
+        st.info("Select a start and an end date")
+        return
+    
+    start, end = dates
+    # Weekly points past half a year keep the charts readable
+    freq = 'D' if (end - start).days <= 180 else 'W'
+    trends = work_order_trends(store, start, end, region=region, workshop=workshop, system=system,
+                               vehicle_type=vehicle_type, freq=freq)
+    
+    zoom = alt.selection_interval(encodings=['x'], bind='scales')
+    flow = trends.melt('Date', ['Created', 'Completed'], var_name='Series', value_name='Work Orders')
+    flow_chart = alt.Chart(flow).mark_line(point=True).encode(
+        x=alt.X('Date:T', title=None),
+        y=alt.Y('Work Orders:Q'),
+        color=alt.Color('Series:N', legend=alt.Legend(orient='top', title=None)),
+        tooltip=[alt.Tooltip('Date:T'), 'Series:N', 'Work Orders:Q'],
+    ).add_params(zoom)
+    backlog_chart = alt.Chart(trends).mark_area(line=True, opacity=0.3).encode(
+        x=alt.X('Date:T', title=None),
+        y=alt.Y('Backlog:Q', title='Open Work Orders'),
+        tooltip=[alt.Tooltip('Date:T'), 'Backlog:Q'],
+    ).add_params(zoom)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.subheader("Work Orders by Status")
-        status_counts = df_wo['Work_Order_Status'].value_counts()
-        st.bar_chart(status_counts)
+        st.caption(f"Created vs completed per {'day' if freq == 'D' else 'week'}")
+        st.altair_chart(flow_chart, use_container_width=True)
     
     with col2:
-        st.subheader("Work Orders by Workshop")
-        workshop_counts = df_wo['Workshop_Name'].value_counts()
-        st.bar_chart(workshop_counts)
+        st.caption("Backlog at the end of each period")
+        st.altair_chart(backlog_chart, use_container_width=True)
+
+def render_reliability(store, region, workshop, system):
+    """Fleet MTBF / MTTR metrics with per-vehicle, component, workshop, failure mode and repeat tables"""
+    report = reliability_report(store, region=region, workshop=workshop, system=system)
     
-    # Recent work orders
     st.markdown("---")
-    st.subheader("Recent Work Orders")
+    st.subheader("Fleet Reliability")
     
-    display_cols = ['ID', 'Vehicle_Number', 'Workshop_Name', 'Work_Order_Status', 
-                   'Malfunction_Date', 'Technician_Name']
+    if not report['failures']:
+        st.info("No data available")
+        return
     
-    st.dataframe(
-        df_wo[display_cols].head(10),
-        use_container_width=True,
-        hide_index=True
-    )
+    repeats = report['repeat_failures']
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Fleet MTBF (days)", f"{report['fleet_mtbf']:.1f}" if report['fleet_mtbf'] is not None else "N/A")
+    with col2:
+        st.metric("Fleet MTTR (days)", f"{report['fleet_mttr']:.1f}" if report['fleet_mttr'] is not None else "N/A")
+    with col3:
+        st.metric(f"Repeat Failures ({REPEAT_WINDOW_DAYS} days)", len(repeats))
+    with col4:
+        st.metric("Repeat Rate", f"{len(repeats) / report['failures']:.1%}")
+    
+    days = st.column_config.NumberColumn(format='%.1f')
+    tabs = st.tabs(["Vehicles", "Components", "Workshops", "Failure Modes", "Repeat Failures"])
+    with tabs[0]:
+        st.caption("Shortest mean time between failures first")
+        st.dataframe(report['vehicle_mtbf'], hide_index=True, use_container_width=True,
+                     column_config={'MTBF_Days': days})
+    with tabs[1]:
+        st.caption("Gaps between failures of the same component on the same vehicle")
+        st.dataframe(report['component_mtbf'], hide_index=True, use_container_width=True,
+                     column_config={'MTBF_Days': days})
+    with tabs[2]:
+        st.dataframe(report['workshop_mttr'], hide_index=True, use_container_width=True,
+                     column_config={'MTTR_Days': days})
+    with tabs[3]:
+        st.dataframe(report['failure_mode_mttr'], hide_index=True, use_container_width=True,
+                     column_config={'MTTR_Days': days})
+    with tabs[4]:
+        if repeats.empty:
+            st.info("No repeat failures")
+        else:
+            if len(repeats) > 500:
+                st.caption(f"Latest 500 of {len(repeats)} repeat failures")
+            st.dataframe(
+                repeats.head(500),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'ID': 'WO ID',
+                    'Previous_Work_Order_ID': 'Previous WO',
+                    'Malfunction_Date': st.column_config.DateColumn('Malfunction Date', format='YYYY-MM-DD'),
+                    'Days_Since_Previous': st.column_config.NumberColumn('Days Since Previous', format='%d'),
+                }
+            )
+
+# ============================================================================
+# PAGES
+# ============================================================================
+
+@timed('page')
+def page_dashboard():
+    """Home dashboard for all users"""
+    st.title("📊 Dashboard")
+    
+    user = st.session_state.current_user
+    
+    st.markdown("---")
+    
+    # Filter work orders based on role
+    workshop = 'All'
+    if user['Role'] in ['Technician', 'Supervisor'] and user.get('Workshop_Name'):
+        workshop = user['Workshop_Name']
+    
+    store = get_store()
+    counters = work_order_counters(store)
+    status_counts = counters.counts('Work_Order_Status', workshop=workshop)
+    
+    with span('dashboard_kpis', 'widgets'):
+        # KPIs
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Total Work Orders", int(status_counts.sum()))
+        
+        with col2:
+            st.metric("Open", int(status_counts.get('Open', 0)))
+        
+        with col3:
+            st.metric("In Progress", int(status_counts.get('In Progress', 0)))
+        
+        with col4:
+            st.metric("Completed", int(status_counts.get('Completed', 0)))
+    
+    with span('dashboard_charts', 'widgets'):
+        # Charts
+        st.markdown("---")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("Work Orders by Status")
+            st.bar_chart(status_counts)
+        
+        with col2:
+            st.subheader("Work Orders by Workshop")
+            st.bar_chart(counters.counts('Workshop_Name', workshop=workshop))
+    
+    with span('dashboard_trends', 'widgets'):
+        render_trends(store, workshop)
+    
+    with span('dashboard_recent', 'widgets'):
+        # Recent work orders
+        st.markdown("---")
+        st.subheader("Recent Work Orders")
+        
+        st.dataframe(
+            recent_work_orders(store, None if workshop == 'All' else workshop),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Malfunction_Date': st.column_config.DateColumn('Malfunction_Date', format='YYYY-MM-DD')
+            }
+        )
 
+@timed('page')
 def page_create_work_order():
     """Page for technicians to create work orders"""
     st.title("➕ Create Work Order")
     
     user = st.session_state.current_user
+    store = get_store()
     
     with st.form("create_wo_form", clear_on_submit=True):
         st.subheader("📋 Basic Information")
@@ -758,12 +932,12 @@ def page_create_work_order():
             if user['Role'] == 'Technician' and user.get('Workshop_Name'):
                 workshop = st.text_input("Workshop", value=user['Workshop_Name'], disabled=True)
             else:
-                workshops = st.session_state.df_workshop['Workshop_Name'].tolist()
+                workshops = store.table('workshop')['Workshop_Name'].tolist()
                 workshop = st.selectbox("Workshop *", workshops)
         
         with col2:
             # Vehicle selection
-            vehicles = st.session_state.df_vehicle['Vehicle_Number'].tolist()
+            vehicles = store.table('vehicle')['Vehicle_Number'].tolist()
             vehicle_number = st.selectbox("Vehicle Number *", vehicles)
         
         col1, col2, col3 = st.columns(3)
@@ -841,63 +1015,30 @@ def page_create_work_order():
             elif not failure_details:
                 st.error("❌ Invalid fault classification")
             else:
-                # Get vehicle details
-                vehicle = st.session_state.df_vehicle[
-                    st.session_state.df_vehicle['Vehicle_Number'] == vehicle_number
-                ].iloc[0]
-                
-                # Create work order
-                wo_id = st.session_state.work_order_id_counter
-                mal_id = st.session_state.malfunction_id_counter
-                
+                # Unit, vehicle type, technician name and the catalogue codes and
+                # descriptions are filled in by the service, as for API requests
                 new_wo = {
-                    'ID': wo_id,
                     'Employee_ID': user['Employee_ID'],
                     'Workshop_Name': workshop if user['Role'] != 'Technician' or not user.get('Workshop_Name') else user['Workshop_Name'],
                     'Vehicle_Number': vehicle_number,
-                    'AlKhorayef_Reception_Date': reception_date.strftime('%Y-%m-%d'),
-                    'Equipment_Owning_Unit': vehicle['Unit_Name'],
-                    'Vehicle_Type': vehicle['Vehicle_Type'],
+                    'AlKhorayef_Reception_Date': reception_date,
                     'Malfunction_Type': selected_system,
-                    'Malfunction_Date': malfunction_date.strftime('%Y-%m-%d'),
-                    'MNG_Work_Order_Creation_Date': creation_date.strftime('%Y-%m-%d'),
-                    'AIC_Work_Order_Number': f'SP-{datetime.now().year}-{wo_id:05d}',
-                    'Technician_Name': f"{user['Employee_First_Name']} {user['Employee_Last_Name']}",
+                    'Malfunction_Date': malfunction_date,
+                    'MNG_Work_Order_Creation_Date': creation_date,
                     'Work_Order_Status': 'Open',
                     'Require_Spare_Parts': require_parts,
-                    'Work_Order_Completion_Date': None,
                     'Comments': comments
                 }
                 
-                new_malfunction = {
-                    'ID': mal_id,
-                    'Vehicle_Number': vehicle_number,
-                    'Work_Order_ID': wo_id,
-                    'Malfunction_Code': failure_details['Malfunction_Code'],
-                    'Resolution_Description_English': failure_details['Resolution_Description_English'],
-                    'Resolution_Description_Arabic': failure_details['Resolution_Description_Arabic'],
-                    'Resolution_Code': failure_details['Resolution_Code'],
-                    'Cause_Description_English': failure_details['Cause_Description_English'],
-                    'Cause_Description_Arabic': failure_details['Cause_Description_Arabic'],
-                    'Cause_Code': failure_details['Cause_Code'],
-                    'Description_English': f"{selected_system} - {selected_subsystem} - {selected_component} - {selected_failure}",
-                    'Description_Arabic': f"نظام {selected_system} - نظام فرعي {selected_subsystem}"
-                }
-                
-                # Add to dataframes
-                st.session_state.df_work_orders = pd.concat([
-                    st.session_state.df_work_orders,
-                    pd.DataFrame([new_wo])
-                ], ignore_index=True)
-                
-                st.session_state.df_malfunction = pd.concat([
-                    st.session_state.df_malfunction,
-                    pd.DataFrame([new_malfunction])
-                ], ignore_index=True)
+                new_malfunction = {'Malfunction_Code': failure_details['Malfunction_Code']}
                 
-                # Increment counters
-                st.session_state.work_order_id_counter += 1
-                st.session_state.malfunction_id_counter += 1
+                # Validated, then both rows land under one write lock
+                try:
+                    new_wo = create_work_order(store, new_wo, new_malfunction)
+                except ValidationFailed as e:
+                    st.error("❌ " + "; ".join(format_errors(e.errors)))
+                    return
+                wo_id = new_wo['ID']
                 
                 st.success(f"✅ Work Order **WO-{wo_id:05d}** created successfully!")
                 st.balloons()
@@ -918,35 +1059,31 @@ def page_create_work_order():
                         st.markdown(f"**Status:** Open")
                         st.markdown(f"**Require Parts:** {'Yes' if require_parts else 'No'}")
 
+@timed('page')
 def page_my_work_orders():
     """Page for technicians to view their work orders"""
     st.title("📋 My Work Orders")
     
     user = st.session_state.current_user
+    store = get_store()
     
-    # Filter work orders by technician
-    df_wo = st.session_state.df_work_orders[
-        st.session_state.df_work_orders['Employee_ID'] == user['Employee_ID']
-    ].copy()
+    # Vehicle options come from the technician's own work orders
+    vehicles = work_order_list(store, employee_id=user['Employee_ID'])['vehicles']
     
     # Filters
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         status_filter = st.selectbox("Filter by Status", ['All', 'Open', 'In Progress', 'Completed'])
     
     with col2:
-        if not df_wo.empty:
-            vehicle_filter = st.selectbox("Filter by Vehicle", ['All'] + sorted(df_wo['Vehicle_Number'].unique().tolist()))
-        else:
-            vehicle_filter = st.selectbox("Filter by Vehicle", ['All'])
+        vehicle_filter = st.selectbox("Filter by Vehicle", ['All'] + vehicles)
     
-    # Apply filters
-    if status_filter != 'All':
-        df_wo = df_wo[df_wo['Work_Order_Status'] == status_filter]
+    with col3:
+        search = st.text_input("Search", placeholder="WO number, vehicle, code or description")
     
-    if vehicle_filter != 'All':
-        df_wo = df_wo[df_wo['Vehicle_Number'] == vehicle_filter]
+    df_wo = work_order_list(store, employee_id=user['Employee_ID'],
+                            status=status_filter, vehicle=vehicle_filter, search=search)['work_orders']
     
     st.info(f"Showing {len(df_wo)} work orders")
     
@@ -954,263 +1091,171 @@ def page_my_work_orders():
     if df_wo.empty:
         st.warning("No work orders found")
     else:
-        for idx, wo in df_wo.iterrows():
-            with st.expander(f"WO-{wo['ID']:05d} - {wo['Vehicle_Number']} - {wo['Work_Order_Status']}"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown(f"**Work Order ID:** WO-{wo['ID']:05d}")
-                    st.markdown(f"**AIC Number:** {wo['AIC_Work_Order_Number']}")
-                    st.markdown(f"**Vehicle:** {wo['Vehicle_Number']}")
-                    st.markdown(f"**Workshop:** {wo['Workshop_Name']}")
-                    st.markdown(f"**Status:** {wo['Work_Order_Status']}")
-                
-                with col2:
-                    st.markdown(f"**Malfunction Date:** {wo['Malfunction_Date']}")
-                    st.markdown(f"**Reception Date:** {wo['AlKhorayef_Reception_Date']}")
-                    st.markdown(f"**Creation Date:** {wo['MNG_Work_Order_Creation_Date']}")
-                    st.markdown(f"**Require Parts:** {'Yes' if wo['Require_Spare_Parts'] else 'No'}")
-                    if wo['Work_Order_Completion_Date']:
-                        st.markdown(f"**Completion Date:** {wo['Work_Order_Completion_Date']}")
-                
-                if wo['Comments']:
-                    st.markdown("**Comments:**")
-                    st.info(wo['Comments'])
+        render_work_order_list(df_wo, 'my_wo', render_work_order_details)
 
+@timed('page')
 def page_supervisor_work_orders():
     """Page for supervisors to manage work orders"""
     st.title("📋 Workshop Work Orders")
     
     user = st.session_state.current_user
+    store = get_store()
     
-    # Filter by supervisor's workshop
-    if user.get('Workshop_Name'):
-        df_wo = st.session_state.df_work_orders[
-            st.session_state.df_work_orders['Workshop_Name'] == user['Workshop_Name']
-        ].copy()
-    else:
-        df_wo = st.session_state.df_work_orders.copy()
+    # Vehicle options come from the supervisor's workshop
+    workshop = user.get('Workshop_Name')
+    vehicles = work_order_list(store, workshop=workshop)['vehicles']
     
     # Filters
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         status_filter = st.selectbox("Filter by Status", ['All', 'Open', 'In Progress', 'Completed'])
     
     with col2:
-        if not df_wo.empty:
-            vehicle_filter = st.selectbox("Filter by Vehicle", ['All'] + sorted(df_wo['Vehicle_Number'].unique().tolist()))
-        else:
-            vehicle_filter = st.selectbox("Filter by Vehicle", ['All'])
+        vehicle_filter = st.selectbox("Filter by Vehicle", ['All'] + vehicles)
     
-    # Apply filters
-    if status_filter != 'All':
-        df_wo = df_wo[df_wo['Work_Order_Status'] == status_filter]
+    with col3:
+        search = st.text_input("Search", placeholder="WO number, vehicle, code or description")
     
-    if vehicle_filter != 'All':
-        df_wo = df_wo[df_wo['Vehicle_Number'] == vehicle_filter]
+    df_wo = work_order_list(store, workshop=workshop,
+                            status=status_filter, vehicle=vehicle_filter, search=search)['work_orders']
     
     st.info(f"Showing {len(df_wo)} work orders")
     
+    batch_mode = st.toggle("✏️ Batch edit (change many orders, apply once)", key="supervisor_wo_batch")
+    
     # Display work orders with edit capability
     if df_wo.empty:
         st.warning("No work orders found")
+    elif batch_mode:
+        render_bulk_status_editor(paginate(df_wo, 'supervisor_bulk'), user)
     else:
-        for idx, wo in df_wo.iterrows():
-            with st.expander(f"WO-{wo['ID']:05d} - {wo['Vehicle_Number']} - {wo['Work_Order_Status']}"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown(f"**Work Order ID:** WO-{wo['ID']:05d}")
-                    st.markdown(f"**AIC Number:** {wo['AIC_Work_Order_Number']}")
-                    st.markdown(f"**Vehicle:** {wo['Vehicle_Number']}")
-                    st.markdown(f"**Technician:** {wo['Technician_Name']}")
-                    st.markdown(f"**Malfunction Date:** {wo['Malfunction_Date']}")
-                
-                with col2:
-                    # Editable status
-                    new_status = st.selectbox(
-                        "Status",
-                        ['Open', 'In Progress', 'Completed'],
-                        index=['Open', 'In Progress', 'Completed'].index(wo['Work_Order_Status']),
-                        key=f"status_{wo['ID']}"
-                    )
-                    
-                    completion_date = None
-                    if new_status == 'Completed':
-                        completion_date = st.date_input(
-                            "Completion Date",
-                            value=datetime.strptime(wo['Work_Order_Completion_Date'], '%Y-%m-%d') if wo['Work_Order_Completion_Date'] else datetime.now(),
-                            key=f"completion_{wo['ID']}"
-                        )
-                    
-                    new_comments = st.text_area(
-                        "Comments",
-                        value=wo['Comments'] if wo['Comments'] else '',
-                        key=f"comments_{wo['ID']}"
-                    )
-                
-                # Update button
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if st.button("💾 Update", key=f"update_{wo['ID']}", use_container_width=True):
-                        # Update work order
-                        st.session_state.df_work_orders.loc[
-                            st.session_state.df_work_orders['ID'] == wo['ID'],
-                            'Work_Order_Status'
-                        ] = new_status
-                        
-                        st.session_state.df_work_orders.loc[
-                            st.session_state.df_work_orders['ID'] == wo['ID'],
-                            'Comments'
-                        ] = new_comments
-                        
-                        if new_status == 'Completed' and completion_date:
-                            st.session_state.df_work_orders.loc[
-                                st.session_state.df_work_orders['ID'] == wo['ID'],
-                                'Work_Order_Completion_Date'
-                            ] = completion_date.strftime('%Y-%m-%d')
-                        
-                        st.success("✅ Work order updated!")
-                        st.rerun()
-                
-                with col2:
-                    if wo['Require_Spare_Parts'] and st.button("📦 Create Supply Request", key=f"supply_{wo['ID']}", use_container_width=True):
-                        st.info("Supply request feature - to be implemented")
+        render_work_order_list(df_wo, 'supervisor_wo', render_work_order_editor)
 
+@timed('page')
 def page_manager_dashboard():
     """Page for managers to view all sites"""
     st.title("📊 Manager Dashboard - All Sites")
     
-    df_wo = st.session_state.df_work_orders.copy()
-    
-    # Filters
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        regions = ['All'] + sorted(st.session_state.df_region['Region'].tolist())
-        region_filter = st.selectbox("Region", regions)
-    
-    with col2:
-        workshops = ['All'] + sorted(st.session_state.df_workshop['Workshop_Name'].tolist())
-        workshop_filter = st.selectbox("Workshop", workshops)
-    
-    with col3:
-        status_filter = st.selectbox("Status", ['All', 'Open', 'In Progress', 'Completed'])
-    
-    with col4:
-        systems = ['All'] + sorted(st.session_state.df_failure_catalogue['System'].unique().tolist())
-        system_filter = st.selectbox("System", systems)
-    
-    # Apply filters
-    if workshop_filter != 'All':
-        df_wo = df_wo[df_wo['Workshop_Name'] == workshop_filter]
-    elif region_filter != 'All':
-        workshops_in_region = st.session_state.df_workshop[
-            st.session_state.df_workshop['Region'] == region_filter
-        ]['Workshop_Name'].tolist()
-        df_wo = df_wo[df_wo['Workshop_Name'].isin(workshops_in_region)]
-    
-    if status_filter != 'All':
-        df_wo = df_wo[df_wo['Work_Order_Status'] == status_filter]
-    
-    if system_filter != 'All':
-        df_wo = df_wo[df_wo['Malfunction_Type'] == system_filter]
-    
-    # KPIs
-    st.markdown("---")
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    with col1:
-        st.metric("Total WOs", len(df_wo))
-    
-    with col2:
-        st.metric("Open", len(df_wo[df_wo['Work_Order_Status'] == 'Open']))
+    store = get_store()
     
-    with col3:
-        st.metric("In Progress", len(df_wo[df_wo['Work_Order_Status'] == 'In Progress']))
+    with span('manager_filters', 'widgets'):
+        # Filters
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            regions = ['All'] + sorted(store.table('region')['Region'].tolist())
+            region_filter = st.selectbox("Region", regions)
+        
+        with col2:
+            workshops = ['All'] + sorted(store.table('workshop')['Workshop_Name'].tolist())
+            workshop_filter = st.selectbox("Workshop", workshops)
+        
+        with col3:
+            status_filter = st.selectbox("Status", ['All', 'Open', 'In Progress', 'Completed'])
+        
+        with col4:
+            systems = ['All'] + get_cascading_options()
+            system_filter = st.selectbox("System", systems)
+        
+    # Apply filters (cached until work orders or malfunctions change)
+    filters = dict(region=region_filter, workshop=workshop_filter, status=status_filter, system=system_filter)
+    summary = manager_summary(store, **filters)
+    df_wo = summary['work_orders']
+    status_counts = work_order_counters(store).counts('Work_Order_Status', **filters)
+    
+    with span('manager_kpis', 'widgets'):
+        # KPIs
+        st.markdown("---")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        
+        with col1:
+            st.metric("Total WOs", int(status_counts.sum()))
+        
+        with col2:
+            st.metric("Open", int(status_counts.get('Open', 0)))
+        
+        with col3:
+            st.metric("In Progress", int(status_counts.get('In Progress', 0)))
+        
+        with col4:
+            st.metric("Completed", int(status_counts.get('Completed', 0)))
+        
+        with col5:
+            # Average completion time
+            if summary['avg_days'] is not None:
+                st.metric("Avg Days to Complete", f"{summary['avg_days']:.1f}")
+            else:
+                st.metric("Avg Days to Complete", "N/A")
     
-    with col4:
-        st.metric("Completed", len(df_wo[df_wo['Work_Order_Status'] == 'Completed']))
-    
-    with col5:
-        # Average completion time
-        completed = df_wo[df_wo['Work_Order_Status'] == 'Completed'].copy()
-        if not completed.empty and completed['Work_Order_Completion_Date'].notna().any():
-            completed['creation_date'] = pd.to_datetime(completed['MNG_Work_Order_Creation_Date'])
-            completed['completion_date'] = pd.to_datetime(completed['Work_Order_Completion_Date'])
-            completed['days'] = (completed['completion_date'] - completed['creation_date']).dt.days
-            avg_days = completed['days'].mean()
-            st.metric("Avg Days to Complete", f"{avg_days:.1f}")
+    with span('manager_top_failures', 'widgets'):
+        # Top failure modes
+        st.markdown("---")
+        st.subheader("Top 5 Malfunction Types")
+        
+        if not summary['top_failures'].empty:
+            st.bar_chart(summary['top_failures'])
         else:
-            st.metric("Avg Days to Complete", "N/A")
+            st.info("No data available")
     
-    # Top failure modes
-    st.markdown("---")
-    st.subheader("Top 5 Malfunction Types")
+    with span('manager_reliability', 'widgets'):
+        render_reliability(store, region_filter, workshop_filter, system_filter)
     
-    mal_df = st.session_state.df_malfunction[
-        st.session_state.df_malfunction['Work_Order_ID'].isin(df_wo['ID'])
-    ]
-    
-    if not mal_df.empty:
-        top_failures = mal_df['Malfunction_Code'].value_counts().head(5)
-        st.bar_chart(top_failures)
-    else:
-        st.info("No data available")
-    
-    # Work orders table
-    st.markdown("---")
-    st.subheader("Work Orders")
-    
-    display_cols = ['ID', 'AIC_Work_Order_Number', 'Vehicle_Number', 'Workshop_Name', 'Work_Order_Status',
-                   'Malfunction_Date', 'Technician_Name', 'Require_Spare_Parts']
+    with span('manager_table', 'widgets'):
+        # Work orders table
+        st.markdown("---")
+        st.subheader("Work Orders")
+        
+        search = st.text_input("Search work orders", placeholder="WO number, vehicle, code or description (English / Arabic)")
+        if search.strip():
+            df_wo = df_wo[df_wo['ID'].isin(search_work_orders(store, search))]
+            st.caption(f"{len(df_wo)} matching work orders")
+        
+        display_cols = ['ID', 'AIC_Work_Order_Number', 'Vehicle_Number', 'Workshop_Name', 'Work_Order_Status',
+                       'Malfunction_Date', 'Technician_Name', 'Require_Spare_Parts']
+        
+        st.dataframe(
+            df_wo[display_cols],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'ID': 'WO ID',
+                'AIC_Work_Order_Number': 'AIC Number',
+                'Vehicle_Number': 'Vehicle',
+                'Workshop_Name': 'Workshop',
+                'Work_Order_Status': 'Status',
+                'Malfunction_Date': st.column_config.DateColumn('Malfunction Date', format='YYYY-MM-DD'),
+                'Technician_Name': 'Technician',
+                'Require_Spare_Parts': 'Needs Parts'
+            }
+        )
     
-    st.dataframe(
-        df_wo[display_cols],
-        use_container_width=True,
-        hide_index=True,
-        column_config={
-            'ID': 'WO ID',
-            'AIC_Work_Order_Number': 'AIC Number',
-            'Vehicle_Number': 'Vehicle',
-            'Workshop_Name': 'Workshop',
-            'Work_Order_Status': 'Status',
-            'Malfunction_Date': 'Malfunction Date',
-            'Technician_Name': 'Technician',
-            'Require_Spare_Parts': 'Needs Parts'
-        }
-    )
+    with span('manager_export', 'widgets'):
+        render_export_panel(df_wo, 'manager_export')
 
+@timed('page')
 def page_inventory():
     """Page for inventory users"""
     st.title("📦 Inventory Management")
     
-    tab1, tab2, tab3 = st.tabs(["Supply Requests", "Parts Inventory", "Update Quantity"])
+    store = get_store()
     
-    with tab1:
+    # Only the selected section runs (st.tabs would compute every tab on each rerun)
+    section = st.radio(
+        "Section",
+        ["Supply Requests", "Parts Inventory", "Update Quantity", "Bulk Import"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="inventory_section"
+    )
+    
+    if section == "Supply Requests":
         st.subheader("Supply Requests")
         
-        df_sr = st.session_state.df_supply_request.copy()
+        # Joined with work orders and parts, maintained incrementally by the store
+        df_sr = supply_request_view(store).frame()
         
         if not df_sr.empty:
-            # Merge with work orders and parts
-            df_sr = df_sr.merge(
-                st.session_state.df_work_orders[['ID', 'Vehicle_Number', 'Workshop_Name']],
-                left_on='Work_Order_ID',
-                right_on='ID',
-                how='left'
-            )
-            
-            df_sr = df_sr.merge(
-                st.session_state.df_part[['ID', 'Part_Number', 'English_Description']],
-                left_on='Part_ID',
-                right_on='ID',
-                how='left',
-                suffixes=('', '_part')
-            )
-            
             st.dataframe(
                 df_sr[['ID', 'Work_Order_ID', 'Vehicle_Number', 'Workshop_Name', 'Part_Number', 
                       'English_Description', 'Quantity_Requested', 'Status']],
@@ -1235,24 +1280,22 @@ def page_inventory():
         st.subheader("Update Supply Request Status")
         
         sr_id = st.number_input("Supply Request ID", min_value=1, step=1)
-        new_status = st.selectbox("New Status", ['Pending', 'Approved', 'Issued', 'Cancelled'])
+        new_status = st.selectbox("New Status", SUPPLY_REQUEST_STATUSES)
         
         if st.button("Update Status", type="primary"):
-            if sr_id in st.session_state.df_supply_request['ID'].values:
-                st.session_state.df_supply_request.loc[
-                    st.session_state.df_supply_request['ID'] == sr_id,
-                    'Status'
-                ] = new_status
+            try:
+                update_records(store, 'supply_request', {sr_id: {'Status': new_status}})
+            except ValidationFailed as e:
+                st.error("❌ " + "; ".join(format_errors(e.errors)))
+            else:
                 st.success(f"✅ Supply Request {sr_id} updated to {new_status}")
                 st.rerun()
-            else:
-                st.error("❌ Supply Request ID not found")
     
-    with tab2:
+    elif section == "Parts Inventory":
         st.subheader("Parts Inventory")
         
         st.dataframe(
-            st.session_state.df_part,
+            store.table('part'),
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -1260,74 +1303,78 @@ def page_inventory():
             }
         )
     
-    with tab3:
+    elif section == "Update Quantity":
         st.subheader("Update Part Quantity")
         
+        df_part = store.table('part')
+        
         col1, col2 = st.columns(2)
         
         with col1:
             part_id = st.selectbox(
                 "Select Part",
-                st.session_state.df_part['ID'].tolist(),
-                format_func=lambda x: f"{st.session_state.df_part[st.session_state.df_part['ID']==x]['Part_Number'].iloc[0]} - {st.session_state.df_part[st.session_state.df_part['ID']==x]['English_Description'].iloc[0]}"
+                df_part['ID'].tolist(),
+                format_func=lambda x: "{Part_Number} - {English_Description}".format(**store.get('part', x))
             )
         
         with col2:
-            current_qty = st.session_state.df_part[st.session_state.df_part['ID']==part_id]['Part_Quantity'].iloc[0]
+            current_qty = store.get('part', part_id)['Part_Quantity']
             st.metric("Current Quantity", current_qty)
         
         new_qty = st.number_input("New Quantity", min_value=0, value=int(current_qty))
         
         if st.button("Update Quantity", type="primary"):
-            st.session_state.df_part.loc[
-                st.session_state.df_part['ID'] == part_id,
-                'Part_Quantity'
-            ] = new_qty
+            store.update('part', part_id, {'Part_Quantity': new_qty})
             st.success(f"✅ Part {part_id} quantity updated to {new_qty}")
             st.rerun()
+    
+    elif section == "Bulk Import":
+        st.subheader("Import Parts / Stock Sheet")
+        render_bulk_import(
+            'part', 'part_import', st.session_state.current_user,
+            "One row per part, keyed by Part Number. A stock sheet with just Part Number and "
+            "Part Quantity updates quantities; unknown part numbers are added as new parts."
+        )
 
+@timed('page')
 def page_procurement():
     """Page for procurement users"""
     st.title("💼 Procurement")
     
-    tab1, tab2, tab3 = st.tabs(["Supply Requests", "Create PR", "Orders"])
+    store = get_store()
+    
+    tab1, tab2, tab3 = st.tabs(["Parts Shortages", "Create PR", "Orders"])
     
     with tab1:
-        st.subheader("Supply Requests Requiring Purchase")
+        st.subheader("Parts Shortages")
+        st.caption("Open supply request demand per part, net of stock on hand and parts in transit")
         
-        df_sr = st.session_state.df_supply_request[
-            st.session_state.df_supply_request['Status'] == 'Approved'
-        ].copy()
+        df_short = part_shortages(store)
         
-        if not df_sr.empty:
-            # Merge with parts
-            df_sr = df_sr.merge(
-                st.session_state.df_part[['ID', 'Part_Number', 'English_Description', 'Part_Quantity']],
-                left_on='Part_ID',
-                right_on='ID',
-                how='left',
-                suffixes=('', '_part')
-            )
-            
-            # Show only those needing purchase
-            df_sr['Needs_Purchase'] = df_sr['Part_Quantity'] < df_sr['Quantity_Requested']
-            df_sr = df_sr[df_sr['Needs_Purchase']]
+        if not df_short.empty:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Parts Short", len(df_short))
+            with col2:
+                st.metric("Units Short", int(df_short['Shortage'].sum()))
             
             st.dataframe(
-                df_sr[['ID', 'Part_Number', 'English_Description', 
-                      'Quantity_Requested', 'Part_Quantity']],
+                df_short,
                 use_container_width=True,
                 hide_index=True,
                 column_config={
-                    'ID': 'SR ID',
+                    'Part_ID': 'Part ID',
                     'Part_Number': 'Part Number',
                     'English_Description': 'Description',
-                    'Quantity_Requested': 'Qty Needed',
-                    'Part_Quantity': 'In Stock'
+                    'Open_Requests': 'Open SRs',
+                    'Demand': 'Qty Needed',
+                    'On_Hand': 'In Stock',
+                    'In_Transit': 'In Transit',
+                    'Shortage': 'Shortage'
                 }
             )
         else:
-            st.info("No approved supply requests requiring purchase")
+            st.info("No parts shortages: open demand is covered by stock and orders in transit")
     
     with tab2:
         st.subheader("Create Purchase Request")
@@ -1340,34 +1387,19 @@ def page_procurement():
             submitted = st.form_submit_button("Create PR", type="primary")
             
             if submitted:
-                if supply_request_id in st.session_state.df_supply_request['ID'].values:
-                    pr_id = st.session_state.purchase_request_id_counter
-                    
-                    new_pr = {
-                        'ID': pr_id,
-                        'Supply_Request_ID': supply_request_id,
-                        'Employee_ID': user['Employee_ID'],
-                        'PR_Date': datetime.now().strftime('%Y-%m-%d'),
-                        'Status': 'Pending'
-                    }
-                    
-                    st.session_state.df_purchase_request = pd.concat([
-                        st.session_state.df_purchase_request,
-                        pd.DataFrame([new_pr])
-                    ], ignore_index=True)
-                    
-                    st.session_state.purchase_request_id_counter += 1
-                    
-                    st.success(f"✅ Purchase Request PR-{pr_id:05d} created!")
-                    st.rerun()
+                try:
+                    new_pr = create_purchase_request(store, supply_request_id, user['Employee_ID'])
+                except ValidationFailed as e:
+                    st.error("❌ " + "; ".join(format_errors(e.errors)))
                 else:
-                    st.error("❌ Supply Request ID not found")
+                    st.success(f"✅ Purchase Request PR-{new_pr['ID']:05d} created!")
+                    st.rerun()
     
     with tab3:
         st.subheader("Purchase Orders")
         
         st.dataframe(
-            st.session_state.df_orders,
+            store.table('orders'),
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -1379,17 +1411,20 @@ def page_procurement():
             }
         )
 
+@timed('page')
 def page_admin_catalogue():
     """Page for admin to manage failure catalogue"""
     st.title("⚙️ Failure Catalogue Management")
     
-    tab1, tab2 = st.tabs(["View Catalogue", "Add Entry"])
+    store = get_store()
+    
+    tab1, tab2, tab3 = st.tabs(["View Catalogue", "Add Entry", "Bulk Import"])
     
     with tab1:
         st.subheader("Current Failure Catalogue")
         
         st.dataframe(
-            st.session_state.df_failure_catalogue,
+            store.table('failure_catalogue'),
             use_container_width=True,
             hide_index=True
         )
@@ -1420,6 +1455,7 @@ def page_admin_catalogue():
                 if all([system, subsystem, component, failure_mode, malfunction_code, 
                        cause_code, resolution_code, resolution_desc_en, resolution_desc_ar]):
                     
+                    # Cause descriptions default to "<Component> <Failure Mode>" in the model
                     new_entry = {
                         'System': system,
                         'Subsystem': subsystem,
@@ -1429,28 +1465,37 @@ def page_admin_catalogue():
                         'Cause_Code': cause_code,
                         'Resolution_Code': resolution_code,
                         'Resolution_Description_English': resolution_desc_en,
-                        'Resolution_Description_Arabic': resolution_desc_ar,
-                        'Cause_Description_English': f'{component} {failure_mode}',
-                        'Cause_Description_Arabic': f'{component} {failure_mode}'
+                        'Resolution_Description_Arabic': resolution_desc_ar
                     }
                     
-                    st.session_state.df_failure_catalogue = pd.concat([
-                        st.session_state.df_failure_catalogue,
-                        pd.DataFrame([new_entry])
-                    ], ignore_index=True)
+                    created, errors = insert_records(store, 'failure_catalogue', [new_entry])
                     
-                    st.success("✅ Catalogue entry added successfully!")
-                    st.balloons()
+                    if errors:
+                        st.error("❌ " + "; ".join(format_errors(errors)))
+                    else:
+                        st.success("✅ Catalogue entry added successfully!")
+                        st.balloons()
                 else:
                     st.error("❌ Please fill in all required fields")
+    
+    with tab3:
+        st.subheader("Import Catalogue Sheet")
+        render_bulk_import(
+            'failure_catalogue', 'catalogue_import', st.session_state.current_user,
+            "Columns: System, Subsystem, Component, Failure Mode, Malfunction Code, Cause Code, "
+            "Resolution Code and the English / Arabic resolution descriptions."
+        )
 
+@timed('page')
 def page_admin_users():
     """Page for admin to view users"""
     st.title("👥 User Management")
     
+    store = get_store()
+    
     st.subheader("All Users")
     st.dataframe(
-        st.session_state.df_user,
+        store.table('user'),
         use_container_width=True,
         hide_index=True
     )
@@ -1461,8 +1506,8 @@ def page_admin_users():
     
     with col1:
         st.subheader("Technical Users")
-        tech_users = st.session_state.df_technical_user.merge(
-            st.session_state.df_user[['Employee_ID', 'Employee_First_Name', 'Employee_Last_Name']],
+        tech_users = store.table('technical_user').merge(
+            store.table('user')[['Employee_ID', 'Employee_First_Name', 'Employee_Last_Name']],
             on='Employee_ID',
             how='left'
         )
@@ -1474,8 +1519,8 @@ def page_admin_users():
     
     with col2:
         st.subheader("Inventory Users")
-        inv_users = st.session_state.df_inventory_user.merge(
-            st.session_state.df_user[['Employee_ID', 'Employee_First_Name', 'Employee_Last_Name']],
+        inv_users = store.table('inventory_user').merge(
+            store.table('user')[['Employee_ID', 'Employee_First_Name', 'Employee_Last_Name']],
             on='Employee_ID',
             how='left'
         )
@@ -1487,8 +1532,8 @@ def page_admin_users():
     
     with col3:
         st.subheader("Procurement Users")
-        proc_users = st.session_state.df_procurement_user.merge(
-            st.session_state.df_user[['Employee_ID', 'Employee_First_Name', 'Employee_Last_Name']],
+        proc_users = store.table('procurement_user').merge(
+            store.table('user')[['Employee_ID', 'Employee_First_Name', 'Employee_Last_Name']],
             on='Employee_ID',
             how='left'
         )
@@ -1498,6 +1543,99 @@ def page_admin_users():
             hide_index=True
         )
 
+@timed('page')
+def page_admin_diagnostics():
+    """Admin view of rerun timings, query cache and the Prometheus metrics"""
+    st.title("🩺 Diagnostics")
+    
+    store = get_store()
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        enabled = st.toggle("Profile reruns (all sessions)", value=profiler.enabled)
+        if enabled != profiler.enabled:
+            profiler.enabled = enabled
+            st.rerun()
+    
+    with col2:
+        profiler.slow_rerun_ms = st.number_input("Slow rerun threshold (ms)", min_value=1,
+                                                 value=int(profiler.slow_rerun_ms), step=50)
+    
+    if not profiler.enabled:
+        st.info("Profiling is off. Turn it on here or start the app with AMIC_PROFILING=1.")
+    
+    # Query cache
+    st.markdown("---")
+    st.subheader("Query Cache")
+    
+    stats = store.cache.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Entries", stats['entries'])
+    with col2:
+        st.metric("Size (MB)", f"{stats['bytes'] / 2 ** 20:.1f}")
+    with col3:
+        st.metric("Hits", stats['hits'])
+    with col4:
+        st.metric("Misses", stats['misses'])
+    
+    # Recent reruns (the current one is still running, so it is not listed yet)
+    reruns = list(profiler.reruns)
+    
+    st.markdown("---")
+    st.subheader("Recent Reruns")
+    
+    if not reruns:
+        st.info("No profiled reruns yet")
+    else:
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    'Started': datetime.fromtimestamp(r['started_at']).strftime('%H:%M:%S'),
+                    'Session Role': r['label'],
+                    'Total (ms)': r['total_ms'],
+                    'Spans': len(r['spans']),
+                    'Slow': r['total_ms'] >= profiler.slow_rerun_ms
+                }
+                for r in reversed(reruns)
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        last = reruns[-1]
+        st.markdown(f"**Last rerun breakdown** ({last['label']}, {last['total_ms']} ms)")
+        spans = sorted(last['spans'], key=lambda sp: sp['offset_ms'])
+        st.dataframe(
+            pd.DataFrame([
+                {'Span': ' ' * sp['depth'] + sp['name'], 'Kind': sp['kind'],
+                 'Start (ms)': sp['offset_ms'], 'Duration (ms)': sp['ms']}
+                for sp in spans
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    # Totals since start
+    st.markdown("---")
+    st.subheader("Totals Since Start")
+    
+    totals = profiler.span_totals()
+    if totals:
+        st.dataframe(
+            pd.DataFrame(totals, columns=['Kind', 'Span', 'Calls', 'Total (s)', 'Max (s)']),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    with st.expander("Prometheus metrics"):
+        st.code(profiler.prometheus_text({f'query_cache_{k}': v for k, v in stats.items()}), language='text')
+    
+    if st.button("Reset timings"):
+        profiler.reset()
+        st.rerun()
+
 # ============================================================================
 # SIDEBAR NAVIGATION
 # ============================================================================
@@ -1534,6 +1672,12 @@ def main():
     
     st.markdown("---")
     
+    # A read-only dashboard replica holds only the columns the dashboard shows
+    if get_store().read_only:
+        st.caption("Read-only dashboard")
+        page_dashboard()
+        return
+    
     # Navigation based on role
     if user['Role'] == 'Technician':
         selected = st.radio(
@@ -1602,7 +1746,7 @@ def main():
     elif user['Role'] == 'Admin':
         selected = st.radio(
             "Navigation",
-            ['📊 Dashboard', '⚙️ Failure Catalogue', '👥 Users'],
+            ['📊 Dashboard', '⚙️ Failure Catalogue', '👥 Users', '🩺 Diagnostics'],
             horizontal=True
         )
         
@@ -1610,8 +1754,12 @@ def main():
             page_admin_catalogue()
         elif '👥 Users' in selected:
             page_admin_users()
+        elif '🩺 Diagnostics' in selected:
+            page_admin_diagnostics()
         else:
             page_dashboard()
 
 if __name__ == "__main__":
-    main()
+    role = st.session_state.current_user['Role'] if st.session_state.get('logged_in') else 'login'
+    with profiler.rerun(role):
+        main()
@@ -0,0 +1,339 @@
+"""
+AMIC MMS - Page Benchmarks
+Renders each page headless with AppTest against generated datasets and checks
+wall time, peak memory and pandas operation counts against a stored baseline
+
+Usage:
+    python benchmark.py --sizes 1000 100000                # report only
+    python benchmark.py --sizes 1000 100000 --save-baseline
+    python benchmark.py --sizes 1000 100000 --baseline benchmark_baseline.json
+    python benchmark.py --queries --sizes 1000000          # store vs SQL query latency
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import func, select
+from streamlit.testing.v1 import AppTest
+
+from analytics import daily_rollup, recent_work_orders, work_order_counters, work_order_list, work_order_trends
+from data_store import DataStore, set_store
+from generate_data import generate_tables
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+# Page function -> (role, employee ID, workshop) of the demo user it is rendered for
+PAGES = {
+    'page_dashboard': ('Manager', 6, None),
+    'page_manager_dashboard': ('Manager', 6, None),
+    'page_my_work_orders': ('Technician', 1, 'Workshop Alpha'),
+    'page_supervisor_work_orders': ('Supervisor', 2, 'Workshop Alpha'),
+    'page_inventory': ('Inventory', 4, None),
+    'page_procurement': ('Procurement', 5, None),
+    'page_admin_catalogue': ('Admin', 8, None),
+}
+
+# Calls counted as "pandas operations" (row selection, reshaping and scans)
+COUNTED_METHODS = {
+    pd.DataFrame: ['__getitem__', 'merge', 'groupby', 'sort_values', 'apply', 'iterrows',
+                   'copy', 'query', 'drop_duplicates', 'isin', 'to_dict', 'astype'],
+    pd.Series: ['isin', 'unique', 'value_counts', 'apply', 'map', 'tolist', 'astype', 'sort_values'],
+}
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def _render_page(page, user):
+    """AppTest script: render one page function for a logged-in user
+
+    While tracemalloc is on, the peak it allocates on top of what was live
+    when it started is left in session_state.peak_bytes.
+    """
+    import tracemalloc
+    import streamlit as st
+    import app
+
+    st.session_state.logged_in = True
+    st.session_state.current_user = user
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        live = tracemalloc.get_traced_memory()[0]
+    getattr(app, page)()
+    if tracing:
+        st.session_state.peak_bytes = tracemalloc.get_traced_memory()[1] - live
+
+@contextmanager
+def count_pandas_ops():
+    """Count calls to COUNTED_METHODS while the block runs"""
+    counts = Counter()
+    originals = []
+
+    def wrap(cls, name, method):
+        def counted(*args, **kwargs):
+            counts[f'{cls.__name__}.{name}'] += 1
+            return method(*args, **kwargs)
+        return counted
+
+    for cls, names in COUNTED_METHODS.items():
+        for name in names:
+            method = getattr(cls, name)
+            originals.append((cls, name, method))
+            setattr(cls, name, wrap(cls, name, method))
+    try:
+        yield counts
+    finally:
+        for cls, name, method in originals:
+            setattr(cls, name, method)
+
+def _run(page, user, timeout, trace_memory=False):
+    """Wall time of one script run, plus the page's peak memory in bytes when trace_memory is set
+
+    The peak is taken inside the script thread around the page function
+    alone, so AppTest's own per-run work is left out.
+    """
+    at = AppTest.from_function(_render_page, args=(page, user), default_timeout=timeout)
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        at.run()
+    finally:
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            tracemalloc.stop()
+    if at.exception:
+        raise RuntimeError(f"{page} raised: {at.exception[0].value}")
+    return elapsed, at.session_state['peak_bytes'] if trace_memory else None
+
+def benchmark_page(page, user, fresh_store, repeat=3, timeout=600):
+    """Cold and warm wall time, cold peak memory and cold pandas op count for one page
+
+    fresh_store() installs a newly built store before every cold sample,
+    so maintained views, derived indexes and the query cache all start
+    empty, as after a restart.
+    """
+    fresh_store()
+    wall_cold, _ = _run(page, user, timeout)
+    warm = [_run(page, user, timeout)[0] for _ in range(repeat)]
+
+    fresh_store()
+    _, peak = _run(page, user, timeout, trace_memory=True)
+
+    fresh_store()
+    with count_pandas_ops() as counts:
+        _run(page, user, timeout)
+
+    return {
+        'wall_cold_s': round(wall_cold, 4),
+        'wall_warm_s': round(statistics.median(warm), 4),
+        'peak_mb': round(peak / 2 ** 20, 2),
+        'pandas_ops': sum(counts.values()),
+    }
+
+def run_benchmarks(sizes, pages, repeat=3, seed=0, workshops=None, vehicles=None):
+    """Results keyed by '<page>@<size>'"""
+    results = {}
+    warmed_up = False
+    for size in sizes:
+        tables = generate_tables(size, workshops, vehicles, seed)
+
+        def fresh_store():
+            store = DataStore(tables)
+            set_store(store)
+            return store
+
+        started = time.perf_counter()
+        store = fresh_store()
+        print(f"\n{size:,} work orders (store built in {time.perf_counter() - started:.1f}s)")
+
+        for page in pages:
+            role, employee_id, workshop = PAGES[page]
+            user = {**store.get('user', employee_id, key_col='Employee_ID'),
+                    'Role': role, 'Workshop_Name': workshop}
+
+            if not warmed_up:
+                # The first script run pays for importing app; keep that out of the numbers
+                _run(page, user, timeout=600)
+                warmed_up = True
+
+            result = benchmark_page(page, user, fresh_store, repeat)
+            results[f'{page}@{size}'] = result
+            print(f"  {page:<30} cold {result['wall_cold_s']:>8.3f}s  warm {result['wall_warm_s']:>8.3f}s  "
+                  f"peak {result['peak_mb']:>8.1f} MB  pandas ops {result['pandas_ops']:>6}")
+    return results
+
+# ============================================================================
+# QUERY LATENCY (shared store vs the same queries pushed into SQL)
+# ============================================================================
+
+# Reads behind one page load must stay under this
+QUERY_TARGET_S = 0.1
+
+LIST_PAGE_SIZE = 25
+
+def store_queries(store, workshop, employee_id, start, end):
+    """The store reads behind page_dashboard() and the work-order lists"""
+    return {
+        'dashboard_status_counts': lambda: work_order_counters(store).counts('Work_Order_Status'),
+        'dashboard_recent': lambda: recent_work_orders(store),
+        'dashboard_trends': lambda: work_order_trends(store, start, end),
+        'list_workshop_page': lambda: work_order_list(store, workshop=workshop)['work_orders'].iloc[:LIST_PAGE_SIZE],
+        'list_technician_page': lambda: work_order_list(store, employee_id=employee_id)['work_orders'].iloc[:LIST_PAGE_SIZE],
+    }
+
+def sql_queries(engine, workshop, employee_id, start, end):
+    """The same reads as SQL aggregation and LIMIT paging"""
+    from storage import WorkOrder
+
+    created = WorkOrder.MNG_Work_Order_Creation_Date
+    statements = {
+        'dashboard_status_counts': select(WorkOrder.Work_Order_Status, func.count()).group_by(WorkOrder.Work_Order_Status),
+        'dashboard_recent': select(WorkOrder).order_by(WorkOrder.ID).limit(10),
+        'dashboard_trends': select(created, func.count()).where(created.between(start, end)).group_by(created),
+        'list_workshop_page': select(WorkOrder).where(WorkOrder.Workshop_Name == workshop)
+                              .order_by(WorkOrder.ID).limit(LIST_PAGE_SIZE),
+        'list_technician_page': select(WorkOrder).where(WorkOrder.Employee_ID == employee_id)
+                                .order_by(WorkOrder.ID).limit(LIST_PAGE_SIZE),
+    }
+
+    def run(stmt):
+        with engine.connect() as conn:
+            return conn.execute(stmt).all()
+
+    return {name: (lambda stmt=stmt: run(stmt)) for name, stmt in statements.items()}
+
+def _time_run(query):
+    started = time.perf_counter()
+    query()
+    return time.perf_counter() - started
+
+def _time_after_write(store, query, repeat):
+    """Median time of query, each run right after a status change invalidated its cached results"""
+    times = []
+    for i in range(repeat):
+        completed = pd.Timestamp.now().normalize() if i % 2 else None
+        store.update('work_orders', 1, {'Work_Order_Status': 'Completed' if completed else 'Open',
+                                        'Work_Order_Completion_Date': completed})
+        times.append(_time_run(query))
+    return statistics.median(times)
+
+def run_query_benchmarks(sizes, repeat=3, seed=0, workshops=None, vehicles=None, database_url=None):
+    """Store and SQL latency of the dashboard and list queries, keyed by '<query>@<size>'
+
+    The store side is timed after a write, so cached results are never
+    reused; its maintained views are built once up front, as at startup.
+    """
+    from storage import SqlBackend, get_engine
+
+    results = {}
+    start, end = pd.Timestamp.now().normalize() - pd.Timedelta(days=90), pd.Timestamp.now().normalize()
+    for size in sizes:
+        tables = generate_tables(size, workshops, vehicles, seed)
+        store = DataStore(tables)
+        work_order_counters(store)
+        daily_rollup(store)
+        workshop = store.table('workshop')['Workshop_Name'].iloc[0]
+        employee_id = int(store.table('work_orders')['Employee_ID'].iloc[0])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = get_engine(database_url or f"sqlite:///{tmp}/benchmark.db")
+            SqlBackend(engine).seed(tables)
+            sql = sql_queries(engine, workshop, employee_id, start.date(), end.date())
+
+            print(f"\n{size:,} work orders (target {QUERY_TARGET_S * 1000:.0f} ms)")
+            for name, query in store_queries(store, workshop, employee_id, start, end).items():
+                store_s = _time_after_write(store, query, repeat)
+                sql_s = statistics.median(_time_run(sql[name]) for _ in range(repeat))
+                results[f'{name}@{size}'] = {'store_s': round(store_s, 4), 'sql_s': round(sql_s, 4)}
+                flag = '' if store_s <= QUERY_TARGET_S else '  OVER TARGET'
+                print(f"  {name:<26} store {store_s * 1000:>8.1f} ms  sql {sql_s * 1000:>8.1f} ms{flag}")
+            engine.dispose()
+    return results
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+# metric -> absolute slack added on top of the relative tolerance (absorbs timer noise)
+SLACK = {'wall_cold_s': 0.05, 'wall_warm_s': 0.05, 'peak_mb': 1.0, 'pandas_ops': 5}
+
+def find_regressions(results, baseline, tolerance=0.25):
+    """Metrics that got worse than baseline * (1 + tolerance) + slack"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric, slack in SLACK.items():
+            limit = previous[metric] * (1 + tolerance) + slack
+            if result[metric] > limit:
+                regressions.append(f"{key} {metric}: {result[metric]} > {limit:.3f} (baseline {previous[metric]})")
+    return regressions
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AMIC MMS pages at scaled data sizes")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000], help="work-order counts to test")
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES))
+    parser.add_argument('--repeat', type=int, default=3, help="warm runs per page (median reported)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workshops', type=int, default=None)
+    parser.add_argument('--vehicles', type=int, default=None)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="write these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown/growth")
+    parser.add_argument('--queries', action='store_true',
+                        help="time the dashboard and list queries in the store and in SQL instead of pages")
+    parser.add_argument('--database-url', default=None, help="database for --queries (a temporary SQLite file by default)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.queries:
+        results = run_query_benchmarks(args.sizes, args.repeat, args.seed, args.workshops, args.vehicles,
+                                       args.database_url)
+        over = [key for key, result in results.items() if result['store_s'] > QUERY_TARGET_S]
+        if over:
+            print(f"\nOver the {QUERY_TARGET_S * 1000:.0f} ms target: {', '.join(over)}")
+            return 1
+        return 0
+
+    results = run_benchmarks(args.sizes, args.pages, args.repeat, args.seed, args.workshops, args.vehicles)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = find_regressions(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+AMIC MMS - Failure Catalogue Index
+Nested System -> Subsystem -> Component -> Failure Mode lookup for the cascading selectors
+"""
+
+# ============================================================================
+# CATALOGUE INDEX
+# ============================================================================
+
+LEVELS = ['System', 'Subsystem', 'Component', 'Failure_Mode']
+
+class CatalogueIndex:
+    """Built once per catalogue version; option lists and detail lookups are O(1)"""
+
+    def __init__(self, df):
+        self._options = {}
+        self._details = {}
+
+        children = {}
+        for record in df.to_dict('records'):
+            path = tuple(record[level] for level in LEVELS)
+            for depth in range(len(LEVELS)):
+                children.setdefault(path[:depth], set()).add(path[depth])
+            # First entry wins, matching the old mask-scan + iloc[0] behaviour
+            self._details.setdefault(path, record)
+
+        # Sort each level once here instead of on every rerun
+        self._options = {prefix: sorted(values) for prefix, values in children.items()}
+
+    def options(self, *path):
+        """Sorted choices for the level below path, e.g. options('HVAC') -> subsystems"""
+        return self._options.get(path, [])
+
+    def details(self, system, subsystem, component, failure_mode):
+        """Catalogue row for a full path, or None"""
+        record = self._details.get((system, subsystem, component, failure_mode))
+        return dict(record) if record is not None else None
+
+    def __len__(self):
+        return len(self._details)
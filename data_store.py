@@ -0,0 +1,915 @@
+"""
+AMIC MMS - Shared Data Store
+One process-wide copy of every ERD table, shared by all Streamlit sessions
+"""
+
+import collections
+import contextlib
+import logging
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from profiling import span
+from query_cache import QueryCache
+from schema import KEY_COLUMNS, ROW_VERSION, VERSIONED_TABLES, apply_schema
+from seed_data import build_tables
+
+log = logging.getLogger(__name__)
+
+# Views handed to sessions share memory with the store; copy-on-write makes
+# any modification on a view copy the touched column instead of leaking back.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+# ============================================================================
+# APPEND-OPTIMIZED TABLE
+# ============================================================================
+
+MIN_CAPACITY = 1024
+
+def _is_missing(value):
+    return value is None or (not isinstance(value, str) and pd.isna(value))
+
+def _codes_dtype(n_categories):
+    """Smallest code dtype pandas uses for this many categories (keeps views zero-copy)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+class _ArrayColumn:
+    """Plain numpy column: numbers, booleans, datetimes or Python objects"""
+
+    def __init__(self, series, capacity):
+        values = series.to_numpy()
+        self.data = np.empty(capacity, dtype=values.dtype)
+        self.data[:len(values)] = values
+        kind = self.data.dtype.kind
+        self.is_date = kind == 'M'
+        self.missing = {'b': False, 'i': 0, 'u': 0, 'f': np.nan, 'M': None}.get(kind)
+
+    def grow(self, n, capacity):
+        data = np.empty(capacity, dtype=self.data.dtype)
+        data[:n] = self.data[:n]
+        self.data = data
+
+    def detach(self):
+        self.data = self.data.copy()
+
+    def _encode(self, values):
+        if self.is_date:
+            return pd.to_datetime(values, errors='coerce').to_numpy(dtype=self.data.dtype)
+        return values
+
+    def write(self, start, values):
+        self.data[start:start + len(values)] = self._encode(values)
+
+    def set(self, positions, value):
+        self.data[positions] = self._encode([value])[0]
+
+    def set_many(self, positions, values):
+        self.data[positions] = self._encode(values)
+
+    def get(self, pos):
+        return pd.Timestamp(self.data[pos]) if self.is_date else self.data[pos]
+
+    def matches(self, n, key):
+        return self.data[:n] == key
+
+    def view(self, n):
+        return pd.Series(self.data[:n], dtype=self.data.dtype, copy=False)
+
+class _CategoricalColumn:
+    """Categorical column stored as integer codes plus a growing category list"""
+
+    missing = None
+
+    def __init__(self, series, capacity):
+        categorical = series.array
+        self.categories = list(categorical.categories)
+        self.ordered = categorical.ordered
+        self._lookup = {value: code for code, value in enumerate(self.categories)}
+        self._dtype = categorical.dtype
+        self.data = np.empty(capacity, dtype=_codes_dtype(len(self.categories)))
+        self.data[:len(categorical)] = categorical.codes
+
+    def grow(self, n, capacity):
+        data = np.empty(capacity, dtype=self.data.dtype)
+        data[:n] = self.data[:n]
+        self.data = data
+
+    def detach(self):
+        self.data = self.data.copy()
+
+    def _code(self, value):
+        if _is_missing(value):
+            return -1
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self._lookup[value] = code
+            self._dtype = pd.CategoricalDtype(self.categories, ordered=self.ordered)
+            if code >= np.iinfo(self.data.dtype).max:
+                self.data = self.data.astype(_codes_dtype(code + 1))
+        return code
+
+    def write(self, start, values):
+        self.data[start:start + len(values)] = [self._code(value) for value in values]
+
+    def set(self, positions, value):
+        self.data[positions] = self._code(value)
+
+    def set_many(self, positions, values):
+        self.data[positions] = [self._code(value) for value in values]
+
+    def get(self, pos):
+        code = self.data[pos]
+        return self.categories[code] if code >= 0 else None
+
+    def matches(self, n, key):
+        code = self._lookup.get(key)
+        if code is None:
+            return np.zeros(n, dtype=bool)
+        return self.data[:n] == code
+
+    def view(self, n):
+        values = pd.Categorical.from_codes(self.data[:n], dtype=self._dtype, validate=False)
+        return pd.Series(values, copy=False)
+
+class _MaskedIntColumn:
+    """Nullable integer column (Int32/Int64): values plus a missing-value mask"""
+
+    missing = None
+
+    def __init__(self, series, capacity):
+        array = series.array
+        self.data = np.zeros(capacity, dtype=array.dtype.numpy_dtype)
+        self.mask = np.ones(capacity, dtype=bool)
+        self.data[:len(array)] = array.to_numpy(dtype=self.data.dtype, na_value=0)
+        self.mask[:len(array)] = array.isna()
+
+    def grow(self, n, capacity):
+        data = np.zeros(capacity, dtype=self.data.dtype)
+        mask = np.ones(capacity, dtype=bool)
+        data[:n] = self.data[:n]
+        mask[:n] = self.mask[:n]
+        self.data, self.mask = data, mask
+
+    def detach(self):
+        self.data, self.mask = self.data.copy(), self.mask.copy()
+
+    def write(self, start, values):
+        end = start + len(values)
+        missing = [_is_missing(value) for value in values]
+        self.mask[start:end] = missing
+        self.data[start:end] = [0 if gap else value for value, gap in zip(values, missing)]
+
+    def set(self, positions, value):
+        self.mask[positions] = _is_missing(value)
+        self.data[positions] = 0 if _is_missing(value) else value
+
+    def set_many(self, positions, values):
+        missing = [_is_missing(value) for value in values]
+        self.mask[positions] = missing
+        self.data[positions] = [0 if gap else value for value, gap in zip(values, missing)]
+
+    def get(self, pos):
+        return pd.NA if self.mask[pos] else self.data[pos]
+
+    def matches(self, n, key):
+        return (self.data[:n] == key) & ~self.mask[:n]
+
+    def view(self, n):
+        return pd.Series(pd.arrays.IntegerArray(self.data[:n], self.mask[:n]), copy=False)
+
+class _HashIndex:
+    """Value -> row positions for one column, kept current by every table write"""
+
+    def __init__(self, series):
+        # Built from the column in bulk: a 1M-row key column would otherwise
+        # cost seconds of per-row add() calls on every startup
+        present = series.notna().to_numpy()
+        positions = np.flatnonzero(present)
+        keys = series[present]
+        repeated = keys.duplicated().to_numpy()
+        self._first = dict(zip(keys[~repeated].tolist(), positions[~repeated].tolist()))
+        self._more = {}
+        for key, pos in zip(keys[repeated].tolist(), positions[repeated].tolist()):
+            self._more.setdefault(key, []).append(pos)
+
+    def add(self, key, pos):
+        if _is_missing(key):
+            return
+        first = self._first.setdefault(key, pos)
+        if first != pos:
+            # _first always holds the earliest position (an update can index an older row)
+            if pos < first:
+                self._first[key], pos = pos, first
+            self._more.setdefault(key, []).append(pos)
+
+    def remove(self, key, pos):
+        if _is_missing(key):
+            return
+        more = self._more.get(key, [])
+        if self._first.get(key) == pos:
+            if more:
+                earliest = min(more)
+                more.remove(earliest)
+                self._first[key] = earliest
+            else:
+                del self._first[key]
+        elif pos in more:
+            more.remove(pos)
+        if key in self._more and not more:
+            del self._more[key]
+
+    def first(self, key):
+        """Position of the earliest row with this key, or -1"""
+        return self._first.get(key, -1)
+
+    def lookup(self, key):
+        """All positions with this key, in row order"""
+        first = self._first.get(key)
+        if first is None:
+            return []
+        return sorted([first] + self._more.get(key, []))
+
+def _make_column(series, capacity):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return _CategoricalColumn(series, capacity)
+    if isinstance(series.dtype, pd.core.arrays.integer.IntegerDtype):
+        return _MaskedIntColumn(series, capacity)
+    return _ArrayColumn(series, capacity)
+
+class AppendTable:
+    """Columnar table with amortized O(1) appends and lazy DataFrame consolidation
+
+    Every column lives in its own array with spare capacity that doubles when
+    full (categoricals as codes, nullable ints as values plus a mask). Readers
+    get a DataFrame built over slices of those arrays, so rebuilding it after
+    a write costs O(columns), not O(rows). Appends land past the end of those
+    slices; an update copies a column before its first write after a frame
+    was handed out, so frames never change. Indexed columns answer key
+    lookups from a hash index instead of scanning the column.
+    """
+
+    def __init__(self, df, indexes=()):
+        self.columns = list(df.columns)
+        self._n = len(df)
+        self._capacity = max(MIN_CAPACITY, self._n)
+        self._columns = {col: _make_column(df[col], self._capacity) for col in self.columns}
+        self._indexes = {col: _HashIndex(df[col]) for col in indexes}
+        self._frame = None
+        self._exposed = set()
+
+    def __len__(self):
+        return self._n
+
+    def _reserve(self, size):
+        if size <= self._capacity:
+            return
+        while self._capacity < size:
+            self._capacity *= 2
+        for column in self._columns.values():
+            column.grow(self._n, self._capacity)
+
+    def append(self, rows):
+        """Write rows (list of dicts) into the spare capacity"""
+        unknown = set().union(*rows) - set(self.columns)
+        if unknown:
+            raise KeyError(f"Unknown columns: {sorted(unknown)}")
+
+        start = self._n
+        self._reserve(start + len(rows))
+        for col, column in self._columns.items():
+            column.write(start, [row.get(col, column.missing) for row in rows])
+        self._n += len(rows)
+        for col in self._indexes:
+            self._index(col, range(start, self._n))
+        self._frame = None
+
+    def positions(self, col, key):
+        """Row positions whose column equals key"""
+        index = self._indexes.get(col)
+        if index is not None:
+            return np.array(index.lookup(key), dtype=np.int64)
+        return np.flatnonzero(self._columns[col].matches(self._n, key))
+
+    def positions_many(self, col, keys):
+        """Row position of the first match for each key, -1 where a key is absent"""
+        index = self._indexes.get(col)
+        if index is not None:
+            return np.array([index.first(key) for key in keys], dtype=np.int64)
+        values = self._columns[col].view(self._n).to_numpy()
+        lookup = pd.Series(np.arange(self._n), index=values)
+        lookup = lookup[~lookup.index.duplicated()]
+        return lookup.reindex(keys).fillna(-1).to_numpy(dtype=np.int64)
+
+    def rows(self, positions):
+        """Rows at the given positions as dicts"""
+        return [{col: column.get(pos) for col, column in self._columns.items()} for pos in positions]
+
+    def _unindex(self, col, positions):
+        index = self._indexes.get(col)
+        if index is not None:
+            column = self._columns[col]
+            for pos in positions:
+                index.remove(column.get(pos), pos)
+
+    def _index(self, col, positions):
+        # Index what was stored (after dtype coercion), not the raw input
+        index = self._indexes.get(col)
+        if index is not None:
+            column = self._columns[col]
+            for pos in positions:
+                index.add(column.get(pos), pos)
+
+    def _writable(self, col):
+        # Frames handed out keep the old array; only this table sees the copy
+        column = self._columns[col]
+        if col in self._exposed:
+            column.detach()
+            self._exposed.discard(col)
+        return column
+
+    def set(self, positions, values):
+        """Overwrite column values at the given row positions"""
+        for col, value in values.items():
+            self._unindex(col, positions)
+            self._writable(col).set(positions, value)
+            self._index(col, positions)
+        self._frame = None
+
+    def set_many(self, positions, rows):
+        """Overwrite each position with its own dict of values, one array write per column"""
+        for col in set().union(*rows):
+            picked = [i for i, row in enumerate(rows) if col in row]
+            self._unindex(col, positions[picked])
+            self._writable(col).set_many(positions[picked], [rows[i][col] for i in picked])
+            self._index(col, positions[picked])
+        self._frame = None
+
+    def buffers(self):
+        """The numpy arrays holding the table's values"""
+        for column in self._columns.values():
+            yield column.data
+            if isinstance(column, _MaskedIntColumn):
+                yield column.mask
+
+    def frame(self):
+        """Consolidated DataFrame over the current rows (built once per write)"""
+        if self._frame is None:
+            data = {col: column.view(self._n) for col, column in self._columns.items()}
+            self._frame = pd.DataFrame(data, columns=self.columns, copy=False)
+            self._exposed = set(self.columns)
+        return self._frame
+
+# ============================================================================
+# DATA STORE
+# ============================================================================
+
+class ConflictError(Exception):
+    """A compare-and-swap update found rows changed since the caller read them"""
+
+    def __init__(self, name, keys):
+        self.name = name
+        self.keys = list(keys)
+        super().__init__(f"{name}: changed by someone else since it was read: {self.keys!r}")
+
+class DataStore:
+    """Thread-safe table store: read-only views for every session, per-table write locks
+
+    Writes to one table are serialized by that table's lock; writes to
+    different tables run concurrently. When a backend is given, every write
+    is persisted through it before the new rows become visible to readers
+    (a journal only queues it; the writer returns once it is on disk).
+    Rows of versioned tables carry a Row_Version that every update bumps,
+    so updates can be made conditional on the version the caller read.
+    A read_only store (tables loaded with only some of their columns)
+    refuses every write.
+    """
+
+    def __init__(self, tables, backend=None, read_only=False):
+        self.backend = backend
+        self.read_only = read_only
+        self._tables = {}
+        self._locks = {}
+        self._versions = {}
+        self._counters = {}
+        self._id_lock = threading.Lock()
+        self._meta_lock = threading.RLock()
+        self._checkpoint_lock = threading.Lock()
+        self._derived = {}
+        self._maintained = {}
+        self._listeners = []
+        self._events = collections.deque()
+        self._dispatch_lock = threading.RLock()
+        self._held = threading.local()
+        self.cache = QueryCache(shared=self._buffer_ids)
+
+        for name, df in tables.items():
+            df = apply_schema(name, df.reset_index(drop=True))
+            if name in VERSIONED_TABLES and ROW_VERSION not in df.columns:
+                df[ROW_VERSION] = np.ones(len(df), dtype=np.int32)
+            indexes = [col for col in ['ID'] + KEY_COLUMNS.get(name, []) if col in df.columns]
+            self._tables[name] = AppendTable(df, indexes)
+            self._locks[name] = threading.RLock()
+            self._versions[name] = 0
+            if 'ID' in df.columns:
+                self._counters[name] = int(df['ID'].max()) + 1 if len(df) else 1
+        self._versioned = {name for name, table in self._tables.items() if ROW_VERSION in table.columns}
+
+    @contextlib.contextmanager
+    def locked(self, *names):
+        """Hold the write locks of several tables for a read-validate-write sequence
+
+        Single writes lock their own table and need no outer lock. Listeners
+        of the writes made inside run once the outermost block has released
+        its locks.
+        """
+        held = self._held
+        held.depth = getattr(held, 'depth', 0) + 1
+        try:
+            locks = self._acquire([self._locks[name] for name in sorted(set(names))])
+            try:
+                yield
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+        finally:
+            held.depth -= 1
+            if not held.depth:
+                try:
+                    if hasattr(self.backend, 'wait_durable'):
+                        # Outside the locks, so the next writer's record joins the same fsync
+                        self.backend.wait_durable()
+                finally:
+                    self._dispatch()
+
+    @staticmethod
+    def _acquire(locks):
+        """Take all locks without waiting for one while holding the others
+
+        A fixed order is not enough: validation reads other tables while
+        holding the written table's lock, in whatever order the foreign
+        keys point. So wait for one lock, try the rest, and on a miss
+        release everything and wait for the busy one first.
+        """
+        first = 0
+        while locks:
+            locks[first].acquire()
+            taken = [locks[first]]
+            for i, lock in enumerate(locks):
+                if i == first:
+                    continue
+                if not lock.acquire(blocking=False):
+                    for held in reversed(taken):
+                        held.release()
+                    first = i
+                    break
+                taken.append(lock)
+            else:
+                return taken
+        return []
+
+    # ------------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------------
+
+    def table(self, name):
+        """Read-only view of a table (shares memory, never mutates the store)"""
+        with self._locks[name]:
+            return self._tables[name].frame().copy(deep=False)
+
+    def version(self, name):
+        """Monotonic version of a table, bumped on every write"""
+        return self._versions[name]
+
+    def get(self, name, key, key_col='ID'):
+        """First row (as a dict) whose key column equals key, or None"""
+        with self._locks[name]:
+            table = self._tables[name]
+            positions = table.positions(key_col, key)
+            return table.rows(positions[:1])[0] if len(positions) else None
+
+    def _buffer_ids(self):
+        # Query results that are views of these cost the cache nothing
+        return {id(buffer) for table in self._tables.values() for buffer in table.buffers()}
+
+    def table_names(self):
+        """Names of all tables in the store"""
+        return list(self._tables)
+
+    def derived(self, key, tables, build):
+        """Structure built from tables, rebuilt only when one of their versions changes"""
+        versions = tuple(self._versions[name] for name in tables)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        with span(key, 'derived'):
+            value = build(*(self.table(name) for name in tables))
+        self._derived[key] = (versions, value)
+        return value
+
+    def maintained(self, key, factory):
+        """Structure built once by factory(store) and then kept current by every write"""
+        with self._meta_lock:
+            value = self._maintained.get(key)
+            if value is None:
+                # No write may land between the build and the subscription
+                with self.locked(*self._tables):
+                    value = factory(self)
+                    self.subscribe(value.on_change)
+                self._maintained[key] = value
+            return value
+
+    def cached_query(self, name, tables, params, compute):
+        """Result of compute(*frames), cached per (table versions, params)"""
+        key = (name, tuple(self._versions[table] for table in tables), params)
+
+        def run():
+            with span(name, 'query'):
+                return compute(*(self.table(table) for table in tables))
+
+        return self.cache.get_or_compute(key, run)
+
+    # ------------------------------------------------------------------------
+    # Writes (serialized per table)
+    # ------------------------------------------------------------------------
+
+    def subscribe(self, listener):
+        """Call listener(name, op, rows, before) after every write, in commit order
+
+        Listeners run after the writer has released its table locks, so
+        they may read any table; what they read can already include writes
+        still queued for them. op is 'insert' or 'update'; for updates, before holds the rows as
+        they were and rows holds them after the change.
+        """
+        with self._meta_lock:
+            self._listeners = self._listeners + [listener]
+
+    def _notify(self, name, op, rows, before=None):
+        # Queued under the table lock, so the queue is in commit order; the
+        # listener list is taken now, so a later subscriber never sees it
+        self._events.append((self._listeners, name, op, rows, before))
+
+    def _dispatch(self):
+        """Deliver queued writes to their listeners, in commit order, holding no table lock
+
+        Listeners read other tables, so calling them under the writer's lock
+        could deadlock against a writer of those tables. A writer's own
+        writes have been delivered when this returns.
+        """
+        with self._dispatch_lock:
+            while self._events:
+                listeners, name, op, rows, before = self._events.popleft()
+                for listener in listeners:
+                    try:
+                        listener(name, op, rows, before)
+                    except Exception:
+                        # The write is committed; one broken view must not fail it or starve the others
+                        log.exception('Store listener failed on %s of %s', op, name)
+
+    def _stamp(self, name, keys, before, changes, expected_versions):
+        """(changes with Row_Version bumped, {key: version read}) for versioned tables
+
+        Raises ConflictError when a key's row no longer has the version in
+        expected_versions. Other tables pass through as (changes, None).
+        """
+        if name not in self._versioned:
+            return changes, None
+        versions = {key: row[ROW_VERSION] for key, row in zip(keys, before)}
+        stale = [key for key, version in (expected_versions or {}).items()
+                 if key in versions and versions[key] != version]
+        if stale:
+            raise ConflictError(name, stale)
+        return {key: dict(changes[key], **{ROW_VERSION: versions[key] + 1}) for key in keys}, versions
+
+    def _check_backend(self, name, stale):
+        if stale:
+            # Another process updated these rows; sync() brings them in
+            raise ConflictError(name, stale)
+
+    def next_id(self, name):
+        """Allocate the next primary key for a table"""
+        return self.next_ids(name, 1)[0]
+
+    def next_ids(self, name, n):
+        """Allocate n consecutive primary keys for a table
+
+        With a shared backend the keys come from the database, so other
+        processes writing the same tables never get the same ones.
+        """
+        if self.backend is not None and hasattr(self.backend, 'allocate_ids'):
+            ids = self.backend.allocate_ids(name, n)
+            if ids is not None:
+                return ids
+        with self._id_lock:
+            start = self._counters[name]
+            self._counters[name] += n
+            return list(range(start, start + n))
+
+    def _advance_counter(self, name, rows):
+        # Rows arriving with their IDs (replays, other processes) must not be handed out again
+        if name in self._counters:
+            top = max((row['ID'] for row in rows if row.get('ID') is not None), default=None)
+            if top is not None:
+                with self._id_lock:
+                    self._counters[name] = max(self._counters[name], int(top) + 1)
+
+    def _check_writable(self, name):
+        if self.read_only:
+            raise PermissionError(f"{name}: the store is read-only")
+
+    def append(self, name, rows):
+        """Append one row (dict) or a list of rows to a table"""
+        self._check_writable(name)
+        if isinstance(rows, dict):
+            rows = [rows]
+        if name in self._versioned:
+            for row in rows:
+                row.setdefault(ROW_VERSION, 1)
+
+        with self.locked(name):
+            if self.backend is not None:
+                self.backend.insert(name, rows)
+            self._tables[name].append(rows)
+            self._advance_counter(name, rows)
+            self._versions[name] += 1
+            self._notify(name, 'insert', rows)
+
+    def update(self, name, key, values, key_col='ID', expected_version=None):
+        """Set column values on the row(s) whose key column equals key
+
+        With expected_version, the update only happens if the row still has
+        that Row_Version; otherwise ConflictError is raised.
+        """
+        self._check_writable(name)
+        with self.locked(name):
+            table = self._tables[name]
+            positions = table.positions(key_col, key)
+            if not len(positions):
+                raise KeyError(f"{name}: no row with {key_col}={key!r}")
+            before = table.rows(positions)
+            expected = None if expected_version is None else {key: expected_version}
+            changes, versions = self._stamp(name, [key], before[:1], {key: values}, expected)
+            values = changes[key]
+            if self.backend is not None:
+                self._check_backend(name, self.backend.update(
+                    name, key, values, key_col, versions[key] if versions else None))
+            table.set(positions, values)
+            self._versions[name] += 1
+            self._notify(name, 'update', table.rows(positions), before)
+
+    def update_many(self, name, changes, key_col='ID', expected_versions=None):
+        """Apply {key: values} to many rows as one write (one version bump, one notification)
+
+        expected_versions ({key: Row_Version}) makes it compare-and-swap:
+        if any of those rows changed since, nothing is written and
+        ConflictError lists them.
+        """
+        self._check_writable(name)
+        if not changes:
+            return
+
+        with self.locked(name):
+            table = self._tables[name]
+            keys = list(changes)
+            positions = table.positions_many(key_col, keys)
+            missing = [key for key, pos in zip(keys, positions) if pos < 0]
+            if missing:
+                raise KeyError(f"{name}: no rows with {key_col} in {missing!r}")
+            before = table.rows(positions)
+            changes, versions = self._stamp(name, keys, before, changes, expected_versions)
+            if self.backend is not None:
+                self._check_backend(name, self.backend.update_many(name, changes, key_col, versions))
+            table.set_many(positions, [changes[key] for key in keys])
+            self._versions[name] += 1
+            self._notify(name, 'update', table.rows(positions), before)
+
+    def merge(self, name, rows, changes, key_col='ID'):
+        """Insert rows and apply {key: values} to existing rows as one write
+
+        The backend persists both in a single transaction, so readers see
+        either none or all of the merge.
+        """
+        self._check_writable(name)
+        if not rows and not changes:
+            return
+        if name in self._versioned:
+            for row in rows:
+                row.setdefault(ROW_VERSION, 1)
+
+        with self.locked(name):
+            table = self._tables[name]
+            keys = list(changes)
+            positions = table.positions_many(key_col, keys)
+            missing = [key for key, pos in zip(keys, positions) if pos < 0]
+            if missing:
+                raise KeyError(f"{name}: no rows with {key_col} in {missing!r}")
+            before = table.rows(positions)
+            changes, versions = self._stamp(name, keys, before, changes, None)
+            if self.backend is not None:
+                self._check_backend(name, self.backend.merge(name, rows, changes, key_col, versions))
+            # Update first: appending leaves existing positions where they are
+            if keys:
+                table.set_many(positions, [changes[key] for key in keys])
+            if rows:
+                table.append(rows)
+                self._advance_counter(name, rows)
+            self._versions[name] += 1
+            if rows:
+                self._notify(name, 'insert', rows)
+            if keys:
+                self._notify(name, 'update', table.rows(positions), before)
+
+    # ------------------------------------------------------------------------
+    # Writes from other processes sharing the backend
+    # ------------------------------------------------------------------------
+
+    def sync(self):
+        """Apply rows other processes committed to the shared backend; returns the number applied
+
+        Each table's rows are fetched and applied under that table's lock, so
+        a row fetched here cannot overwrite a newer local write to the same
+        key. Only one table is locked at a time (listeners may read others).
+        """
+        if self.backend is None or not hasattr(self.backend, 'changes_since'):
+            return 0
+
+        keys_by_table = {}
+        for name, key_col, keys in self.backend.changes_since():
+            if name in self._tables:
+                keys_by_table.setdefault((name, key_col), {}).update(dict.fromkeys(keys))
+
+        applied = 0
+        # Tables in first-change order, so work orders land before their malfunctions
+        for (name, key_col), keys in keys_by_table.items():
+            with self.locked(name):
+                rows = self.backend.fetch(name, list(keys), key_col)
+                if rows:
+                    self._apply_external(name, rows, key_col)
+                    applied += len(rows)
+        return applied
+
+    def _apply_external(self, name, rows, key_col):
+        """Upsert current rows by key: overwrite the ones present, append the rest"""
+        table = self._tables[name]
+        rows = [{col: val for col, val in row.items() if col in table.columns} for row in rows]
+        positions = table.positions_many(key_col, [row[key_col] for row in rows])
+        found = positions >= 0
+        updated = [row for row, present in zip(rows, found) if present]
+        inserted = [row for row, present in zip(rows, found) if not present]
+
+        before = table.rows(positions[found])
+        if updated:
+            table.set_many(positions[found], updated)
+        if inserted:
+            table.append(inserted)
+            self._advance_counter(name, inserted)
+        self._versions[name] += 1
+        if inserted:
+            self._notify(name, 'insert', inserted)
+        if updated:
+            self._notify(name, 'update', table.rows(positions[found]), before)
+
+    def start_sync(self, interval):
+        """Poll the backend for other processes' writes every interval seconds on a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sync()
+                except Exception:
+                    log.exception('Store sync failed')
+
+        threading.Thread(target=run, name='amic-store-sync', daemon=True).start()
+
+    # ------------------------------------------------------------------------
+    # Snapshots of a journalled backend
+    # ------------------------------------------------------------------------
+
+    def checkpoint(self):
+        """Snapshot every table through the backend so its journal can be dropped; returns whether it ran
+
+        Writes pause only while the tables are copied and the backend starts
+        a new journal file; the snapshot itself is written afterwards.
+        """
+        if self.backend is None or not hasattr(self.backend, 'write_snapshot'):
+            return False
+        if not self._checkpoint_lock.acquire(blocking=False):
+            return False
+
+        try:
+            with self.locked(*self._tables):
+                # Frames never change once handed out, so views are a consistent copy
+                tables = {name: table.frame().copy(deep=False) for name, table in self._tables.items()}
+                generation = self.backend.rotate()
+            self.backend.write_snapshot(tables, generation)
+            return True
+        finally:
+            self._checkpoint_lock.release()
+
+    def start_checkpoints(self, interval):
+        """Checkpoint on a daemon thread whenever the backend's journal has grown enough"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.backend.needs_checkpoint():
+                        self.checkpoint()
+                except Exception:
+                    log.exception('Store checkpoint failed')
+
+        threading.Thread(target=run, name='amic-store-checkpoint', daemon=True).start()
+
+# ============================================================================
+# PROCESS-WIDE INSTANCE
+# ============================================================================
+
+_store = None
+_store_lock = threading.Lock()
+
+def open_backend():
+    """Persistence backend selected by $AMIC_STORAGE ('sql' by default, 'journal' or 'memory')"""
+    kind = os.environ.get('AMIC_STORAGE', 'sql')
+
+    if kind == 'memory':
+        return None
+    if kind == 'journal':
+        from journal import JournalBackend
+        return JournalBackend()
+    if kind == 'sql':
+        from storage import SqlBackend, get_engine
+        return SqlBackend(get_engine())
+    raise ValueError(f"Unknown AMIC_STORAGE backend: {kind}")
+
+def load_store(backend=None, snapshot=None, columns=None):
+    """Build a store, restoring persisted tables or seeding an empty backend
+
+    Without a backend, the tables of snapshot (a directory written by
+    snapshot.py) are loaded instead of the demo data. columns
+    ({name: [column, ...]}) loads only those columns of a snapshot's tables
+    into a read-only store. The demo tables are built only to seed an empty
+    backend, or for the tables a backend does not persist.
+    """
+    if backend is None:
+        if snapshot:
+            from snapshot import load_tables
+            tables = load_tables(snapshot, columns)
+        else:
+            tables = build_tables()
+    else:
+        tables = backend.load()
+        if tables is None:
+            tables = build_tables()
+            backend.seed(tables)
+        elif not getattr(backend, 'persists_all_tables', True):
+            # Tables without a model (regions, warehouses, ...) come from the demo data
+            tables = {**build_tables(), **tables}
+
+    store = DataStore(tables, backend, read_only=columns is not None)
+    if hasattr(backend, 'recover'):
+        # Writes journalled after the snapshot that was loaded
+        with span('recover', 'store'):
+            backend.recover(store)
+    return store
+
+def _open_store():
+    snapshot = os.environ.get('AMIC_SNAPSHOT')
+    if os.environ.get('AMIC_READ_ONLY') == '1':
+        # Dashboard replica: only the work-order columns the dashboard shows
+        from analytics import DASHBOARD_COLUMNS
+        if not snapshot:
+            raise ValueError("AMIC_READ_ONLY needs AMIC_SNAPSHOT")
+        return load_store(snapshot=snapshot, columns=DASHBOARD_COLUMNS)
+    return load_store(open_backend(), snapshot)
+
+def set_store(store):
+    """Install a prebuilt store as the shared one (benchmarks and data tools)"""
+    global _store
+
+    with _store_lock:
+        _store = store
+
+def get_store():
+    """Return the shared store, loading it on first use"""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = _open_store()
+                interval = float(os.environ.get('AMIC_SYNC_SECONDS', 2))
+                if hasattr(store.backend, 'changes_since') and interval > 0:
+                    store.start_sync(interval)
+                interval = float(os.environ.get('AMIC_CHECKPOINT_SECONDS', 30))
+                if hasattr(store.backend, 'write_snapshot') and interval > 0:
+                    store.start_checkpoints(interval)
+                _store = store
+    return _store
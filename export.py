@@ -0,0 +1,193 @@
+"""
+AMIC MMS - Data Export
+Chunked XLSX (openpyxl write-only) and CSV export, run on a background thread
+"""
+
+import os
+import tempfile
+import threading
+import weakref
+
+from openpyxl import Workbook
+
+CHUNK_SIZE = 20000
+
+# Excel's sheet limit is 1,048,576 rows; keep one for the header
+XLSX_MAX_ROWS = 1048575
+
+FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+}
+
+# Work order columns carried onto each exported malfunction row
+MALFUNCTION_EXPORT_WO_COLUMNS = ['AIC_Work_Order_Number', 'Workshop_Name', 'Work_Order_Status',
+                                 'Malfunction_Date', 'Technician_Name']
+
+# ============================================================================
+# EXPORT FRAMES
+# ============================================================================
+
+def malfunction_export_frame(df_wo, df_malfunction):
+    """Malfunctions of the given work orders, with work order columns alongside"""
+    df_mal = df_malfunction[df_malfunction['Work_Order_ID'].isin(df_wo['ID'])]
+    return df_mal.merge(
+        df_wo[['ID'] + MALFUNCTION_EXPORT_WO_COLUMNS].rename(columns={'ID': 'Work_Order_ID'}),
+        on='Work_Order_ID',
+        how='left',
+        suffixes=('', '_WO')
+    )
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def iter_chunks(df, chunk_size=CHUNK_SIZE):
+    """Consecutive row slices of at most chunk_size rows"""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+def _cell_rows(chunk):
+    """Row tuples of plain Python values (missing values as None) for openpyxl"""
+    values = chunk.astype(object).where(chunk.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+def write_xlsx(df, path, sheet_name='Export', chunk_size=CHUNK_SIZE, progress=None):
+    """Stream df to an .xlsx file row by row, continuing on new sheets past Excel's row limit"""
+    wb = Workbook(write_only=True)
+    header = [str(col) for col in df.columns]
+    ws = None
+    sheet_rows = XLSX_MAX_ROWS
+    written = 0
+
+    for chunk in iter_chunks(df, chunk_size):
+        for row in _cell_rows(chunk):
+            if sheet_rows == XLSX_MAX_ROWS:
+                ws = wb.create_sheet(sheet_name if ws is None else f"{sheet_name} ({len(wb.worksheets) + 1})")
+                ws.append(header)
+                sheet_rows = 0
+            ws.append(row)
+            sheet_rows += 1
+        written += len(chunk)
+        if progress:
+            progress(written)
+
+    if ws is None:
+        wb.create_sheet(sheet_name).append(header)
+    wb.save(path)
+
+def write_csv(df, path, chunk_size=CHUNK_SIZE, progress=None):
+    """Write df to a UTF-8 CSV (with BOM, so Excel reads Arabic text) one chunk at a time"""
+    written = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        if df.empty:
+            df.to_csv(f, index=False)
+        for chunk in iter_chunks(df, chunk_size):
+            chunk.to_csv(f, index=False, header=written == 0, date_format='%Y-%m-%d')
+            written += len(chunk)
+            if progress:
+                progress(written)
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+class _Discarded(Exception):
+    """Raised into a running export whose file is no longer wanted"""
+
+class ExportJob:
+    """One export written to a temporary file on a daemon thread
+
+    build() runs on the worker too, so joins over large tables do not hold
+    up the script run that started the export. The file is deleted once
+    read(), on cleanup(), or when the job is garbage collected with its
+    session (or the process exits), whichever comes first.
+    """
+
+    def __init__(self, build, fmt, file_name, sheet_name='Export', chunk_size=CHUNK_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        self.fmt = fmt
+        self.file_name = f"{file_name}.{fmt}"
+        self.mime = FORMATS[fmt]
+        self.total_rows = None
+        self.rows_written = 0
+        self.error = None
+        self._build = build
+        self._sheet_name = sheet_name
+        self._chunk_size = chunk_size
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._discarded = False
+
+        fd, self.path = tempfile.mkstemp(prefix='amic_export_', suffix=f'.{fmt}')
+        os.close(fd)
+        self._remove = weakref.finalize(self, _remove, self.path)
+        self._thread = threading.Thread(target=self._run, name='amic-export', daemon=True)
+        self._thread.start()
+
+    def _progress(self, rows):
+        if self._discarded:
+            raise _Discarded()
+        self.rows_written = rows
+
+    def _run(self):
+        try:
+            df = self._build()
+            self.total_rows = len(df)
+            if self.fmt == 'xlsx':
+                write_xlsx(df, self.path, self._sheet_name, self._chunk_size, self._progress)
+            else:
+                write_csv(df, self.path, self._chunk_size, self._progress)
+        except _Discarded:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._lock:
+                if self._discarded:
+                    self._remove()
+                self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def fraction(self):
+        if self.done:
+            return 1.0
+        return self.rows_written / self.total_rows if self.total_rows else 0.0
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def read(self):
+        """Contents of the finished file, which is deleted once read"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.cleanup()
+        return data
+
+    def cleanup(self):
+        """Delete the temporary file; a running worker stops at its next chunk and deletes it"""
+        with self._lock:
+            self._discarded = True
+            if not self.done:
+                return
+        self._remove()
+
+def start_export(build, fmt, file_name, **kwargs):
+    """Start exporting build() in the background; returns the ExportJob to poll"""
+    return ExportJob(build, fmt, file_name, **kwargs)
+
+def export_work_orders(df_wo, fmt, file_name='work_orders'):
+    return start_export(lambda: df_wo, fmt, file_name, sheet_name='Work Orders')
+
+def export_malfunctions(df_wo, df_malfunction, fmt, file_name='malfunctions'):
+    return start_export(lambda: malfunction_export_frame(df_wo, df_malfunction), fmt, file_name,
+                        sheet_name='Malfunctions')
@@ -0,0 +1,71 @@
+"""
+AMIC MMS - Load-Test Data Generator
+Writes a seeded, consistent synthetic dataset straight into the storage layer
+
+Usage:
+    python generate_data.py --work-orders 1000000 --workshops 40 --vehicles 20000 --seed 7
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from seed_data import build_tables, generate_supply_chain, generate_work_orders, scale_reference
+from storage import Base, SqlBackend, get_engine
+
+# ============================================================================
+# GENERATION
+# ============================================================================
+
+def generate_tables(n_work_orders, n_workshops=None, n_vehicles=None, seed=0, days=365):
+    """Every ERD table, with the transactional ones at the requested volume"""
+    rng = np.random.default_rng(seed)
+    tables = scale_reference(build_tables(seed), n_workshops, n_vehicles, rng)
+    
+    tables['work_orders'], tables['malfunction'] = generate_work_orders(tables, n_work_orders, rng, days=days)
+    tables['supply_request'], tables['purchase_request'], tables['orders'] = generate_supply_chain(
+        tables, tables['work_orders'], rng
+    )
+    return tables
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic AMIC MMS data into the database")
+    parser.add_argument('--work-orders', type=int, default=100000, help="number of work orders (one malfunction each)")
+    parser.add_argument('--workshops', type=int, default=None, help="total workshops (default: the demo set)")
+    parser.add_argument('--vehicles', type=int, default=None, help="total vehicles (default: the demo set)")
+    parser.add_argument('--days', type=int, default=365, help="spread malfunction dates over this many past days")
+    parser.add_argument('--seed', type=int, default=0, help="random seed; the same seed gives the same data")
+    parser.add_argument('--database-url', default=None, help="SQLAlchemy URL (default: $AMIC_DATABASE_URL)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="rows per bulk insert")
+    parser.add_argument('--replace', action='store_true', help="drop and recreate tables that already hold data")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    started = time.perf_counter()
+    tables = generate_tables(args.work_orders, args.workshops, args.vehicles, args.seed, args.days)
+    generated = time.perf_counter()
+    print(f"Generated in {generated - started:.1f}s:")
+    for name in ['workshop', 'vehicle', 'work_orders', 'malfunction', 'supply_request', 'purchase_request', 'orders']:
+        print(f"  {name:<18}{len(tables[name]):>10,}")
+    
+    engine = get_engine(args.database_url)
+    if SqlBackend(engine).load() is not None:
+        if not args.replace:
+            print(f"{engine.url} already holds data; pass --replace to overwrite it", file=sys.stderr)
+            return 1
+        Base.metadata.drop_all(engine)
+    
+    SqlBackend(engine).seed(tables, chunk_size=args.chunk_size)
+    print(f"Written to {engine.url} in {time.perf_counter() - generated:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
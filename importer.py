@@ -0,0 +1,172 @@
+"""
+AMIC MMS - Bulk Import
+Streaming XLSX / CSV import of the failure catalogue and parts master, validated in batches
+"""
+
+import csv
+import io
+import re
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from models import CatalogueEntry, PartRecord, validate_batch
+
+BATCH_SIZE = 5000
+
+# Importable tables: row model, natural key, and values for columns a new row leaves out
+IMPORT_TARGETS = {
+    'failure_catalogue': {'model': CatalogueEntry, 'key': 'Malfunction_Code', 'defaults': {}},
+    'part': {'model': PartRecord, 'key': 'Part_Number', 'defaults': {'Part_Quantity': 0}},
+}
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def _header_key(name):
+    return re.sub(r'[\s_]+', '_', str(name).strip()).lower()
+
+def read_sheet(file, file_name):
+    """(header, row iterator) for the first sheet of an .xlsx or a .csv, streamed"""
+    if file_name.lower().endswith('.csv'):
+        rows = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    else:
+        # read_only streams rows from the zipped XML instead of building the workbook
+        wb = load_workbook(file, read_only=True, data_only=True)
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+    header = next(rows, None)
+    return list(header or []), rows
+
+def _records(rows, columns):
+    """(sheet row number, {field: value}) per non-empty row; blank cells are left unset"""
+    for number, row in enumerate(rows, start=2):
+        record = {}
+        for position, field in columns:
+            value = row[position] if position < len(row) else None
+            if value is not None and value != '':
+                record[field] = value
+        if record:
+            yield number, record
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# ============================================================================
+# PLANNING AND MERGING
+# ============================================================================
+
+class ImportPlan:
+    """Validated rows of one uploaded sheet, keyed by the sheet row they came from"""
+
+    def __init__(self, name, file_name):
+        target = IMPORT_TARGETS[name]
+        self.name = name
+        self.file_name = file_name
+        self.key = target['key']
+        self.model = target['model']
+        self.defaults = target['defaults']
+        self.rows_read = 0
+        self.records = []
+        self.errors = []
+        self.ignored_columns = []
+
+    def error_frame(self):
+        return pd.DataFrame(self.errors, columns=['Row', 'Column', 'Error'])
+
+    def split(self, store):
+        """(records for new keys, records for keys already in the table)"""
+        existing = pd.Index(store.table(self.name)[self.key].dropna().astype(str))
+        keys = pd.Index([record[self.key] for record in self.records])
+        is_existing = keys.isin(existing)
+        inserts = [record for record, found in zip(self.records, is_existing) if not found]
+        updates = [record for record, found in zip(self.records, is_existing) if found]
+        return inserts, updates
+
+def plan_import(name, file, file_name, batch_size=BATCH_SIZE):
+    """Read and validate a sheet without touching the store
+
+    Rows are validated batch_size at a time through the model's list
+    adapter. A key that appears on more than one row is rejected on all of
+    them, since there is no telling which row is meant.
+    """
+    plan = ImportPlan(name, file_name)
+    fields = list(plan.model.model_fields)
+    by_header = {_header_key(field): field for field in fields}
+
+    header, rows = read_sheet(file, file_name)
+    columns = []
+    for position, name_in_sheet in enumerate(header):
+        field = by_header.get(_header_key(name_in_sheet)) if name_in_sheet is not None else None
+        if field is None:
+            if name_in_sheet not in (None, ''):
+                plan.ignored_columns.append(str(name_in_sheet))
+        else:
+            columns.append((position, field))
+
+    found = {field for _, field in columns}
+    required = [field for field, info in plan.model.model_fields.items() if info.is_required()]
+    missing = [field for field in required if field not in found]
+    if missing:
+        plan.errors.append((1, ', '.join(missing), 'Required column missing from the header row'))
+        return plan
+
+    for batch in _batches(_records(rows, columns), batch_size):
+        plan.rows_read += len(batch)
+        valid, errors = validate_batch(plan.model, [record for _, record in batch], exclude_unset=True)
+        plan.records.extend((batch[i][0], record) for i, record in valid.items())
+        for i, messages in errors.items():
+            plan.errors.extend((batch[i][0], field, message) for field, message in messages)
+
+    keys = pd.Series([record[plan.key] for _, record in plan.records], dtype=object)
+    duplicated = keys.duplicated(keep=False).to_numpy()
+    if duplicated.any():
+        plan.errors.extend(
+            (row, plan.key, f"Duplicate {plan.key} '{record[plan.key]}' in file")
+            for (row, record), dup in zip(plan.records, duplicated) if dup
+        )
+        plan.records = [item for item, dup in zip(plan.records, duplicated) if not dup]
+
+    plan.errors.sort(key=lambda error: error[0])
+    plan.records = [record for _, record in plan.records]
+    return plan
+
+def apply_import(store, plan, update_existing=True):
+    """Merge a plan's valid rows into the store as one write; returns (inserted, updated, skipped)
+
+    New keys are inserted (with IDs where the table has them) and existing
+    keys get the columns the sheet provided. The new/existing split is
+    redone under the table's lock, so a concurrent edit cannot turn an insert
+    into a duplicate.
+    """
+    columns = list(plan.model.model_fields)
+    with store.locked(plan.name):
+        inserts, updates = plan.split(store)
+        skipped = 0 if update_existing else len(updates)
+        if not update_existing:
+            updates = []
+
+        has_ids = 'ID' in store.table(plan.name).columns
+        ids = iter(store.next_ids(plan.name, len(inserts)) if has_ids and inserts else [])
+        rows = []
+        for record in inserts:
+            row = {col: None for col in columns}
+            row.update(plan.defaults)
+            row.update(record)
+            if has_ids:
+                row['ID'] = next(ids)
+            rows.append(row)
+
+        changes = {record[plan.key]: {col: val for col, val in record.items() if col != plan.key}
+                   for record in updates}
+        store.merge(plan.name, rows, {key: values for key, values in changes.items() if values},
+                    key_col=plan.key)
+
+    return len(rows), len(updates), skipped
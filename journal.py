@@ -0,0 +1,323 @@
+"""
+AMIC MMS - Write-Ahead Journal
+In-memory tables made durable by an append-only mutation log (group-committed fsync) and Arrow snapshots
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import zlib
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from snapshot import load_tables, read_manifest, save_tables
+
+DEFAULT_JOURNAL_DIR = 'amic_journal'
+
+# Journal size after which the next checkpoint writes a fresh snapshot
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+_SNAPSHOT = re.compile(r'^snapshot-(\d{12})$')
+_LOG = re.compile(r'^journal-(\d{12})\.log$')
+
+# ============================================================================
+# RECORDS (one line each: CRC32 of the JSON body, a space, the body)
+# ============================================================================
+
+def _json_value(value):
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (pd.Timestamp, date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def encode_record(record):
+    body = json.dumps(record, default=_json_value, ensure_ascii=False, separators=(',', ':')).encode()
+    return b'%08x ' % zlib.crc32(body) + body + b'\n'
+
+def read_records(path):
+    """(records, byte length of the intact prefix); reading stops at a torn or corrupt line"""
+    records = []
+    good = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n') or len(line) < 10:
+                break
+            body = line[9:-1]
+            try:
+                intact = int(line[:8], 16) == zlib.crc32(body)
+            except ValueError:
+                intact = False
+            if not intact:
+                break
+            records.append(json.loads(body))
+            good += len(line)
+    return records, good
+
+def _replay(store, record):
+    name, key_col = record['table'], record.get('key_col', 'ID')
+    op = record['op']
+    if op == 'insert':
+        store.append(name, record['rows'])
+    elif op == 'update':
+        store.update(name, record['key'], record['values'], key_col)
+    elif op == 'update_many':
+        store.update_many(name, dict(record['changes']), key_col)
+    elif op == 'merge':
+        store.merge(name, record['rows'], dict(record['changes']), key_col)
+    else:
+        raise ValueError(f"Unknown journal record op: {op}")
+
+# ============================================================================
+# GROUP COMMIT
+# ============================================================================
+
+class GroupCommitLog:
+    """Append-only file whose concurrent writers share fsyncs
+
+    append() queues an encoded record and returns its ticket; wait(ticket)
+    returns once the flusher thread has written and fsynced it. Records
+    queued while an fsync is in flight go out together in the next one, so
+    many concurrent writers cost about one fsync per round instead of one
+    each.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'ab')
+        self.size = self._file.tell()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._queued = 0
+        self._synced = 0
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='amic-journal', daemon=True)
+        self._thread.start()
+
+    def append(self, data):
+        """Queue data at the end of the log; returns the ticket to wait() on"""
+        with self._cond:
+            self._check()
+            self._pending.append(data)
+            self._queued += 1
+            self._cond.notify_all()
+            return self._queued
+
+    def wait(self, ticket):
+        """Return once the record with this ticket is on disk"""
+        with self._cond:
+            while self._synced < ticket and self._error is None:
+                self._cond.wait()
+            if self._synced < ticket:
+                self._check()
+
+    def _check(self):
+        if self._error is not None:
+            raise OSError(f"Journal {self.path} is not writable") from self._error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                upto = self._queued
+
+            try:
+                self._file.write(b''.join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self.size += sum(len(data) for data in batch)
+                self._synced = upto
+                self._cond.notify_all()
+
+    def close(self):
+        """Flush what is queued, stop the flusher and close the file"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+
+# ============================================================================
+# STORE BACKEND
+# ============================================================================
+
+class JournalBackend:
+    """Keeps the store's tables durable without a database
+
+    Every write is queued on the current journal file before the store
+    applies it, and the writer returns once it is fsynced; the wait happens
+    after the store has released its table locks, so writers of one table
+    share fsyncs too. A checkpoint switches to a new journal file and
+    snapshots the tables as they were at the switch; older snapshots and
+    journals are deleted once the snapshot is complete. Recovery maps the
+    newest complete snapshot and replays only the journals written after it.
+    """
+
+    def __init__(self, directory=None, checkpoint_bytes=CHECKPOINT_BYTES):
+        self.directory = directory or os.environ.get('AMIC_JOURNAL_DIR', DEFAULT_JOURNAL_DIR)
+        self.checkpoint_bytes = checkpoint_bytes
+        self._generation = 0
+        self._log = None
+        self._unsynced = threading.local()
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_directory()
+
+    def _lock_directory(self):
+        # Two processes appending to one journal would corrupt it
+        try:
+            import fcntl
+        except ImportError:
+            return
+        self._lock_file = open(os.path.join(self.directory, 'LOCK'), 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise RuntimeError(f"Journal {self.directory} is in use by another process")
+
+    def _generations(self, pattern):
+        found = (pattern.match(entry) for entry in os.listdir(self.directory))
+        return sorted(int(match.group(1)) for match in found if match)
+
+    def _snapshot_path(self, generation):
+        return os.path.join(self.directory, f"snapshot-{generation:012d}")
+
+    def _log_path(self, generation):
+        return os.path.join(self.directory, f"journal-{generation:012d}.log")
+
+    # ------------------------------------------------------------------------
+    # Startup
+    # ------------------------------------------------------------------------
+
+    def load(self):
+        """Tables of the newest complete snapshot, or None for an empty journal directory"""
+        complete = [generation for generation in self._generations(_SNAPSHOT)
+                    if read_manifest(self._snapshot_path(generation)) is not None]
+        if not complete:
+            return None
+        self._generation = complete[-1]
+        return load_tables(self._snapshot_path(self._generation))
+
+    def seed(self, tables):
+        """Write the initial snapshot of a new journal directory"""
+        self._generation = 0
+        save_tables(tables, self._snapshot_path(0), meta={'generation': 0})
+
+    def recover(self, store):
+        """Replay the journals written since the loaded snapshot into store; returns the record count
+
+        A torn last record (a crash in the middle of a write, before it was
+        acknowledged) is cut off. Damage anywhere else stops startup.
+        """
+        logs = [generation for generation in self._generations(_LOG) if generation >= self._generation]
+        replayed = 0
+        backend, store.backend = store.backend, None
+        try:
+            for generation in logs:
+                path = self._log_path(generation)
+                records, good = read_records(path)
+                for record in records:
+                    _replay(store, record)
+                replayed += len(records)
+                if good < os.path.getsize(path):
+                    if generation != logs[-1]:
+                        raise RuntimeError(f"Journal {path} is damaged at byte {good}")
+                    os.truncate(path, good)
+        finally:
+            store.backend = backend
+
+        self._generation = logs[-1] if logs else self._generation
+        self._log = GroupCommitLog(self._log_path(self._generation))
+        return replayed
+
+    # ------------------------------------------------------------------------
+    # Writes (version checks already passed in the store, which owns the journal)
+    # ------------------------------------------------------------------------
+
+    def _write(self, record):
+        log = self._log
+        ticket = log.append(encode_record(record))
+        self._unsynced.writes = getattr(self._unsynced, 'writes', []) + [(log, ticket)]
+
+    def wait_durable(self):
+        """Block until the writes this thread journalled are on disk
+
+        Raises OSError if the journal failed: those writes are applied in
+        memory but would be lost on restart.
+        """
+        writes, self._unsynced.writes = getattr(self._unsynced, 'writes', []), []
+        for log, ticket in writes:
+            log.wait(ticket)
+
+    def insert(self, name, rows):
+        self._write({'op': 'insert', 'table': name, 'rows': rows})
+
+    def update(self, name, key, values, key_col='ID', expected_version=None):
+        self._write({'op': 'update', 'table': name, 'key_col': key_col, 'key': key, 'values': values})
+        return []
+
+    def update_many(self, name, changes, key_col='ID', expected_versions=None):
+        # Pairs rather than an object: JSON would turn integer keys into strings
+        self._write({'op': 'update_many', 'table': name, 'key_col': key_col, 'changes': list(changes.items())})
+        return []
+
+    def merge(self, name, rows, changes, key_col='ID', expected_versions=None):
+        self._write({'op': 'merge', 'table': name, 'key_col': key_col, 'rows': rows,
+                     'changes': list(changes.items())})
+        return []
+
+    def close(self):
+        """Flush the journal and release the directory for another process"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if getattr(self, '_lock_file', None) is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # ------------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------------
+
+    def needs_checkpoint(self):
+        return self._log is not None and self._log.size >= self.checkpoint_bytes
+
+    def rotate(self):
+        """Continue in a new journal file; returns its generation
+
+        Call with every table's writes paused, so the tables captured for
+        the snapshot hold exactly the records of the older journals.
+        """
+        old = self._log
+        self._generation += 1
+        self._log = GroupCommitLog(self._log_path(self._generation))
+        if old is not None:
+            old.close()
+        return self._generation
+
+    def write_snapshot(self, tables, generation):
+        """Snapshot tables captured at rotate(), then drop the snapshots and journals it covers"""
+        save_tables(tables, self._snapshot_path(generation), meta={'generation': generation})
+        for older in self._generations(_SNAPSHOT):
+            if older < generation:
+                shutil.rmtree(self._snapshot_path(older), ignore_errors=True)
+        for older in self._generations(_LOG):
+            if older < generation:
+                os.remove(self._log_path(older))
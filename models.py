@@ -0,0 +1,291 @@
+"""
+AMIC MMS - Domain Models
+Pydantic models for validated writes, with a batch API for bulk ingestion
+"""
+
+from datetime import date
+from functools import lru_cache
+from typing import Literal, Optional
+
+import pandas as pd
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, model_validator
+
+from schema import PURCHASE_REQUEST_STATUSES, SUPPLY_REQUEST_STATUSES, WORK_ORDER_STATUSES
+
+# ============================================================================
+# BATCH VALIDATION
+# ============================================================================
+
+@lru_cache(maxsize=None)
+def batch_adapter(model):
+    """TypeAdapter validating a whole list of records in one call into pydantic-core"""
+    return TypeAdapter(list[model])
+
+def _error_message(error):
+    fields = [str(part) for part in error['loc'][1:]]
+    return ('.'.join(fields) or None), error['msg']
+
+def validate_batch(model, records, exclude_unset=False):
+    """Validate a list of dicts; returns (valid records as dicts, {input index: [(field, message)]})
+
+    The list is validated in one call. When some records fail, their errors
+    are collected from that same call and only the remaining records are
+    validated again, so a batch costs at most two passes.
+    """
+    adapter = batch_adapter(model)
+    errors = {}
+    try:
+        valid = adapter.validate_python(records)
+        positions = range(len(records))
+    except ValidationError as e:
+        for error in e.errors(include_url=False, include_input=False):
+            errors.setdefault(error['loc'][0], []).append(_error_message(error))
+        positions = [i for i in range(len(records)) if i not in errors]
+        valid = adapter.validate_python([records[i] for i in positions])
+
+    return dict(zip(positions, adapter.dump_python(valid, exclude_unset=exclude_unset))), errors
+
+# ============================================================================
+# REFERENCE DATA
+# ============================================================================
+
+# Spreadsheet cells: trim text, accept numeric codes as text, ignore unknown columns
+_TRIMMED = ConfigDict(str_strip_whitespace=True, coerce_numbers_to_str=True, extra='ignore')
+
+class CatalogueEntry(BaseModel):
+    """One failure catalogue row (System > Subsystem > Component > Failure Mode)"""
+
+    model_config = _TRIMMED
+
+    System: str = Field(min_length=1, max_length=50)
+    Subsystem: str = Field(min_length=1, max_length=50)
+    Component: str = Field(min_length=1, max_length=50)
+    Failure_Mode: str = Field(min_length=1, max_length=100)
+    Malfunction_Code: str = Field(min_length=1, max_length=30)
+    Cause_Code: str = Field(min_length=1, max_length=30)
+    Resolution_Code: str = Field(min_length=1, max_length=30)
+    Resolution_Description_English: str = Field(min_length=1)
+    Resolution_Description_Arabic: str = Field(min_length=1)
+    Cause_Description_English: Optional[str] = None
+    Cause_Description_Arabic: Optional[str] = None
+
+    @model_validator(mode='after')
+    def _default_cause_descriptions(self):
+        # Same default the catalogue form has always used
+        if not self.Cause_Description_English:
+            self.Cause_Description_English = f'{self.Component} {self.Failure_Mode}'
+        if not self.Cause_Description_Arabic:
+            self.Cause_Description_Arabic = f'{self.Component} {self.Failure_Mode}'
+        return self
+
+class PartRecord(BaseModel):
+    """One parts master / stock row; only Part_Number is required (stock sheets carry quantities)"""
+
+    model_config = _TRIMMED
+
+    Part_Number: str = Field(min_length=1, max_length=30)
+    Warehouse_Code: Optional[str] = Field(default=None, max_length=10)
+    OEM_Number: Optional[str] = Field(default=None, max_length=30)
+    English_Description: Optional[str] = Field(default=None, max_length=200)
+    Arabic_Description: Optional[str] = Field(default=None, max_length=200)
+    Part_Locations: Optional[str] = Field(default=None, max_length=30)
+    Part_Quantity: Optional[int] = Field(default=None, ge=0)
+
+# ============================================================================
+# TRANSACTIONS
+# ============================================================================
+
+# IDs are optional on input: the write services allocate them
+_RECORD = ConfigDict(str_strip_whitespace=True, extra='forbid')
+
+class WorkOrderRecord(BaseModel):
+    """A work order as written by the create form, bulk loads and the API"""
+
+    model_config = _RECORD
+
+    ID: Optional[int] = Field(default=None, gt=0)
+    Employee_ID: int = Field(gt=0)
+    Workshop_Name: str = Field(min_length=1, max_length=50)
+    Vehicle_Number: str = Field(min_length=1, max_length=30)
+    AlKhorayef_Reception_Date: date
+    Equipment_Owning_Unit: Optional[str] = Field(default=None, max_length=50)
+    Vehicle_Type: Optional[str] = Field(default=None, max_length=30)
+    Malfunction_Type: str = Field(min_length=1, max_length=50)
+    Malfunction_Date: date
+    MNG_Work_Order_Creation_Date: date
+    AIC_Work_Order_Number: Optional[str] = Field(default=None, max_length=30)
+    Technician_Name: str = Field(min_length=1, max_length=100)
+    Work_Order_Status: Literal[tuple(WORK_ORDER_STATUSES)] = 'Open'
+    Require_Spare_Parts: bool = False
+    Work_Order_Completion_Date: Optional[date] = None
+    Comments: Optional[str] = None
+
+    @model_validator(mode='after')
+    def _check_dates(self):
+        if self.Malfunction_Date > self.MNG_Work_Order_Creation_Date:
+            raise ValueError('Malfunction_Date is after MNG_Work_Order_Creation_Date')
+        if self.Work_Order_Completion_Date and self.Work_Order_Completion_Date < self.MNG_Work_Order_Creation_Date:
+            raise ValueError('Work_Order_Completion_Date is before MNG_Work_Order_Creation_Date')
+        return self
+
+class MalfunctionRecord(BaseModel):
+    """The catalogue classification recorded against one work order"""
+
+    model_config = _RECORD
+
+    ID: Optional[int] = Field(default=None, gt=0)
+    Vehicle_Number: str = Field(min_length=1, max_length=30)
+    Work_Order_ID: int = Field(gt=0)
+    Malfunction_Code: str = Field(min_length=1, max_length=30)
+    Resolution_Description_English: Optional[str] = None
+    Resolution_Description_Arabic: Optional[str] = None
+    Resolution_Code: Optional[str] = Field(default=None, max_length=30)
+    Cause_Description_English: Optional[str] = None
+    Cause_Description_Arabic: Optional[str] = None
+    Cause_Code: Optional[str] = Field(default=None, max_length=30)
+    Description_English: Optional[str] = None
+    Description_Arabic: Optional[str] = None
+
+class SupplyRequestRecord(BaseModel):
+    """Parts requested for a work order"""
+
+    model_config = _RECORD
+
+    ID: Optional[int] = Field(default=None, gt=0)
+    Work_Order_ID: int = Field(gt=0)
+    Part_ID: int = Field(gt=0)
+    Quantity_Requested: int = Field(gt=0)
+    Status: Literal[tuple(SUPPLY_REQUEST_STATUSES)] = 'Pending'
+
+class PurchaseRequestRecord(BaseModel):
+    """A purchase request raised against a supply request"""
+
+    model_config = _RECORD
+
+    ID: Optional[int] = Field(default=None, gt=0)
+    Supply_Request_ID: int = Field(gt=0)
+    Employee_ID: int = Field(gt=0)
+    PR_Date: date = Field(default_factory=date.today)
+    Status: Literal[tuple(PURCHASE_REQUEST_STATUSES)] = 'Pending'
+
+# ============================================================================
+# UPDATES (only the fields a caller sets are applied)
+# ============================================================================
+
+class WorkOrderUpdate(BaseModel):
+    """Changes a supervisor or the API may make to an existing work order"""
+
+    model_config = _RECORD
+
+    Work_Order_Status: Optional[Literal[tuple(WORK_ORDER_STATUSES)]] = None
+    Work_Order_Completion_Date: Optional[date] = None
+    Comments: Optional[str] = None
+
+    @model_validator(mode='after')
+    def _check_status(self):
+        if 'Work_Order_Status' in self.model_fields_set and self.Work_Order_Status is None:
+            raise ValueError('Work_Order_Status cannot be cleared')
+        return self
+
+class SupplyRequestUpdate(BaseModel):
+    """A supply request status change"""
+
+    model_config = _RECORD
+
+    Status: Literal[tuple(SUPPLY_REQUEST_STATUSES)]
+
+# ============================================================================
+# INTEGRITY CHECKS
+# ============================================================================
+
+# Store table -> row model for validated writes
+TABLE_RECORDS = {
+    'failure_catalogue': CatalogueEntry,
+    'part': PartRecord,
+    'work_orders': WorkOrderRecord,
+    'malfunction': MalfunctionRecord,
+    'supply_request': SupplyRequestRecord,
+    'purchase_request': PurchaseRequestRecord,
+}
+
+# Store table -> model for validated updates
+TABLE_UPDATES = {
+    'work_orders': WorkOrderUpdate,
+    'supply_request': SupplyRequestUpdate,
+}
+
+# Column -> (table, column) it must reference
+REFERENCES = {
+    'work_orders': {
+        'Employee_ID': ('user', 'Employee_ID'),
+        'Workshop_Name': ('workshop', 'Workshop_Name'),
+        'Vehicle_Number': ('vehicle', 'Vehicle_Number'),
+    },
+    'malfunction': {
+        'Work_Order_ID': ('work_orders', 'ID'),
+        'Vehicle_Number': ('vehicle', 'Vehicle_Number'),
+        'Malfunction_Code': ('failure_catalogue', 'Malfunction_Code'),
+    },
+    'supply_request': {
+        'Work_Order_ID': ('work_orders', 'ID'),
+        'Part_ID': ('part', 'ID'),
+    },
+    'purchase_request': {
+        'Supply_Request_ID': ('supply_request', 'ID'),
+        'Employee_ID': ('user', 'Employee_ID'),
+    },
+}
+
+# Natural keys that must stay unique
+UNIQUE_KEYS = {
+    'failure_catalogue': 'Malfunction_Code',
+    'part': 'Part_Number',
+}
+
+# Up to this many distinct values are checked through the store's hash indexes;
+# larger batches are matched against the whole column in one isin
+_INDEXED_LOOKUPS = 256
+
+def _existing(store, table, column, values):
+    """The subset of values present in table[column]"""
+    if len(values) <= _INDEXED_LOOKUPS:
+        return {value for value in values if store.get(table, value, key_col=column) is not None}
+    values = pd.Index(values)
+    return set(values[values.isin(store.table(table)[column])])
+
+def check_integrity(store, name, records, pending=None):
+    """{position: [(field, message)]} for records ({position: dict}) that break a reference or unique key
+
+    pending maps table -> keys being created in the same write, which
+    count as present.
+    """
+    errors = {}
+    positions = list(records)
+
+    for field, (table, column) in REFERENCES.get(name, {}).items():
+        values = [records[i].get(field) for i in positions]
+        distinct = set(value for value in values if value is not None)
+        known = _existing(store, table, column, distinct) | set((pending or {}).get(table, ()))
+        for i, value in zip(positions, values):
+            if value is not None and value not in known:
+                errors.setdefault(i, []).append((field, f"No {table} with {column} {value!r}"))
+
+    key = UNIQUE_KEYS.get(name)
+    if key:
+        values = pd.Series([records[i].get(key) for i in positions], dtype=object)
+        taken = _existing(store, name, key, set(values.dropna()))
+        for i, value, repeated in zip(positions, values, values.duplicated(keep=False)):
+            if value in taken:
+                errors.setdefault(i, []).append((key, f"{value!r} already exists"))
+            elif repeated:
+                errors.setdefault(i, []).append((key, f"{value!r} appears more than once"))
+
+    return errors
+
+def validate_records(store, name, records, pending=None):
+    """validate_batch with the table's model, then check_integrity on the rows that passed"""
+    valid, errors = validate_batch(TABLE_RECORDS[name], records)
+    for i, messages in check_integrity(store, name, valid, pending).items():
+        errors.setdefault(i, []).extend(messages)
+        del valid[i]
+    return valid, errors
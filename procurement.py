@@ -0,0 +1,60 @@
+"""
+AMIC MMS - Parts Netting
+Outstanding supply-request demand netted against stock and in-transit orders
+"""
+
+import numpy as np
+import pandas as pd
+
+# Supply requests still waiting for parts, and orders whose parts have not arrived
+OPEN_REQUEST_STATUSES = ['Pending', 'Approved']
+IN_TRANSIT_STATUSES = ['Ordered', 'In Transit']
+
+NETTING_COLUMNS = ['Part_ID', 'Part_Number', 'English_Description', 'Open_Requests',
+                   'Demand', 'On_Hand', 'In_Transit', 'Shortage']
+
+# ============================================================================
+# NETTING
+# ============================================================================
+
+def net_requirements(df_sr, df_part, df_pr, df_orders):
+    """Per-part demand, stock, in-transit quantity and net shortage (one grouped pass each)
+
+    Demand is the total Quantity_Requested over open supply requests. In-transit
+    quantity follows orders -> purchase requests -> supply requests back to the
+    part. Shortage = Demand - On_Hand - In_Transit, floored at zero.
+    """
+    open_sr = df_sr[df_sr['Status'].isin(OPEN_REQUEST_STATUSES)]
+    demand = open_sr.groupby('Part_ID')['Quantity_Requested'].agg(['size', 'sum'])
+
+    # Orders carry no part or quantity of their own; take them from the request they fill
+    in_transit_pr = df_orders.loc[df_orders['Status'].isin(IN_TRANSIT_STATUSES), 'PR_ID']
+    in_transit_sr = df_pr.loc[df_pr['ID'].isin(in_transit_pr), 'Supply_Request_ID']
+    in_transit = df_sr[df_sr['ID'].isin(in_transit_sr)].groupby('Part_ID')['Quantity_Requested'].sum()
+
+    part_ids = df_part['ID']
+    df = pd.DataFrame({
+        'Part_ID': part_ids.to_numpy(),
+        'Part_Number': df_part['Part_Number'].to_numpy(),
+        'English_Description': df_part['English_Description'].to_numpy(),
+        'Open_Requests': demand['size'].reindex(part_ids, fill_value=0).to_numpy(),
+        'Demand': demand['sum'].reindex(part_ids, fill_value=0).to_numpy(),
+        'On_Hand': df_part['Part_Quantity'].fillna(0).to_numpy(),
+        'In_Transit': in_transit.reindex(part_ids, fill_value=0).to_numpy(),
+    })
+    df['Shortage'] = np.maximum(df['Demand'] - df['On_Hand'] - df['In_Transit'], 0)
+    return df[NETTING_COLUMNS]
+
+def rank_shortages(df_net):
+    """Parts with a shortage, largest first (ties: more open requests first)"""
+    short = df_net[df_net['Shortage'] > 0]
+    return short.sort_values(['Shortage', 'Open_Requests'], ascending=False, kind='stable').reset_index(drop=True)
+
+def part_shortages(store):
+    """Ranked shortage list, cached until requests, parts, PRs or orders change"""
+
+    def compute(df_sr, df_part, df_pr, df_orders):
+        return rank_shortages(net_requirements(df_sr, df_part, df_pr, df_orders))
+
+    return store.cached_query('part_shortages', ('supply_request', 'part', 'purchase_request', 'orders'),
+                              (), compute)
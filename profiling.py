@@ -0,0 +1,204 @@
+"""
+AMIC MMS - Rerun Profiling
+Opt-in timing of each Streamlit rerun: init, pages, queries and widget blocks
+
+Enable with AMIC_PROFILING=1 (or from the Admin diagnostics page). Each
+finished rerun is logged as one JSON line on the 'amic.profiling' logger
+(WARNING when slower than AMIC_SLOW_RERUN_MS), and totals are served in
+Prometheus text format on AMIC_METRICS_PORT when that is set.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('amic.profiling')
+
+def _env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes', 'on')
+
+# ============================================================================
+# PROFILER
+# ============================================================================
+
+class Profiler:
+    """Collects timed spans per rerun, keeps recent reruns and running totals
+
+    Spans only record inside profiler.rerun() on the same thread, so code
+    shared with tools and background threads costs one attribute lookup.
+    """
+
+    def __init__(self, enabled=False, slow_rerun_ms=500, history=50):
+        self.enabled = enabled
+        self.slow_rerun_ms = slow_rerun_ms
+        self.reruns = deque(maxlen=history)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._span_totals = {}
+        self._rerun_count = 0
+        self._rerun_seconds = 0.0
+        self._slow_reruns = 0
+
+    @contextmanager
+    def rerun(self, label='main'):
+        """Time one script run; spans opened inside it are attached to it"""
+        if not self.enabled:
+            yield None
+            return
+
+        record = {'label': label, 'started_at': time.time(), 'spans': []}
+        started = time.perf_counter()
+        self._local.record = record
+        self._local.depth = 0
+        self._local.started = started
+        try:
+            yield record
+        finally:
+            record['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            self._local.record = None
+            self._finish(record)
+
+    @contextmanager
+    def span(self, name, kind='block'):
+        """Time a block within the current rerun"""
+        record = getattr(self._local, 'record', None)
+        if record is None:
+            yield
+            return
+
+        depth = self._local.depth
+        self._local.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.depth = depth
+            record['spans'].append({
+                'name': name,
+                'kind': kind,
+                'depth': depth,
+                'offset_ms': round((started - self._local.started) * 1000, 2),
+                'ms': round(elapsed * 1000, 2),
+            })
+            with self._lock:
+                totals = self._span_totals.setdefault((kind, name), [0, 0.0, 0.0])
+                totals[0] += 1
+                totals[1] += elapsed
+                totals[2] = max(totals[2], elapsed)
+
+    def timed(self, kind='block'):
+        """Decorator: run the function inside a span named after it"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(func.__name__, kind):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _finish(self, record):
+        slow = record['total_ms'] >= self.slow_rerun_ms
+        with self._lock:
+            self.reruns.append(record)
+            self._rerun_count += 1
+            self._rerun_seconds += record['total_ms'] / 1000
+            self._slow_reruns += slow
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record, default=str))
+
+    def span_totals(self):
+        """Rows of (kind, name, calls, total seconds, max seconds), slowest total first"""
+        with self._lock:
+            rows = [(kind, name, *totals) for (kind, name), totals in self._span_totals.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.reruns.clear()
+            self._span_totals.clear()
+            self._rerun_count = 0
+            self._rerun_seconds = 0.0
+            self._slow_reruns = 0
+
+    def prometheus_text(self, gauges=None):
+        """Totals in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP amic_reruns_total Profiled Streamlit reruns',
+                '# TYPE amic_reruns_total counter',
+                f'amic_reruns_total {self._rerun_count}',
+                '# HELP amic_slow_reruns_total Reruns slower than the slow-rerun threshold',
+                '# TYPE amic_slow_reruns_total counter',
+                f'amic_slow_reruns_total {self._slow_reruns}',
+                '# HELP amic_rerun_seconds_total Time spent in profiled reruns',
+                '# TYPE amic_rerun_seconds_total counter',
+                f'amic_rerun_seconds_total {self._rerun_seconds:.6f}',
+            ]
+            spans = sorted(self._span_totals.items())
+
+        for metric, position, metric_type, help_text in [
+            ('amic_span_calls_total', 0, 'counter', 'Calls per instrumented span'),
+            ('amic_span_seconds_total', 1, 'counter', 'Time per instrumented span'),
+            ('amic_span_seconds_max', 2, 'gauge', 'Slowest single call per instrumented span'),
+        ]:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {metric_type}')
+            for (kind, name), totals in spans:
+                lines.append(f'{metric}{{kind="{kind}",name="{name}"}} {totals[position]:g}')
+
+        for name, value in (gauges or {}).items():
+            lines.append(f'# TYPE amic_{name} gauge')
+            lines.append(f'amic_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+profiler = Profiler(
+    enabled=_env_flag('AMIC_PROFILING'),
+    slow_rerun_ms=float(os.environ.get('AMIC_SLOW_RERUN_MS', 500)),
+)
+
+span = profiler.span
+timed = profiler.timed
+
+# ============================================================================
+# PROMETHEUS ENDPOINT
+# ============================================================================
+
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+def start_metrics_server(port=None, gauges=None):
+    """Serve GET /metrics on a daemon thread (once per process); gauges() adds extra values"""
+    global _metrics_server
+
+    port = port or os.environ.get('AMIC_METRICS_PORT')
+    if not port:
+        return None
+
+    with _metrics_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = profiler.prometheus_text(gauges() if gauges else None).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        _metrics_server = ThreadingHTTPServer(('0.0.0.0', int(port)), MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, name='amic-metrics', daemon=True).start()
+        return _metrics_server
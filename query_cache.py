@@ -0,0 +1,162 @@
+"""
+AMIC MMS - Query Result Cache
+Process-wide LRU/TTL cache for query results with a memory budget
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# SIZE ESTIMATION
+# ============================================================================
+
+_MASKED_ARRAYS = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+def _buffers(series):
+    """numpy arrays holding a Series' values, or None when its dtype keeps them elsewhere"""
+    array = series.array
+    if isinstance(array, pd.Categorical):
+        return [array.codes]
+    if isinstance(array, _MASKED_ARRAYS):
+        return [array._data, array._mask]
+    if isinstance(series.dtype, np.dtype):
+        return [series.to_numpy()]
+    return None
+
+def _root(array):
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+def _series_size(series, shared, borrowed):
+    buffers = _buffers(series)
+    if buffers is None:
+        return int(series.memory_usage(index=False, deep=False))
+    size = 0
+    for buffer in buffers:
+        root = id(_root(buffer))
+        if root in shared:
+            if borrowed is not None:
+                borrowed[root] = borrowed.get(root, 0) + buffer.nbytes
+        else:
+            size += buffer.nbytes
+    return size
+
+def estimate_size(value, shared=frozenset(), borrowed=None):
+    """Approximate memory a cached value adds, in bytes
+
+    Columns that are views of an array in shared (ids of the store's own
+    arrays) cost nothing: the store holds that memory anyway. Their bytes
+    are added to borrowed ({array id: bytes}) when it is given, so they can
+    be charged once the store lets go of the array. Object columns are
+    charged for their pointers only; the strings they point to are nearly
+    always the store's, and scanning them would cost more than the cache
+    saves.
+    """
+    if isinstance(value, pd.DataFrame):
+        return (int(value.index.memory_usage(deep=False))
+                + sum(_series_size(value.iloc[:, i], shared, borrowed) for i in range(value.shape[1])))
+    if isinstance(value, pd.Series):
+        return int(value.index.memory_usage(deep=False)) + _series_size(value, shared, borrowed)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v, shared, borrowed) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v, shared, borrowed) for v in value)
+    return sys.getsizeof(value)
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class QueryCache:
+    """LRU cache with per-entry TTL and a total memory budget
+
+    Keys are expected to embed the versions of the tables a result was
+    computed from, so a write makes old entries unreachable and they age out.
+    shared, when given, returns the ids of arrays whose memory entries are
+    not charged for (see estimate_size). An entry is charged for such an
+    array as soon as it is no longer shared: a write that copied the column
+    leaves the entry as the only holder of the old one.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=600, max_bytes=64 * 1024 * 1024, shared=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (found, value); a hit refreshes the entry's LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires, _, value, _ = entry
+            if expires < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        shared = self.shared() if self.shared else frozenset()
+        borrowed = {}
+        size = estimate_size(value, shared, borrowed)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._recharge(shared)
+            self._entries[key] = [time.monotonic() + self.ttl_seconds, size, value, borrowed]
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_compute(self, key, compute):
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for diagnostics"""
+        shared = self.shared() if self.shared else None
+        with self._lock:
+            if shared is not None:
+                self._recharge(shared)
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def _recharge(self, shared):
+        """Charge entries for the arrays they borrowed that are no longer in shared"""
+        for entry in self._entries.values():
+            borrowed = entry[3]
+            for root in [root for root in borrowed if root not in shared]:
+                # The entry holds the array alive, so its id cannot have been reused
+                nbytes = borrowed.pop(root)
+                entry[1] += nbytes
+                self._bytes += nbytes
+
+    def _drop(self, key):
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,163 @@
+"""
+AMIC MMS - Reliability Analytics
+MTBF per vehicle and component, MTTR per workshop and failure mode, and repeat-failure detection
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics import filter_work_orders
+
+# A failure with the same code on the same vehicle within this many days of the previous one
+REPEAT_WINDOW_DAYS = 30
+
+REPEAT_COLUMNS = ['ID', 'Vehicle_Number', 'Workshop_Name', 'Malfunction_Code', 'Component', 'Failure_Mode',
+                  'Malfunction_Date', 'Previous_Work_Order_ID', 'Days_Since_Previous']
+
+_DAY = pd.Timedelta(days=1)
+
+# ============================================================================
+# FAILURE EVENTS
+# ============================================================================
+
+def failure_events(df_wo, df_malfunction, df_catalogue):
+    """One row per dated work order with its malfunction code and catalogue System / Component / Failure_Mode"""
+    wo = df_wo[['ID', 'Vehicle_Number', 'Workshop_Name', 'Malfunction_Date', 'MNG_Work_Order_Creation_Date',
+                'Work_Order_Completion_Date', 'Work_Order_Status']]
+    wo = wo[wo['Malfunction_Date'].notna() & wo['Vehicle_Number'].notna()]
+    mal = df_malfunction[['Work_Order_ID', 'Malfunction_Code']].dropna()
+    mal = mal.astype({'Work_Order_ID': wo['ID'].dtype}).rename(columns={'Work_Order_ID': 'ID'})
+
+    events = wo.merge(mal, on='ID', how='inner')
+    catalogue = df_catalogue.drop_duplicates('Malfunction_Code').set_index('Malfunction_Code')
+    codes = events['Malfunction_Code'].astype('category')
+    for col in ['System', 'Component', 'Failure_Mode']:
+        # Looked up once per distinct code, then spread through the codes
+        per_code, values = pd.factorize(catalogue[col].reindex(codes.cat.categories))
+        column_codes = np.where(codes.cat.codes >= 0, per_code[codes.cat.codes], -1)
+        events[col] = pd.Categorical.from_codes(column_codes, values)
+    return events
+
+def _codes(series):
+    """(integer codes with -1 for missing, distinct values) of a column"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series)
+
+def _gaps(events, keys):
+    """(row order by keys, date, then row; days since the previous failure with the same keys, in that order)
+
+    Keys, day number and row position are packed into one integer and
+    sorted as plain values, several times faster than a groupby or an
+    argsort over a million events.
+    """
+    n = len(events)
+    group = np.zeros(n, dtype=np.int64)
+    groups = 1
+    for key in keys:
+        codes, values = _codes(events[key])
+        group = group * (len(values) + 1) + (codes + 1)
+        groups *= len(values) + 1
+    days = events['Malfunction_Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    days = days - days.min() if n else days
+    span = int(days.max()) + 1 if n else 1
+
+    if groups * span * max(n, 1) < 2 ** 62:
+        order = np.sort((group * span + days) * n + np.arange(n)) % max(n, 1)
+    else:
+        order = np.argsort(group * span + days, kind='stable')
+
+    group, days = group[order], days[order]
+    same = group[1:] == group[:-1]
+    gaps = np.full(len(order), np.nan)
+    gaps[1:][same] = (days[1:] - days[:-1])[same]
+    return order, gaps
+
+def _per_value(series, values):
+    """Rows, non-missing values and their mean per distinct value of series (aligned with values)"""
+    codes, distinct = _codes(series)
+    present = codes >= 0
+    measured = present & ~np.isnan(values)
+    rows = np.bincount(codes[present], minlength=len(distinct))
+    count = np.bincount(codes[measured], minlength=len(distinct))
+    total = np.bincount(codes[measured], weights=values[measured], minlength=len(distinct))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    table = pd.DataFrame({series.name: distinct, 'rows': rows, 'count': count, 'mean': mean})
+    return table[table['rows'] > 0]
+
+# ============================================================================
+# MTBF / MTTR
+# ============================================================================
+
+def mean_time_between_failures(events, by='Vehicle_Number'):
+    """Failures and mean days between consecutive failures per value of by, shortest MTBF first
+
+    Gaps are always measured on one vehicle: for a component, the time
+    between two failures of that component on the same vehicle. Values
+    with a single failure have no gap yet and are left out.
+    """
+    keys = ['Vehicle_Number'] if by == 'Vehicle_Number' else ['Vehicle_Number', by]
+    order, gaps = _gaps(events, keys)
+    table = _per_value(events[by].iloc[order], gaps)
+    table = table[table['count'] > 0].rename(columns={'rows': 'Failures', 'mean': 'MTBF_Days'})
+    return table[[by, 'Failures', 'MTBF_Days']].sort_values('MTBF_Days').reset_index(drop=True)
+
+def repair_days(events):
+    """Days from creation to completion per event; NaN unless the work order is completed"""
+    days = (events['Work_Order_Completion_Date'] - events['MNG_Work_Order_Creation_Date']) / _DAY
+    return days.where(events['Work_Order_Status'].eq('Completed')).to_numpy()
+
+def mean_time_to_repair(events, by='Workshop_Name'):
+    """Completed repairs and mean days to repair per value of by, longest MTTR first"""
+    table = _per_value(events[by], repair_days(events))
+    table = table[table['count'] > 0].rename(columns={'count': 'Repairs', 'mean': 'MTTR_Days'})
+    return table[[by, 'Repairs', 'MTTR_Days']].sort_values('MTTR_Days', ascending=False).reset_index(drop=True)
+
+# ============================================================================
+# REPEAT FAILURES
+# ============================================================================
+
+def repeat_failures(events, window_days=REPEAT_WINDOW_DAYS):
+    """Failures that recur on the same vehicle with the same code within window_days, newest first"""
+    order, gaps = _gaps(events, ['Vehicle_Number', 'Malfunction_Code'])
+    ids = events['ID'].to_numpy()[order]
+    repeat = gaps <= window_days
+    previous = np.concatenate([ids[:1], ids[:-1]])
+
+    repeats = events.iloc[order[repeat]].assign(
+        Previous_Work_Order_ID=previous[repeat],
+        Days_Since_Previous=gaps[repeat],
+    )
+    return repeats[REPEAT_COLUMNS].sort_values(['Malfunction_Date', 'ID'], ascending=False).reset_index(drop=True)
+
+# ============================================================================
+# CACHED REPORT
+# ============================================================================
+
+def _mean(values):
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+def reliability_report(store, region='All', workshop='All', system='All'):
+    """MTBF, MTTR and repeat-failure tables plus fleet totals under the manager dashboard filters"""
+
+    def compute(df_wo, df_malfunction, df_catalogue, df_workshop):
+        df_wo = filter_work_orders(df_wo, df_workshop, region, workshop, 'All', system)
+        events = failure_events(df_wo, df_malfunction, df_catalogue)
+        vehicle_mtbf = mean_time_between_failures(events, 'Vehicle_Number')
+        # A vehicle with n failures contributes n - 1 gaps to the fleet mean
+        gaps = vehicle_mtbf['Failures'] - 1
+        return {
+            'failures': len(events),
+            'fleet_mtbf': float((vehicle_mtbf['MTBF_Days'] * gaps).sum() / gaps.sum()) if len(gaps) else None,
+            'fleet_mttr': _mean(repair_days(events)),
+            'vehicle_mtbf': vehicle_mtbf,
+            'component_mtbf': mean_time_between_failures(events, 'Component'),
+            'workshop_mttr': mean_time_to_repair(events, 'Workshop_Name'),
+            'failure_mode_mttr': mean_time_to_repair(events, 'Failure_Mode'),
+            'repeat_failures': repeat_failures(events),
+        }
+
+    return store.cached_query('reliability_report', ('work_orders', 'malfunction', 'failure_catalogue', 'workshop'),
+                              (region, workshop, system), compute)
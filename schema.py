@@ -0,0 +1,107 @@
+"""
+AMIC MMS - Table Schemas
+Enforced column dtypes: categoricals for repeated labels, datetime64 dates, nullable ints
+"""
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+WORK_ORDER_STATUSES = ['Open', 'In Progress', 'Completed']
+SUPPLY_REQUEST_STATUSES = ['Pending', 'Approved', 'Issued', 'Cancelled']
+PURCHASE_REQUEST_STATUSES = ['Pending', 'Approved', 'Rejected']
+
+DATE = 'datetime64[ns]'
+
+# Tables whose rows carry a version stamp for compare-and-swap updates
+ROW_VERSION = 'Row_Version'
+VERSIONED_TABLES = ['work_orders']
+
+# Lookup columns with a maintained hash index, besides the ID column every table gets
+KEY_COLUMNS = {
+    'user': ['Employee_ID'],
+    'vehicle': ['Vehicle_Number'],
+    'failure_catalogue': ['Malfunction_Code'],
+    'work_orders': ['Vehicle_Number'],
+    'part': ['Part_Number'],
+}
+
+# ============================================================================
+# SCHEMAS
+# ============================================================================
+
+SCHEMAS = {
+    'work_orders': {
+        'ID': 'int32',
+        'Employee_ID': 'Int32',
+        'Workshop_Name': 'category',
+        'Vehicle_Number': 'category',
+        'AlKhorayef_Reception_Date': DATE,
+        'Equipment_Owning_Unit': 'category',
+        'Vehicle_Type': 'category',
+        'Malfunction_Type': 'category',
+        'Malfunction_Date': DATE,
+        'MNG_Work_Order_Creation_Date': DATE,
+        'AIC_Work_Order_Number': 'object',
+        'Technician_Name': 'category',
+        'Work_Order_Status': CategoricalDtype(WORK_ORDER_STATUSES),
+        'Require_Spare_Parts': 'bool',
+        'Work_Order_Completion_Date': DATE,
+        'Comments': 'object',
+        'Row_Version': 'int32',
+    },
+    'malfunction': {
+        'ID': 'int32',
+        'Vehicle_Number': 'category',
+        'Work_Order_ID': 'Int32',
+        'Malfunction_Code': 'category',
+        # Descriptions are copied from the catalogue, so they repeat heavily
+        'Resolution_Description_English': 'category',
+        'Resolution_Description_Arabic': 'category',
+        'Resolution_Code': 'category',
+        'Cause_Description_English': 'category',
+        'Cause_Description_Arabic': 'category',
+        'Cause_Code': 'category',
+        'Description_English': 'category',
+        'Description_Arabic': 'category',
+    },
+    'supply_request': {
+        'Status': 'category',
+    },
+    'purchase_request': {
+        'PR_Date': DATE,
+        'Status': 'category',
+    },
+    'orders': {
+        'Status': 'category',
+        'Order_Date': DATE,
+        'Delivery_Date': DATE,
+    },
+    'audit_log': {
+        'ID': 'int32',
+        'Timestamp': DATE,
+        'Employee_ID': 'Int32',
+        'Action': 'category',
+        'Table_Name': 'category',
+        'Record_Count': 'int32',
+        'Details': 'object',
+    },
+}
+
+def apply_schema(name, df):
+    """Cast a table's columns to its declared dtypes (tables without a schema pass through)"""
+    schema = SCHEMAS.get(name)
+    if not schema:
+        return df
+
+    columns = {}
+    for col in df.columns:
+        dtype = schema.get(col)
+        if dtype is None:
+            columns[col] = df[col]
+        elif dtype == DATE:
+            columns[col] = pd.to_datetime(df[col], errors='coerce').astype(DATE)
+        elif dtype == 'bool':
+            columns[col] = df[col].eq(True)
+        else:
+            columns[col] = df[col].astype(dtype)
+    return pd.DataFrame(columns, index=df.index)
@@ -0,0 +1,266 @@
+"""
+AMIC MMS - Work Order Search
+In-process inverted index over work-order and malfunction text and codes
+"""
+
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+import numpy as np
+import pandas as pd
+
+# Searchable fields per table; every hit resolves to a work order ID
+CODE_FIELDS = {
+    'work_orders': ['AIC_Work_Order_Number', 'Vehicle_Number'],
+    'malfunction': ['Malfunction_Code', 'Cause_Code'],
+}
+TEXT_FIELDS = {
+    'work_orders': ['Comments'],
+    'malfunction': ['Description_English', 'Description_Arabic',
+                    'Resolution_Description_English', 'Resolution_Description_Arabic'],
+}
+DOC_COLUMN = {'work_orders': 'ID', 'malfunction': 'Work_Order_ID'}
+
+_CODE_FIELD_NAMES = {field for fields in CODE_FIELDS.values() for field in fields}
+
+# Shorter query terms only match whole terms, not prefixes
+MIN_PREFIX_LENGTH = 2
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+# Harakat, Quranic marks and tatweel carry no meaning for search
+_ARABIC_MARKS = re.compile('[ؐ-ًؚ-ٰٟۖ-ۭـ]')
+
+_ARABIC_FOLDING = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06F0 + d): str(d) for d in range(10)},
+})
+
+_WORD = re.compile(r'\w+')
+
+def normalize(text):
+    """Case-fold and fold Arabic letter variants, diacritics and digits"""
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return _ARABIC_MARKS.sub('', text).translate(_ARABIC_FOLDING)
+
+def tokenize(text):
+    """Normalized words, with the Arabic definite article stripped from longer words"""
+    return [word[2:] if word.startswith('ال') and len(word) > 4 else word
+            for word in _WORD.findall(normalize(text))]
+
+# ============================================================================
+# POSTINGS (an int for a single document, an array when there are more)
+# ============================================================================
+
+def _add_posting(postings, key, doc):
+    current = postings.get(key)
+    if current is None:
+        postings[key] = doc
+    elif isinstance(current, int):
+        postings[key] = array('q', (current, doc))
+    else:
+        if isinstance(current, np.ndarray):
+            current = postings[key] = array('q', current.tobytes())
+        current.append(doc)
+
+def _remove_posting(postings, key, doc):
+    current = postings.get(key)
+    if current is None:
+        return
+    if isinstance(current, int):
+        if current == doc:
+            del postings[key]
+        return
+    if isinstance(current, np.ndarray):
+        current = postings[key] = array('q', current.tobytes())
+    if doc in current:
+        current.remove(doc)
+    if not current:
+        del postings[key]
+
+def _grouped_postings(keys, codes, docs):
+    """{keys[code]: docs with that code} for factorized codes, singletons as plain ints"""
+    keep = (codes >= 0) & (docs >= 0)
+    codes, docs = codes[keep], docs[keep]
+    order = np.argsort(codes, kind='stable')
+    sorted_docs = docs[order]
+    counts = np.bincount(codes, minlength=len(keys))
+    starts = np.cumsum(counts) - counts
+
+    single = np.flatnonzero(counts == 1)
+    postings = dict(zip([keys[i] for i in single], sorted_docs[starts[single]].tolist()))
+    for i in np.flatnonzero(counts > 1):
+        postings[keys[i]] = sorted_docs[starts[i]:starts[i] + counts[i]]
+    return postings
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class SearchIndex:
+    """Inverted index from normalized terms to work order IDs, kept current from store writes
+
+    Code fields are indexed as whole normalized codes in one sorted list and
+    matched by prefix. Text values repeat heavily (descriptions come from the
+    catalogue), so words point at distinct (field, value) keys and each value
+    holds its postings once. Queries combine postings as boolean masks over
+    the work order ID range.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._words = {}
+        self._codes = []
+        self._max_doc = 0
+
+        for name, doc_column in DOC_COLUMN.items():
+            df = store.table(name)
+            docs = df[doc_column].to_numpy(dtype=np.int64, na_value=-1)
+            if len(docs):
+                self._max_doc = max(self._max_doc, int(docs.max()))
+            for field in CODE_FIELDS[name]:
+                self._build_code_field(field, df[field], docs)
+            for field in TEXT_FIELDS[name]:
+                self._build_text_field(field, df[field], docs)
+
+        self._codes.sort()
+        self._sorted_words = sorted(self._words)
+
+    def _build_code_field(self, field, values, docs):
+        codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+        # Distinct raw codes can share a normalized form ('veh-001' / 'VEH-001')
+        norm_codes, norms = pd.factorize(np.array([normalize(value) for value in uniques], dtype=object))
+        codes = np.where(codes >= 0, norm_codes[codes], -1) if len(norm_codes) else codes
+        self._postings.update(_grouped_postings([(field, norm) for norm in norms], codes, docs))
+        self._codes.extend((norm, field) for norm in norms)
+
+    def _build_text_field(self, field, values, docs):
+        codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+        keys = [(field, value) for value in uniques]
+        self._postings.update(_grouped_postings(keys, codes, docs))
+        for key in keys:
+            for word in set(tokenize(key[1])):
+                self._words.setdefault(word, set()).add(key)
+
+    def _key(self, field, value):
+        if field in _CODE_FIELD_NAMES:
+            return (field, normalize(value))
+        return (field, value)
+
+    def _add(self, field, value, doc):
+        key = self._key(field, value)
+        if key not in self._postings:
+            if field in _CODE_FIELD_NAMES:
+                insort(self._codes, (key[1], field))
+            else:
+                for word in set(tokenize(value)):
+                    if word not in self._words:
+                        self._words[word] = set()
+                        insort(self._sorted_words, word)
+                    self._words[word].add(key)
+        _add_posting(self._postings, key, doc)
+        self._max_doc = max(self._max_doc, doc)
+
+    def on_change(self, name, op, rows, before):
+        if name not in DOC_COLUMN:
+            return
+        doc_column = DOC_COLUMN[name]
+        fields = CODE_FIELDS[name] + TEXT_FIELDS[name]
+
+        with self._lock:
+            for row, old in zip(rows, before or [None] * len(rows)):
+                for field in fields:
+                    if old is not None:
+                        if old.get(field) == row.get(field) and old.get(doc_column) == row.get(doc_column):
+                            continue
+                        if not _missing(old.get(field)) and not _missing(old.get(doc_column)):
+                            _remove_posting(self._postings, self._key(field, old[field]), int(old[doc_column]))
+                    if not _missing(row.get(field)) and not _missing(row.get(doc_column)):
+                        self._add(field, row[field], int(row[doc_column]))
+
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+
+    def _code_keys(self, term):
+        """Code keys whose normalized code starts with term (or equals it, for short terms)"""
+        matches = term.__eq__ if len(term) < MIN_PREFIX_LENGTH else lambda code: code.startswith(term)
+        keys = []
+        i = bisect_left(self._codes, (term,))
+        while i < len(self._codes) and matches(self._codes[i][0]):
+            code, field = self._codes[i]
+            keys.append((field, code))
+            i += 1
+        return keys
+
+    def _word_keys(self, word):
+        """Text keys containing word (or, for longer words, a word starting with it)"""
+        if len(word) < MIN_PREFIX_LENGTH:
+            return self._words.get(word, set())
+        keys = set()
+        i = bisect_left(self._sorted_words, word)
+        while i < len(self._sorted_words) and self._sorted_words[i].startswith(word):
+            keys |= self._words[self._sorted_words[i]]
+            i += 1
+        return keys
+
+    def _mask(self, keys):
+        mask = np.zeros(self._max_doc + 1, dtype=bool)
+        singles = []
+        for key in keys:
+            posting = self._postings.get(key)
+            if posting is None:
+                continue
+            if isinstance(posting, int):
+                singles.append(posting)
+            else:
+                mask[np.asarray(posting, dtype=np.int64)] = True
+        mask[singles] = True
+        return mask
+
+    def _chunk_mask(self, chunk):
+        """Work orders matching one whitespace-separated query chunk"""
+        mask = self._mask(self._code_keys(normalize(chunk)))
+        # Text matches need every word of the chunk ('fuel-pump' finds 'fuel pump')
+        words = tokenize(chunk)
+        if words:
+            text = self._mask(self._word_keys(words[0]))
+            for word in words[1:]:
+                text &= self._mask(self._word_keys(word))
+            mask |= text
+        return mask
+
+    def search(self, query):
+        """Sorted IDs of work orders matching every chunk of the query"""
+        chunks = query.split()
+        if not chunks:
+            return np.array([], dtype=np.int64)
+        with self._lock:
+            result = self._chunk_mask(chunks[0])
+            for chunk in chunks[1:]:
+                if not result.any():
+                    break
+                result &= self._chunk_mask(chunk)
+        return np.flatnonzero(result)
+
+def _missing(value):
+    return value is None or (not isinstance(value, str) and pd.isna(value))
+
+def search_index(store):
+    """The store's incrementally maintained search index"""
+    return store.maintained('search_index', SearchIndex)
+
+def search_work_orders(store, query):
+    """Sorted IDs of work orders matching a free-text / code query"""
+    return search_index(store).search(query)
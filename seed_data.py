@@ -0,0 +1,455 @@
+"""
+AMIC MMS - Seed Data
+Reference tables and demo transactional data for the ERD
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+import hashlib
+
+from schema import WORK_ORDER_STATUSES
+
+# ============================================================================
+# VECTORIZED GENERATORS (demo seed and load-test volumes)
+# ============================================================================
+
+def _pick(df, rng, n):
+    """n rows drawn with replacement, reindexed 0..n-1"""
+    return df.iloc[rng.integers(len(df), size=n)].reset_index(drop=True)
+
+def _days(rng, low, high, n):
+    return pd.to_timedelta(rng.integers(low, high, size=n), unit='D')
+
+def scale_reference(tables, n_workshops=None, n_vehicles=None, rng=None):
+    """Copy of tables with workshops and vehicles added up to the requested counts
+    
+    New workshops reuse the existing units and regions in turn; new vehicles
+    copy the unit, battalion, type and brand of a randomly drawn existing one.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    tables = dict(tables)
+    
+    workshop = tables['workshop']
+    if n_workshops and n_workshops > len(workshop):
+        extra = np.arange(len(workshop), n_workshops)
+        added = workshop.iloc[extra % len(workshop)].reset_index(drop=True)
+        added['Workshop_Name'] = 'Workshop ' + pd.Series(extra + 1).astype(str).str.zfill(3)
+        tables['workshop'] = pd.concat([workshop, added], ignore_index=True)
+    
+    vehicle = tables['vehicle']
+    if n_vehicles and n_vehicles > len(vehicle):
+        extra = pd.Series(np.arange(len(vehicle), n_vehicles) + 1).astype(str)
+        added = _pick(vehicle, rng, len(extra))
+        added['Vehicle_Number'] = 'VEH-' + extra.str.zfill(3)
+        added['Vehicle_Chassis_Number'] = 'CHAS' + extra.str.zfill(6)
+        tables['vehicle'] = pd.concat([vehicle, added], ignore_index=True)
+    
+    return tables
+
+def generate_work_orders(tables, n, rng, start_id=1, today=None, days=180):
+    """n work orders with one malfunction each, consistent with the reference tables"""
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    ids = np.arange(start_id, start_id + n)
+    
+    vehicle = _pick(tables['vehicle'], rng, n)
+    failure = _pick(tables['failure_catalogue'], rng, n)
+    technicians = tables['technical_user'][['Employee_ID']].merge(tables['user'], on='Employee_ID', how='left')
+    technician = _pick(technicians, rng, n)
+    workshop = _pick(tables['workshop'], rng, n)
+    
+    malfunction_date = today - _days(rng, 1, days, n)
+    reception_date = malfunction_date + _days(rng, 0, 2, n)
+    creation_date = reception_date
+    status = rng.choice(WORK_ORDER_STATUSES, size=n, p=[0.3, 0.4, 0.3])
+    completion_date = (creation_date + _days(rng, 1, 30, n)).where(status == 'Completed')
+    
+    work_orders = pd.DataFrame({
+        'ID': ids,
+        'Employee_ID': technician['Employee_ID'],
+        'Workshop_Name': workshop['Workshop_Name'],
+        'Vehicle_Number': vehicle['Vehicle_Number'],
+        'AlKhorayef_Reception_Date': reception_date,
+        'Equipment_Owning_Unit': vehicle['Unit_Name'],
+        'Vehicle_Type': vehicle['Vehicle_Type'],
+        'Malfunction_Type': failure['System'],
+        'Malfunction_Date': malfunction_date,
+        'MNG_Work_Order_Creation_Date': creation_date,
+        'AIC_Work_Order_Number': f'SP-{datetime.now().year}-' + pd.Series(ids).astype(str).str.zfill(5),
+        'Technician_Name': technician['Employee_First_Name'] + ' ' + technician['Employee_Last_Name'],
+        'Work_Order_Status': status,
+        'Require_Spare_Parts': rng.random(n) < 0.6,
+        'Work_Order_Completion_Date': completion_date,
+        'Comments': 'Work order for ' + failure['System'] + ' - ' + failure['Subsystem'] + ' issue',
+        'Row_Version': 1
+    })
+    
+    malfunction = pd.DataFrame({
+        'ID': ids,
+        'Vehicle_Number': vehicle['Vehicle_Number'],
+        'Work_Order_ID': ids,
+        'Malfunction_Code': failure['Malfunction_Code'],
+        'Resolution_Description_English': failure['Resolution_Description_English'],
+        'Resolution_Description_Arabic': failure['Resolution_Description_Arabic'],
+        'Resolution_Code': failure['Resolution_Code'],
+        'Cause_Description_English': failure['Cause_Description_English'],
+        'Cause_Description_Arabic': failure['Cause_Description_Arabic'],
+        'Cause_Code': failure['Cause_Code'],
+        'Description_English': (failure['System'] + ' - ' + failure['Subsystem'] + ' - '
+                                + failure['Component'] + ' - ' + failure['Failure_Mode']),
+        'Description_Arabic': 'نظام ' + failure['System'] + ' - نظام فرعي ' + failure['Subsystem']
+    })
+    
+    return work_orders, malfunction
+
+def generate_supply_chain(tables, work_orders, rng, today=None):
+    """Supply requests for orders needing parts, PRs for approved requests, orders for approved PRs"""
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    
+    needs_parts = work_orders[work_orders['Require_Spare_Parts'].to_numpy(dtype=bool)]
+    n = len(needs_parts)
+    completed = needs_parts['Work_Order_Status'].to_numpy() == 'Completed'
+    supply_request = pd.DataFrame({
+        'ID': np.arange(1, n + 1),
+        'Work_Order_ID': needs_parts['ID'].to_numpy(),
+        'Part_ID': _pick(tables['part'], rng, n)['ID'],
+        'Quantity_Requested': rng.integers(1, 6, size=n),
+        'Status': np.where(completed, 'Issued', rng.choice(['Pending', 'Approved'], size=n))
+    })
+    
+    approved = supply_request['Status'].to_numpy() == 'Approved'
+    m = int(approved.sum())
+    creation_date = pd.DatetimeIndex(needs_parts['MNG_Work_Order_Creation_Date'].to_numpy()[approved])
+    pr_date = creation_date + _days(rng, 1, 6, m)
+    pr_status = rng.choice(['Pending', 'Approved'], size=m, p=[0.4, 0.6])
+    purchase_request = pd.DataFrame({
+        'ID': np.arange(1, m + 1),
+        'Supply_Request_ID': supply_request['ID'].to_numpy()[approved],
+        'Employee_ID': _pick(tables['procurement_user'], rng, m)['Employee_ID'],
+        'PR_Date': pr_date,
+        'Status': pr_status
+    })
+    
+    placed = pr_status == 'Approved'
+    k = int(placed.sum())
+    order_date = pr_date[placed] + _days(rng, 1, 8, k)
+    delivery_date = order_date + _days(rng, 3, 31, k)
+    orders = pd.DataFrame({
+        'ID': np.arange(1, k + 1),
+        'PR_ID': purchase_request['ID'].to_numpy()[placed],
+        'Status': np.where(delivery_date <= today, 'Delivered', 'In Transit'),
+        'Order_Date': order_date,
+        'Delivery_Date': delivery_date
+    })
+    
+    return supply_request, purchase_request, orders
+
+# ============================================================================
+# SEED DATA
+# ============================================================================
+
+def hash_password(password):
+    """Simple password hashing"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def build_tables(seed=None):
+    """Build every ERD table with demo data, keyed by table name"""
+    
+    rng = np.random.default_rng(seed)
+    tables = {}
+    
+    # ========================================================================
+    # REFERENCE TABLES
+    # ========================================================================
+    
+    # Department
+    tables['department'] = pd.DataFrame({
+        'Department_Code': ['TECH', 'INV', 'PROC', 'OPS', 'ADMIN'],
+        'Department_Name': ['Technical Services', 'Inventory Management', 'Procurement', 'Operations', 'Administration'],
+        'Department_Supervisor': ['Ahmed Al-Rashid', 'Fatima Al-Qasim', 'Mohammed Al-Harbi', 'Khalid Al-Mansour', 'Sara Al-Fahad']
+    })
+    
+    # Region (just region name as PK per ERD)
+    tables['region'] = pd.DataFrame({
+        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern']
+    })
+    
+    # Unit
+    tables['unit'] = pd.DataFrame({
+        'Unit_Name': ['Unit 101', 'Unit 102', 'Unit 103', 'Unit 104', 'Unit 105'],
+        'Workshop_Name': ['Workshop Alpha', 'Workshop Beta', 'Workshop Gamma', 'Workshop Delta', 'Workshop Epsilon'],
+        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern']
+    })
+    
+    # Workshop
+    tables['workshop'] = pd.DataFrame({
+        'Workshop_Name': ['Workshop Alpha', 'Workshop Beta', 'Workshop Gamma', 'Workshop Delta', 'Workshop Epsilon'],
+        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern'],
+        'Unit_Name': ['Unit 101', 'Unit 102', 'Unit 103', 'Unit 104', 'Unit 105']
+    })
+    
+    # Battalion
+    tables['battalion'] = pd.DataFrame({
+        'Battalion_Name': ['Battalion 1A', 'Battalion 1B', 'Battalion 2A', 'Battalion 2B', 'Battalion 3A'],
+        'Unit_Name': ['Unit 101', 'Unit 101', 'Unit 102', 'Unit 102', 'Unit 103'],
+        'Vehicle_Number': ['VEH-001', 'VEH-002', 'VEH-003', 'VEH-004', 'VEH-005']
+    })
+    
+    # ========================================================================
+    # USERS (Main User table)
+    # ========================================================================
+    
+    tables['user'] = pd.DataFrame({
+        'Employee_ID': [1, 2, 3, 4, 5, 6, 7, 8],
+        'Department_Code': ['TECH', 'TECH', 'TECH', 'INV', 'PROC', 'OPS', 'OPS', 'ADMIN'],
+        'Employee_First_Name': ['Ali', 'Omar', 'Yousef', 'Layla', 'Hassan', 'Nora', 'Tariq', 'Admin'],
+        'Employee_Last_Name': ['Al-Saud', 'Al-Harbi', 'Al-Qahtani', 'Al-Otaibi', 'Al-Shammari', 'Al-Dosari', 'Al-Mutairi', 'User'],
+        'Job_Title': ['Technician', 'Supervisor', 'Technician', 'Inventory Specialist', 'Procurement Officer', 'Manager', 'Supervisor', 'System Admin'],
+        'Resource_ID': ['RES001', 'RES002', 'RES003', 'RES004', 'RES005', 'RES006', 'RES007', 'RES008']
+    })
+    
+    # ========================================================================
+    # ROLE-SPECIFIC USER TABLES (per ERD)
+    # ========================================================================
+    
+    # TechnicalUser
+    tables['technical_user'] = pd.DataFrame({
+        'ID': [1, 2],
+        'Employee_ID': [1, 3],  # Ali and Yousef
+        'Username': ['ali.tech', 'yousef.tech'],
+        'Password': [hash_password('tech123'), hash_password('tech123')],
+        'Workshop_Name': ['Workshop Alpha', 'Workshop Beta']
+    })
+    
+    # InventoryUser
+    tables['inventory_user'] = pd.DataFrame({
+        'ID': [1],
+        'Employee_ID': [4],  # Layla
+        'Username': ['layla.inv'],
+        'Password': [hash_password('inv123')]
+    })
+    
+    # ProcurementUser
+    tables['procurement_user'] = pd.DataFrame({
+        'ID': [1],
+        'Employee_ID': [5],  # Hassan
+        'Username': ['hassan.proc'],
+        'Password': [hash_password('proc123')]
+    })
+    
+    # For demo purposes, add supervisor, manager, and admin (not in ERD but needed for app)
+    tables['other_users'] = pd.DataFrame({
+        'ID': [1, 2, 3],
+        'Employee_ID': [2, 6, 8],  # Omar (Supervisor), Nora (Manager), Admin
+        'Username': ['omar.super', 'nora.mgr', 'admin'],
+        'Password': [hash_password('super123'), hash_password('mgr123'), hash_password('admin123')],
+        'Role': ['Supervisor', 'Manager', 'Admin'],
+        'Workshop_Name': ['Workshop Alpha', None, None]
+    })
+    
+    # ========================================================================
+    # VEHICLES
+    # ========================================================================
+    
+    tables['vehicle'] = pd.DataFrame({
+        'Vehicle_Number': ['VEH-001', 'VEH-002', 'VEH-003', 'VEH-004', 'VEH-005', 
+                          'VEH-006', 'VEH-007', 'VEH-008', 'VEH-009', 'VEH-010'],
+        'Unit_Name': ['Unit 101', 'Unit 101', 'Unit 102', 'Unit 102', 'Unit 103', 
+                     'Unit 103', 'Unit 104', 'Unit 104', 'Unit 105', 'Unit 105'],
+        'Battalion_Name': ['Battalion 1A', 'Battalion 1B', 'Battalion 2A', 'Battalion 2B', 'Battalion 3A',
+                          'Battalion 1A', 'Battalion 2A', 'Battalion 2B', 'Battalion 3A', 'Battalion 1B'],
+        'Vehicle_Type': ['MRAP', 'APC', 'Transport', 'MRAP', 'APC', 
+                        'Transport', 'MRAP', 'APC', 'Transport', 'MRAP'],
+        'Vehicle_Brand': ['Oshkosh', 'BAE Systems', 'Mercedes', 'Oshkosh', 'BAE Systems',
+                         'Mercedes', 'Oshkosh', 'BAE Systems', 'Mercedes', 'Oshkosh'],
+        'Vehicle_Chassis_Number': [f'CHAS{i:06d}' for i in range(1, 11)]
+    })
+    
+    # ========================================================================
+    # FAILURE CATALOGUE
+    # ========================================================================
+    
+    tables['failure_catalogue'] = pd.DataFrame({
+        'System': [
+            'HVAC', 'HVAC', 'HVAC', 'HVAC', 'HVAC',
+            'Engine', 'Engine', 'Engine', 'Engine', 'Engine',
+            'Brakes', 'Brakes', 'Brakes', 'Brakes',
+            'Suspension', 'Suspension', 'Suspension',
+            'Electrical', 'Electrical', 'Electrical'
+        ],
+        'Subsystem': [
+            'Air Conditioning', 'Air Conditioning', 'Air Conditioning', 'Heating', 'Heating',
+            'Fuel System', 'Fuel System', 'Ignition', 'Ignition', 'Cooling',
+            'Hydraulic', 'Hydraulic', 'Friction', 'Friction',
+            'Front', 'Front', 'Rear',
+            'Battery', 'Charging', 'Charging'
+        ],
+        'Component': [
+            'Compressor', 'Condenser', 'Blower Motor', 'Heater Core', 'Heater Core',
+            'Fuel Pump', 'Fuel Injectors', 'Spark Plugs', 'Ignition Coils', 'Radiator',
+            'Master Cylinder', 'Brake Lines', 'Brake Pads', 'Rotors',
+            'Struts', 'Control Arms', 'Shock Absorbers',
+            '12V Battery', 'Alternator', 'Alternator'
+        ],
+        'Failure_Mode': [
+            'Mechanical seizure', 'Leak at tubes', 'Motor burnt', 'Core leak', 'Blockage',
+            'Pump failure', 'Injector clogged', 'Fouled plugs', 'Coil failure', 'Radiator leak',
+            'Internal leak', 'Line rupture', 'Worn pads', 'Warped rotor',
+            'Leaking strut', 'Worn bushings', 'Shock failure',
+            'Dead battery', 'No charge', 'Noisy bearing'
+        ],
+        'Malfunction_Code': [
+            'HVAC-AC-001', 'HVAC-AC-010', 'HVAC-AC-020', 'HVAC-HT-001', 'HVAC-HT-002',
+            'ENG-FUEL-001', 'ENG-FUEL-010', 'ENG-IGN-001', 'ENG-IGN-010', 'ENG-COOL-001',
+            'BRK-HYD-001', 'BRK-HYD-010', 'BRK-FRIC-001', 'BRK-FRIC-010',
+            'SUSP-FRT-001', 'SUSP-FRT-010', 'SUSP-REAR-001',
+            'ELEC-BAT-001', 'ELEC-CHG-001', 'ELEC-CHG-002'
+        ],
+        'Cause_Code': [
+            'HVAC-AC-C001', 'HVAC-AC-C010', 'HVAC-AC-C020', 'HVAC-HT-C001', 'HVAC-HT-C002',
+            'ENG-FUEL-C001', 'ENG-FUEL-C010', 'ENG-IGN-C001', 'ENG-IGN-C010', 'ENG-COOL-C001',
+            'BRK-HYD-C001', 'BRK-HYD-C010', 'BRK-FRIC-C001', 'BRK-FRIC-C010',
+            'SUSP-FRT-C001', 'SUSP-FRT-C010', 'SUSP-REAR-C001',
+            'ELEC-BAT-C001', 'ELEC-CHG-C001', 'ELEC-CHG-C002'
+        ],
+        'Resolution_Code': [
+            'HVAC-AC-R001', 'HVAC-AC-R010', 'HVAC-AC-R020', 'HVAC-HT-R001', 'HVAC-HT-R002',
+            'ENG-FUEL-R001', 'ENG-FUEL-R010', 'ENG-IGN-R001', 'ENG-IGN-R010', 'ENG-COOL-R001',
+            'BRK-HYD-R001', 'BRK-HYD-R010', 'BRK-FRIC-R001', 'BRK-FRIC-R010',
+            'SUSP-FRT-R001', 'SUSP-FRT-R010', 'SUSP-REAR-R001',
+            'ELEC-BAT-R001', 'ELEC-CHG-R001', 'ELEC-CHG-R002'
+        ],
+        'Resolution_Description_English': [
+            'Replace compressor; Replace clutch; Flush circuit; Replace filter/drier; Vacuum & recharge',
+            'Replace condenser; Clean fins; Leak test; Vacuum & recharge',
+            'Replace blower motor; Inspect resistor; Verify airflow',
+            'Replace heater core; Flush circuit; Bleed system',
+            'Flush heater core; Check coolant flow; Replace if needed',
+            'Replace fuel pump; Check electrical; Verify fuel quality',
+            'Clean injectors; Replace if needed; Check fuel quality',
+            'Replace spark plugs; Check gap; Verify ignition timing',
+            'Replace ignition coil; Check connections; Test resistance',
+            'Replace radiator; Pressure test; Check coolant level',
+            'Replace master cylinder; Bleed brake system',
+            'Replace brake line; Bleed system; Pressure test',
+            'Replace brake pads; Resurface rotors; Lubricate slides',
+            'Replace or resurface rotor; Replace pads',
+            'Replace strut assembly; Perform alignment',
+            'Replace control arm bushings; Perform alignment',
+            'Replace shock absorbers; Check mounting points',
+            'Test battery; Replace if failed; Check charging system',
+            'Replace alternator; Check belt; Test output',
+            'Replace alternator; Check belt tension'
+        ],
+        'Resolution_Description_Arabic': [
+            'استبدال الضاغط؛ استبدال القابض؛ تنظيف الدائرة؛ استبدال الفلتر؛ شفط وإعادة شحن',
+            'استبدال المكثف؛ تنظيف الزعانف؛ اختبار التسرب؛ شفط وإعادة شحن',
+            'استبدال محرك النفخ؛ فحص المقاومة؛ التحقق من تدفق الهواء',
+            'استبدال قلب السخان؛ تنظيف الدائرة؛ تهوية النظام',
+            'تنظيف قلب السخان؛ فحص تدفق المبرد؛ استبدال إذا لزم الأمر',
+            'استبدال مضخة الوقود؛ فحص الكهرباء؛ التحقق من جودة الوقود',
+            'تنظيف الحاقنات؛ استبدال إذا لزم الأمر؛ فحص جودة الوقود',
+            'استبدال شمعات الإشعال؛ فحص الفجوة؛ التحقق من توقيت الإشعال',
+            'استبدال ملف الإشعال؛ فحص التوصيلات؛ اختبار المقاومة',
+            'استبدال الرادياتير؛ اختبار الضغط؛ فحص مستوى المبرد',
+            'استبدال الأسطوانة الرئيسية؛ تهوية نظام الفرامل',
+            'استبدال خط الفرامل؛ تهوية النظام؛ اختبار الضغط',
+            'استبدال فحمات الفرامل؛ تجديد الأقراص؛ تشحيم المنزلقات',
+            'استبدال أو تجديد القرص؛ استبدال الفحمات',
+            'استبدال مجموعة الدعامة؛ إجراء محاذاة',
+            'استبدال وسائد ذراع التحكم؛ إجراء محاذاة',
+            'استبدال ماصات الصدمات؛ فحص نقاط التثبيت',
+            'اختبار البطارية؛ استبدال إذا فشلت؛ فحص نظام الشحن',
+            'استبدال المولد؛ فحص الحزام؛ اختبار الإخراج',
+            'استبدال المولد؛ فحص شد الحزام'
+        ],
+        'Cause_Description_English': [
+            'Compressor mechanical seizure', 'Condenser tube leak', 'Blower motor electrical failure',
+            'Heater core leak', 'Heater core blockage', 'Fuel pump mechanical failure',
+            'Fuel injector clogged', 'Spark plugs fouled', 'Ignition coil failure',
+            'Radiator leak', 'Master cylinder internal leak', 'Brake line rupture',
+            'Brake pads worn', 'Rotor warped', 'Strut leaking', 'Control arm bushings worn',
+            'Shock absorber failure', 'Battery dead', 'Alternator not charging', 'Alternator bearing noise'
+        ],
+        'Cause_Description_Arabic': [
+            'انحشار ميكانيكي للضاغط', 'تسرب أنبوب المكثف', 'فشل كهربائي لمحرك النفخ',
+            'تسرب قلب السخان', 'انسداد قلب السخان', 'فشل ميكانيكي لمضخة الوقود',
+            'انسداد حاقن الوقود', 'شمعات إشعال متسخة', 'فشل ملف الإشعال',
+            'تسرب الرادياتير', 'تسرب داخلي للأسطوانة الرئيسية', 'انفجار خط الفرامل',
+            'فحمات الفرامل مستهلكة', 'القرص ملتوي', 'الدعامة متسربة', 'وسائد ذراع التحكم مستهلكة',
+            'فشل ماص الصدمات', 'البطارية فارغة', 'المولد لا يشحن', 'ضوضاء في محمل المولد'
+        ]
+    })
+    
+    # ========================================================================
+    # WORK ORDERS & MALFUNCTIONS (ERD compliant field names)
+    # ========================================================================
+    
+    tables['work_orders'], tables['malfunction'] = generate_work_orders(tables, 20, rng)
+    
+    # ========================================================================
+    # WAREHOUSE & PARTS
+    # ========================================================================
+    
+    tables['warehouse'] = pd.DataFrame({
+        'ID': [1, 2, 3, 4, 5],
+        'Warehouse_Name': ['Central Warehouse', 'Eastern Warehouse', 'Western Warehouse', 'Northern Warehouse', 'Southern Warehouse'],
+        'Part_Number': ['WH-C-001', 'WH-E-001', 'WH-W-001', 'WH-N-001', 'WH-S-001'],
+        'Unit': ['Unit 101', 'Unit 102', 'Unit 103', 'Unit 104', 'Unit 105'],
+        'Region': ['Central', 'Eastern', 'Western', 'Northern', 'Southern']
+    })
+    
+    tables['part'] = pd.DataFrame({
+        'ID': range(1, 21),
+        'Warehouse_Code': ['WH-C', 'WH-E', 'WH-W', 'WH-N', 'WH-S'] * 4,
+        'Part_Number': [f'PN-{i:05d}' for i in range(1, 21)],
+        'OEM_Number': [f'OEM-{i:05d}' for i in range(1, 21)],
+        'English_Description': ['Compressor Assembly', 'Fuel Pump Kit', 'Brake Pad Set', 'Alternator', 'Strut Assembly',
+                               'Ignition Coil', 'Radiator', 'Battery 12V', 'Fuel Injector', 'Heater Core',
+                               'Master Cylinder', 'Shock Absorber', 'Spark Plug Set', 'Brake Rotor', 'Control Arm',
+                               'Condenser', 'Blower Motor', 'Water Pump', 'Thermostat', 'Belt Tensioner'],
+        'Arabic_Description': ['مجموعة الضاغط', 'طقم مضخة الوقود', 'طقم فرامل', 'مولد', 'مجموعة دعامة',
+                              'ملف الإشعال', 'المبرد', 'بطارية 12 فولت', 'حاقن الوقود', 'نواة السخان',
+                              'اسطوانة رئيسية', 'ممتص الصدمات', 'طقم شمعة إشعال', 'قرص الفرامل', 'ذراع التحكم',
+                              'المكثف', 'محرك النفخ', 'مضخة الماء', 'منظم الحرارة', 'شد الحزام'],
+        'Part_Locations': [f'A-{i:02d}' for i in range(1, 21)],
+        'Part_Quantity': rng.integers(5, 100, 20)
+    })
+    
+    # ========================================================================
+    # SUPPLY REQUEST, PURCHASE REQUEST, ORDERS
+    # ========================================================================
+    
+    tables['supply_request'] = pd.DataFrame({
+        'ID': [1, 2, 3],
+        'Work_Order_ID': [1, 2, 5],
+        'Part_ID': [1, 2, 3],
+        'Quantity_Requested': [2, 1, 4],
+        'Status': ['Pending', 'Approved', 'Issued']
+    })
+    
+    tables['purchase_request'] = pd.DataFrame({
+        'ID': [1, 2],
+        'Supply_Request_ID': [1, 2],
+        'Employee_ID': [5, 5],
+        'PR_Date': [(datetime.now() - timedelta(days=10)).strftime('%Y-%m-%d'),
+                    (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')],
+        'Status': ['Pending', 'Approved']
+    })
+    
+    tables['orders'] = pd.DataFrame({
+        'ID': [1],
+        'PR_ID': [1],
+        'Status': ['In Transit'],
+        'Order_Date': [(datetime.now() - timedelta(days=15)).strftime('%Y-%m-%d')],
+        'Delivery_Date': [(datetime.now() + timedelta(days=5)).strftime('%Y-%m-%d')]
+    })
+    
+    # ========================================================================
+    # AUDIT LOG (one record per bulk change; starts empty)
+    # ========================================================================
+    
+    tables['audit_log'] = pd.DataFrame(columns=['ID', 'Timestamp', 'Employee_ID', 'Action',
+                                                'Table_Name', 'Record_Count', 'Details'])
+    
+    return tables
@@ -0,0 +1,256 @@
+"""
+AMIC MMS - Write Services
+Validated creates and updates shared by the UI forms, bulk loads and the API
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from models import TABLE_UPDATES, validate_batch, validate_records
+
+# Malfunction columns filled from the catalogue entry of its Malfunction_Code
+CATALOGUE_FIELDS = ['Resolution_Description_English', 'Resolution_Description_Arabic', 'Resolution_Code',
+                    'Cause_Description_English', 'Cause_Description_Arabic', 'Cause_Code']
+
+class ValidationFailed(ValueError):
+    """A write rejected by model or integrity checks; errors is {position: [(field, message)]}"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(format_errors(errors)))
+
+def format_errors(errors):
+    """One 'Field: message' line per problem, prefixed with the record position in batches"""
+    lines = []
+    for position, messages in sorted(errors.items()):
+        prefix = f"#{position} " if len(errors) > 1 else ''
+        lines.extend(f"{prefix}{field + ': ' if field else ''}{message}" for field, message in messages)
+    return lines
+
+def _validated(store, name, record, pending=None):
+    valid, errors = validate_records(store, name, [record], pending)
+    if errors:
+        raise ValidationFailed(errors)
+    return valid[0]
+
+# ============================================================================
+# BATCH INSERTS
+# ============================================================================
+
+def insert_records(store, name, records, all_or_nothing=False):
+    """Validate records, allocate IDs and append the valid ones as one write
+
+    Returns ({position: new ID or None}, {position: [(field, message)]}).
+    With all_or_nothing, any error raises ValidationFailed and nothing is
+    written.
+    """
+    with store.locked(name):
+        valid, errors = validate_records(store, name, records)
+        if errors and all_or_nothing:
+            raise ValidationFailed(errors)
+
+        has_ids = 'ID' in store.table(name).columns
+        ids = iter(store.next_ids(name, len(valid)) if has_ids and valid else [])
+        created = {}
+        rows = []
+        for position, row in valid.items():
+            if has_ids:
+                row['ID'] = next(ids)
+            if name == 'work_orders' and not row.get('AIC_Work_Order_Number'):
+                row['AIC_Work_Order_Number'] = aic_number(row['ID'])
+            created[position] = row.get('ID')
+            rows.append(row)
+        if rows:
+            store.append(name, rows)
+
+    return created, errors
+
+def aic_number(work_order_id, year=None):
+    """AIC work order number for a new work order"""
+    return f'SP-{year or datetime.now().year}-{work_order_id:05d}'
+
+# ============================================================================
+# WORK ORDERS
+# ============================================================================
+
+def _present(value):
+    return value is not None and (isinstance(value, str) or not pd.isna(value))
+
+def _lookup(store, name, value, key_col):
+    try:
+        return store.get(name, value, key_col=key_col)
+    except TypeError:
+        # Unhashable input (a list or dict from JSON) matches nothing
+        return None
+
+def _fill(record, field, value):
+    if not _present(record.get(field)) and _present(value):
+        record[field] = value
+
+def complete_work_order(store, work_order, malfunction):
+    """Copies of a work order and its malfunction with the derived columns filled in
+
+    The vehicle gives the owning unit and vehicle type, the employee the
+    technician name, and the catalogue entry of the Malfunction_Code the
+    system, codes and descriptions. Values the caller set are kept.
+    """
+    wo, mal = dict(work_order), dict(malfunction)
+
+    vehicle = _lookup(store, 'vehicle', wo.get('Vehicle_Number'), 'Vehicle_Number')
+    if vehicle:
+        _fill(wo, 'Equipment_Owning_Unit', vehicle['Unit_Name'])
+        _fill(wo, 'Vehicle_Type', vehicle['Vehicle_Type'])
+
+    user = _lookup(store, 'user', wo.get('Employee_ID'), 'Employee_ID')
+    if user:
+        _fill(wo, 'Technician_Name', f"{user['Employee_First_Name']} {user['Employee_Last_Name']}")
+
+    entry = _lookup(store, 'failure_catalogue', mal.get('Malfunction_Code'), 'Malfunction_Code')
+    if entry:
+        _fill(wo, 'Malfunction_Type', entry['System'])
+        for field in CATALOGUE_FIELDS:
+            _fill(mal, field, entry[field])
+        _fill(mal, 'Description_English',
+              f"{entry['System']} - {entry['Subsystem']} - {entry['Component']} - {entry['Failure_Mode']}")
+        _fill(mal, 'Description_Arabic', f"نظام {entry['System']} - نظام فرعي {entry['Subsystem']}")
+
+    _fill(wo, 'MNG_Work_Order_Creation_Date', datetime.now().date())
+    return wo, mal
+
+def create_work_orders(store, items, all_or_nothing=False):
+    """Create (work_order, malfunction) pairs with one write per table
+
+    Returns ({position: new work order row}, {position: [(field, message)]}),
+    with malfunction problems reported as 'malfunction.<field>'. Each
+    malfunction's Work_Order_ID and Vehicle_Number are taken from its new
+    work order. With all_or_nothing, any error raises ValidationFailed and
+    nothing is written.
+    """
+    with store.locked('work_orders', 'malfunction'):
+        pairs = [complete_work_order(store, work_order, malfunction) for work_order, malfunction in items]
+        valid_wo, errors = validate_records(store, 'work_orders', [wo for wo, _ in pairs])
+        # Rejected work orders never reach malfunction validation; an unknown
+        # code is still the real problem when it left Malfunction_Type unset
+        for i in errors:
+            code = pairs[i][1].get('Malfunction_Code')
+            if code is not None and _lookup(store, 'failure_catalogue', code, 'Malfunction_Code') is None:
+                errors[i].append(('malfunction.Malfunction_Code', f"No failure_catalogue with Malfunction_Code {code!r}"))
+
+        positions = list(valid_wo)
+        wo_ids = store.next_ids('work_orders', len(positions)) if positions else []
+        valid_mal, mal_errors = validate_records(
+            store, 'malfunction',
+            [dict(pairs[i][1], Work_Order_ID=wo_id, Vehicle_Number=valid_wo[i]['Vehicle_Number'])
+             for i, wo_id in zip(positions, wo_ids)],
+            pending={'work_orders': wo_ids},
+        )
+        for j, messages in mal_errors.items():
+            errors[positions[j]] = [(f"malfunction.{field}" if field else 'malfunction', message)
+                                    for field, message in messages]
+        if errors and all_or_nothing:
+            raise ValidationFailed(errors)
+
+        created = {}
+        wo_rows, mal_rows = [], []
+        for j, (i, wo_id) in enumerate(zip(positions, wo_ids)):
+            if j not in valid_mal:
+                continue
+            wo = valid_wo[i]
+            wo['ID'] = wo_id
+            wo['AIC_Work_Order_Number'] = wo['AIC_Work_Order_Number'] or aic_number(wo_id)
+            created[i] = wo
+            wo_rows.append(wo)
+            mal_rows.append(valid_mal[j])
+
+        if wo_rows:
+            for mal, mal_id in zip(mal_rows, store.next_ids('malfunction', len(mal_rows))):
+                mal['ID'] = mal_id
+            store.append('work_orders', wo_rows)
+            store.append('malfunction', mal_rows)
+
+    return created, errors
+
+def create_work_order(store, work_order, malfunction):
+    """Create a work order and its malfunction together; returns the new work order row"""
+    created, _ = create_work_orders(store, [(work_order, malfunction)], all_or_nothing=True)
+    return created[0]
+
+# ============================================================================
+# UPDATES
+# ============================================================================
+
+def update_records(store, name, changes, all_or_nothing=True, expected_versions=None):
+    """Validate {ID: values} with the table's update model and apply them as one write
+
+    Only the fields given are changed. Returns ({ID: applied values},
+    {ID: [(field, message)]}); with all_or_nothing (the default), any error
+    raises ValidationFailed and nothing is written. expected_versions
+    ({ID: Row_Version read}) makes the write compare-and-swap: if any of
+    those rows changed since, ConflictError is raised and nothing is written.
+    """
+    keys = list(changes)
+    with store.locked(name):
+        valid, errors = validate_batch(TABLE_UPDATES[name], [changes[key] for key in keys], exclude_unset=True)
+        for i, key in enumerate(keys):
+            current = _lookup(store, name, key, 'ID')
+            if current is None:
+                valid.pop(i, None)
+                errors[i] = [(None, f"No {name} with ID {key!r}")]
+            elif i in valid and name == 'work_orders':
+                completed = valid[i].get('Work_Order_Completion_Date')
+                created = current['MNG_Work_Order_Creation_Date']
+                if completed is not None and pd.notna(created) and pd.Timestamp(completed) < created:
+                    del valid[i]
+                    errors.setdefault(i, []).append(
+                        ('Work_Order_Completion_Date', 'Work_Order_Completion_Date is before MNG_Work_Order_Creation_Date'))
+
+        errors = {keys[i]: messages for i, messages in errors.items()}
+        if errors and all_or_nothing:
+            raise ValidationFailed(errors)
+
+        applied = {keys[i]: values for i, values in valid.items() if values}
+        expected = {key: version for key, version in (expected_versions or {}).items() if key in applied}
+        store.update_many(name, applied, expected_versions=expected)
+    return applied, errors
+
+def update_work_order(store, work_order_id, changes, expected_version=None):
+    """Change status, completion date or comments of one work order; returns the updated row
+
+    With expected_version (the Row_Version the caller read), raises
+    ConflictError instead of overwriting someone else's change.
+    """
+    expected = None if expected_version is None else {work_order_id: expected_version}
+    with store.locked('work_orders'):
+        update_records(store, 'work_orders', {work_order_id: changes}, expected_versions=expected)
+        return store.get('work_orders', work_order_id)
+
+# ============================================================================
+# SUPPLY AND PURCHASE REQUESTS
+# ============================================================================
+
+def create_supply_request(store, work_order_id, part_id, quantity, status='Pending'):
+    """Request parts for a work order; returns the new supply request row"""
+    with store.locked('supply_request'):
+        sr = _validated(store, 'supply_request', {
+            'Work_Order_ID': work_order_id,
+            'Part_ID': part_id,
+            'Quantity_Requested': quantity,
+            'Status': status,
+        })
+        sr['ID'] = store.next_id('supply_request')
+        store.append('supply_request', sr)
+    return sr
+
+def create_purchase_request(store, supply_request_id, employee_id, pr_date=None):
+    """Raise a purchase request for a supply request; returns the new purchase request row"""
+    with store.locked('purchase_request'):
+        pr = _validated(store, 'purchase_request', {
+            'Supply_Request_ID': supply_request_id,
+            'Employee_ID': employee_id,
+            'PR_Date': pr_date or datetime.now().date(),
+            'Status': 'Pending',
+        })
+        pr['ID'] = store.next_id('purchase_request')
+        store.append('purchase_request', pr)
+    return pr
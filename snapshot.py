@@ -0,0 +1,190 @@
+"""
+AMIC MMS - Table Snapshots
+Whole-dataset save / load in Arrow formats with a fixed per-table schema
+
+Usage:
+    python snapshot.py save amic_snapshot                      # the configured store, as Arrow IPC
+    python snapshot.py save amic_snapshot --format parquet
+    python snapshot.py info amic_snapshot
+"""
+
+import argparse
+import json
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from pandas.api.types import CategoricalDtype
+
+from schema import DATE, SCHEMAS, apply_schema
+
+MANIFEST = 'manifest.json'
+
+# Uncompressed Arrow IPC (Feather v2) loads fastest, with nothing to
+# decompress and only the projected columns read; Parquet is smaller on
+# disk and for moving datasets around
+FORMATS = {'arrow': '.arrow', 'parquet': '.parquet'}
+
+# ============================================================================
+# SCHEMAS
+# ============================================================================
+
+_ARROW_TYPES = {
+    'int32': pa.int32(),
+    'Int32': pa.int32(),
+    'bool': pa.bool_(),
+    'object': pa.string(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    DATE: pa.timestamp('ns'),
+}
+
+def _arrow_type(dtype):
+    if isinstance(dtype, CategoricalDtype):
+        return _ARROW_TYPES['category']
+    return _ARROW_TYPES[dtype]
+
+def table_schema(name, df):
+    """Arrow schema of a table: declared dtypes from schema.SCHEMAS, inferred types for the rest
+
+    Declaring the types keeps them stable from one snapshot to the next (an
+    empty or all-missing column would otherwise be written as null-typed).
+    """
+    declared = SCHEMAS.get(name, {})
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    return pa.schema([
+        pa.field(col, _arrow_type(declared[col])) if col in declared else inferred.field(col)
+        for col in df.columns
+    ])
+
+# ============================================================================
+# SAVE / LOAD
+# ============================================================================
+
+def save_tables(tables, path, meta=None, format='arrow'):
+    """Write every table to path/<name>.<format>, replacing path atomically
+
+    Tables are cast to their declared dtypes first. The files are written
+    into a sibling temporary directory that is renamed into place once the
+    manifest is on disk, so a crash leaves either the old snapshot or the
+    new one.
+    """
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    for name, df in tables.items():
+        df = apply_schema(name, df.reset_index(drop=True))
+        table = pa.Table.from_pandas(df, schema=table_schema(name, df), preserve_index=False)
+        file = os.path.join(tmp, f"{name}{FORMATS[format]}")
+        if format == 'parquet':
+            pq.write_table(table, file, compression='zstd')
+        else:
+            feather.write_feather(table, file, compression='uncompressed')
+        _fsync_file(file)
+    _write_json(os.path.join(tmp, MANIFEST), dict(meta or {}, format=format, tables=list(tables)))
+
+    old = f"{path}.old"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+    shutil.rmtree(old, ignore_errors=True)
+
+def read_manifest(path):
+    """The manifest of a complete snapshot, or None"""
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _manifest(path):
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No complete snapshot at {path}")
+    return manifest
+
+def read_arrow_table(path, name, manifest=None, columns=None):
+    """One table of a snapshot as a pyarrow Table (memory-mapped, Parquet decoded)
+
+    With columns, only those columns are read from the file.
+    """
+    fmt = (manifest or _manifest(path)).get('format', 'arrow')
+    file = os.path.join(path, f"{name}{FORMATS[fmt]}")
+    if fmt == 'parquet':
+        return pq.read_table(file, columns=columns, memory_map=True)
+    return feather.read_table(file, columns=columns, memory_map=True)
+
+def load_table(path, name, manifest=None, columns=None):
+    """One table of a snapshot (optionally only some columns) as a DataFrame"""
+    table = read_arrow_table(path, name, manifest, columns)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def load_tables(path, columns=None):
+    """{name: DataFrame} for every table of a snapshot
+
+    columns ({name: [column, ...]}) limits the listed tables to those
+    columns; the others are read whole. Loading is not zero-copy: strings
+    become Python objects, and a store built from the frames copies each
+    column into its own growable arrays, so the files are not kept mapped.
+    """
+    manifest = _manifest(path)
+    columns = columns or {}
+    return {name: load_table(path, name, manifest, columns.get(name)) for name in manifest['tables']}
+
+# ============================================================================
+# FILE HELPERS
+# ============================================================================
+
+def _write_json(path, value):
+    with open(path, 'w') as f:
+        json.dump(value, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _fsync_file(path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Save or inspect AMIC MMS table snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    save = commands.add_parser('save', help="snapshot the store configured by $AMIC_STORAGE")
+    save.add_argument('path')
+    save.add_argument('--format', choices=list(FORMATS), default='arrow')
+    info = commands.add_parser('info', help="list the tables of a snapshot")
+    info.add_argument('path')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'save':
+        from data_store import get_store
+        store = get_store()
+        tables = {name: store.table(name) for name in store.table_names()}
+        save_tables(tables, args.path, format=args.format)
+        print(f"Saved {len(tables)} tables to {args.path} ({args.format})")
+        return
+
+    manifest = _manifest(args.path)
+    print(f"{args.path}: {manifest.get('format', 'arrow')}")
+    for name in manifest['tables']:
+        table = read_arrow_table(args.path, name, manifest=manifest)
+        print(f"  {name}: {table.num_rows} rows, {table.num_columns} columns")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,552 @@
+"""
+AMIC MMS - Persistent Storage
+SQLAlchemy models for the ERD tables, a pooled engine, and the store backend
+"""
+
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String, Text,
+    bindparam, create_engine, event, func, insert, inspect, select, text, update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
+
+DEFAULT_DATABASE_URL = 'sqlite:///amic_mms.db'
+
+Base = declarative_base()
+
+# ============================================================================
+# MODELS (column names match the DataFrame columns used by the app)
+# ============================================================================
+
+class Department(Base):
+    __tablename__ = 'department'
+
+    Department_Code = Column(String(16), primary_key=True)
+    Department_Name = Column(String(100), nullable=False)
+    Department_Supervisor = Column(String(100))
+
+class Unit(Base):
+    __tablename__ = 'unit'
+
+    Unit_Name = Column(String(50), primary_key=True)
+    Workshop_Name = Column(String(50))
+    Region = Column(String(30))
+
+class Workshop(Base):
+    __tablename__ = 'workshop'
+
+    Workshop_Name = Column(String(50), primary_key=True)
+    Region = Column(String(30), nullable=False)
+    Unit_Name = Column(String(50), ForeignKey('unit.Unit_Name'))
+
+class Vehicle(Base):
+    __tablename__ = 'vehicle'
+
+    Vehicle_Number = Column(String(30), primary_key=True)
+    Unit_Name = Column(String(50), ForeignKey('unit.Unit_Name'))
+    Battalion_Name = Column(String(50))
+    Vehicle_Type = Column(String(30))
+    Vehicle_Brand = Column(String(50))
+    Vehicle_Chassis_Number = Column(String(30))
+
+class User(Base):
+    __tablename__ = 'user'
+
+    Employee_ID = Column(Integer, primary_key=True)
+    Department_Code = Column(String(16), ForeignKey('department.Department_Code'))
+    Employee_First_Name = Column(String(50))
+    Employee_Last_Name = Column(String(50))
+    Job_Title = Column(String(50))
+    Resource_ID = Column(String(20))
+
+class FailureCatalogue(Base):
+    __tablename__ = 'failure_catalogue'
+
+    Malfunction_Code = Column(String(30), primary_key=True)
+    System = Column(String(50), nullable=False)
+    Subsystem = Column(String(50), nullable=False)
+    Component = Column(String(50), nullable=False)
+    Failure_Mode = Column(String(100), nullable=False)
+    Cause_Code = Column(String(30))
+    Resolution_Code = Column(String(30))
+    Resolution_Description_English = Column(Text)
+    Resolution_Description_Arabic = Column(Text)
+    Cause_Description_English = Column(Text)
+    Cause_Description_Arabic = Column(Text)
+
+    __table_args__ = (
+        Index('ix_catalogue_path', 'System', 'Subsystem', 'Component', 'Failure_Mode'),
+    )
+
+class WorkOrder(Base):
+    __tablename__ = 'work_orders'
+
+    ID = Column(Integer, primary_key=True)
+    Employee_ID = Column(Integer, ForeignKey('user.Employee_ID'))
+    Workshop_Name = Column(String(50), ForeignKey('workshop.Workshop_Name'))
+    Vehicle_Number = Column(String(30), ForeignKey('vehicle.Vehicle_Number'))
+    AlKhorayef_Reception_Date = Column(Date)
+    Equipment_Owning_Unit = Column(String(50))
+    Vehicle_Type = Column(String(30))
+    Malfunction_Type = Column(String(50))
+    Malfunction_Date = Column(Date)
+    MNG_Work_Order_Creation_Date = Column(Date)
+    AIC_Work_Order_Number = Column(String(30))
+    Technician_Name = Column(String(100))
+    Work_Order_Status = Column(String(20), nullable=False)
+    Require_Spare_Parts = Column(Boolean, default=False)
+    Work_Order_Completion_Date = Column(Date)
+    Comments = Column(Text)
+    Row_Version = Column(Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        Index('ix_wo_workshop_status', 'Workshop_Name', 'Work_Order_Status'),
+        Index('ix_wo_status_type', 'Work_Order_Status', 'Malfunction_Type'),
+        Index('ix_wo_employee', 'Employee_ID'),
+        Index('ix_wo_vehicle', 'Vehicle_Number'),
+    )
+
+class Malfunction(Base):
+    __tablename__ = 'malfunction'
+
+    ID = Column(Integer, primary_key=True)
+    Vehicle_Number = Column(String(30), ForeignKey('vehicle.Vehicle_Number'))
+    Work_Order_ID = Column(Integer, ForeignKey('work_orders.ID'), nullable=False)
+    Malfunction_Code = Column(String(30))
+    Resolution_Description_English = Column(Text)
+    Resolution_Description_Arabic = Column(Text)
+    Resolution_Code = Column(String(30))
+    Cause_Description_English = Column(Text)
+    Cause_Description_Arabic = Column(Text)
+    Cause_Code = Column(String(30))
+    Description_English = Column(Text)
+    Description_Arabic = Column(Text)
+
+    __table_args__ = (
+        Index('ix_malfunction_wo', 'Work_Order_ID'),
+        Index('ix_malfunction_code', 'Malfunction_Code'),
+    )
+
+class Part(Base):
+    __tablename__ = 'part'
+
+    ID = Column(Integer, primary_key=True)
+    Warehouse_Code = Column(String(10))
+    Part_Number = Column(String(30), unique=True)
+    OEM_Number = Column(String(30))
+    English_Description = Column(String(200))
+    Arabic_Description = Column(String(200))
+    Part_Locations = Column(String(30))
+    Part_Quantity = Column(Integer, nullable=False, default=0)
+
+class SupplyRequest(Base):
+    __tablename__ = 'supply_request'
+
+    ID = Column(Integer, primary_key=True)
+    Work_Order_ID = Column(Integer, ForeignKey('work_orders.ID'))
+    Part_ID = Column(Integer, ForeignKey('part.ID'))
+    Quantity_Requested = Column(Integer, nullable=False)
+    Status = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        Index('ix_sr_status_part', 'Status', 'Part_ID'),
+        Index('ix_sr_wo', 'Work_Order_ID'),
+    )
+
+class PurchaseRequest(Base):
+    __tablename__ = 'purchase_request'
+
+    ID = Column(Integer, primary_key=True)
+    Supply_Request_ID = Column(Integer, ForeignKey('supply_request.ID'))
+    Employee_ID = Column(Integer, ForeignKey('user.Employee_ID'))
+    PR_Date = Column(Date)
+    Status = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        Index('ix_pr_sr', 'Supply_Request_ID'),
+    )
+
+class Order(Base):
+    __tablename__ = 'orders'
+
+    ID = Column(Integer, primary_key=True)
+    PR_ID = Column(Integer, ForeignKey('purchase_request.ID'))
+    Status = Column(String(20), nullable=False)
+    Order_Date = Column(Date)
+    Delivery_Date = Column(Date)
+
+    __table_args__ = (
+        Index('ix_orders_pr', 'PR_ID'),
+    )
+
+class AuditLog(Base):
+    __tablename__ = 'audit_log'
+
+    ID = Column(Integer, primary_key=True)
+    Timestamp = Column(DateTime, nullable=False)
+    Employee_ID = Column(Integer, ForeignKey('user.Employee_ID'))
+    Action = Column(String(50), nullable=False)
+    Table_Name = Column(String(50), nullable=False)
+    Record_Count = Column(Integer, nullable=False)
+    Details = Column(Text)
+
+    __table_args__ = (
+        Index('ix_audit_table_time', 'Table_Name', 'Timestamp'),
+    )
+
+# ============================================================================
+# BOOKKEEPING (shared by every process writing to the same database)
+# ============================================================================
+
+class StoreChange(Base):
+    """One committed write: which keys of which table changed"""
+    __tablename__ = 'store_changes'
+
+    Seq = Column(Integer, primary_key=True, autoincrement=True)
+    Table_Name = Column(String(50), nullable=False)
+    Key_Column = Column(String(50), nullable=False)
+    Keys = Column(Text, nullable=False)
+
+class StoreSequence(Base):
+    """Next free primary key per table, handed out in blocks"""
+    __tablename__ = 'store_sequences'
+
+    Table_Name = Column(String(50), primary_key=True)
+    Next_ID = Column(Integer, nullable=False)
+
+# Store table name -> model, in foreign-key dependency order
+TABLE_MODELS = {
+    model.__tablename__: model
+    for model in [Department, Unit, Workshop, Vehicle, User, FailureCatalogue,
+                  WorkOrder, Malfunction, Part, SupplyRequest, PurchaseRequest, Order, AuditLog]
+}
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+def get_engine(url=None, pool_size=10, max_overflow=20):
+    """Create a pooled engine; URL defaults to $AMIC_DATABASE_URL or local SQLite"""
+    url = url or os.environ.get('AMIC_DATABASE_URL', DEFAULT_DATABASE_URL)
+
+    if url.startswith('sqlite'):
+        if url in ('sqlite://', 'sqlite:///:memory:'):
+            # One shared connection, otherwise every checkout sees an empty database
+            engine = create_engine(url, poolclass=StaticPool,
+                                   connect_args={'check_same_thread': False})
+        else:
+            engine = create_engine(url, pool_size=pool_size, max_overflow=max_overflow,
+                                   pool_pre_ping=True,
+                                   connect_args={'check_same_thread': False})
+
+        @event.listens_for(engine, 'connect')
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute('PRAGMA foreign_keys=ON')
+            cursor.close()
+
+        return engine
+
+    return create_engine(url, pool_size=pool_size, max_overflow=max_overflow,
+                         pool_pre_ping=True, pool_recycle=1800)
+
+def _db_value(value, column_type=None):
+    """Convert numpy/pandas scalars into plain Python values for the DB driver"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(column_type, Date):
+        return pd.Timestamp(value).date()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _db_rows(model, rows):
+    types = {col.name: col.type for col in model.__table__.columns}
+    return [
+        {col: _db_value(val, types[col]) for col, val in row.items() if col in types}
+        for row in rows
+    ]
+
+def _db_records(model, df):
+    """_db_rows for a whole DataFrame, converting column by column instead of per value"""
+    types = {col.name: col.type for col in model.__table__.columns}
+    columns = [col for col in df.columns if col in types]
+    values = []
+    for col in columns:
+        series = df[col]
+        if isinstance(types[col], Date):
+            series = pd.to_datetime(series, errors='coerce').dt.date
+        values.append(series.astype(object).where(series.notna(), None).tolist())
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+# ============================================================================
+# STORE BACKEND (write-through persistence for the shared DataStore)
+# ============================================================================
+
+class SqlBackend:
+    """Persists every DataStore write to the database
+
+    Several processes (the Streamlit app, the API) can share one database.
+    Primary keys come from the store_sequences table, so they never collide,
+    and every write records its keys in store_changes in the same
+    transaction; changes_since() lists what the other processes committed.
+    """
+
+    # Changes are re-read this far behind the cursor, in case a transaction
+    # with a lower Seq committed after one with a higher Seq
+    CHANGE_WINDOW = 1000
+
+    # Change records kept when a process starts; older ones are deleted
+    CHANGE_HISTORY = 100000
+
+    # Only the tables in TABLE_MODELS are stored
+    persists_all_tables = False
+
+    def __init__(self, engine):
+        self.engine = engine
+        Base.metadata.create_all(engine)
+        self._add_missing_columns()
+        self._cursor = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load persisted tables, or None when the database has not been seeded"""
+        with self.engine.connect() as conn:
+            if conn.execute(select(func.count()).select_from(Department)).scalar() == 0:
+                return None
+            # Anything committed after this point is picked up by changes_since
+            self._cursor = conn.execute(select(func.max(StoreChange.Seq))).scalar() or 0
+            self._seen = set(conn.execute(
+                select(StoreChange.Seq).where(StoreChange.Seq > self._cursor - self.CHANGE_WINDOW)
+            ).scalars())
+            tables = {
+                name: pd.read_sql_table(name, conn, columns=list(model.__table__.columns.keys()))
+                for name, model in TABLE_MODELS.items()
+            }
+        self._init_sequences()
+        with self.engine.begin() as conn:
+            conn.execute(StoreChange.__table__.delete().where(
+                StoreChange.Seq <= self._cursor - self.CHANGE_HISTORY
+            ))
+        return tables
+
+    def seed(self, tables, chunk_size=10000):
+        """Bulk insert the initial contents of every modelled table in one transaction"""
+        with self.engine.begin() as conn:
+            for name, model in TABLE_MODELS.items():
+                df = tables.get(name)
+                if df is None or df.empty:
+                    continue
+                for start in range(0, len(df), chunk_size):
+                    conn.execute(insert(model), _db_records(model, df.iloc[start:start + chunk_size]))
+        self._init_sequences()
+
+    def _add_missing_columns(self):
+        """Add columns with a server default that databases created by older versions lack"""
+        inspector = inspect(self.engine)
+        with self.engine.begin() as conn:
+            for name, model in TABLE_MODELS.items():
+                present = {col['name'] for col in inspector.get_columns(name)}
+                for col in model.__table__.columns:
+                    if col.name not in present and col.server_default is not None:
+                        conn.execute(text(
+                            f'ALTER TABLE {name} ADD COLUMN {col.name} '
+                            f'{col.type.compile(self.engine.dialect)} NOT NULL DEFAULT {col.server_default.arg}'
+                        ))
+
+    # ------------------------------------------------------------------------
+    # Primary keys
+    # ------------------------------------------------------------------------
+
+    def _init_sequences(self):
+        """Create missing sequences and move any that lag behind max(ID) forward"""
+        for name, model in TABLE_MODELS.items():
+            if 'ID' not in model.__table__.columns:
+                continue
+            try:
+                with self.engine.begin() as conn:
+                    next_id = (conn.execute(select(func.max(model.ID))).scalar() or 0) + 1
+                    current = conn.execute(
+                        select(StoreSequence.Next_ID).where(StoreSequence.Table_Name == name)
+                    ).scalar()
+                    if current is None:
+                        conn.execute(insert(StoreSequence).values(Table_Name=name, Next_ID=next_id))
+                    elif current < next_id:
+                        conn.execute(
+                            update(StoreSequence)
+                            .where(StoreSequence.Table_Name == name)
+                            .where(StoreSequence.Next_ID < next_id)
+                            .values(Next_ID=next_id)
+                        )
+            except IntegrityError:
+                # Another process created the sequence first
+                pass
+
+    def allocate_ids(self, name, n=1):
+        """Reserve n consecutive primary keys; None for tables without a sequence"""
+        model = TABLE_MODELS.get(name)
+        if model is None or 'ID' not in model.__table__.columns:
+            return None
+        with self.engine.begin() as conn:
+            # The UPDATE takes the row (or database) write lock before the read
+            conn.execute(
+                update(StoreSequence)
+                .where(StoreSequence.Table_Name == name)
+                .values(Next_ID=StoreSequence.Next_ID + n)
+            )
+            end = conn.execute(
+                select(StoreSequence.Next_ID).where(StoreSequence.Table_Name == name)
+            ).scalar()
+        return list(range(end - n, end))
+
+    # ------------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------------
+
+    def _log_change(self, conn, name, key_col, keys):
+        result = conn.execute(insert(StoreChange).values(
+            Table_Name=name, Key_Column=key_col, Keys=json.dumps([_db_value(key) for key in keys]),
+        ))
+        # Remembered before commit, so changes_since never hands back our own write
+        with self._lock:
+            self._seen.add(result.inserted_primary_key[0])
+
+    def insert(self, name, rows):
+        model = TABLE_MODELS.get(name)
+        if model is None:
+            return
+        key_col = _key_column(model)
+        with self.engine.begin() as conn:
+            conn.execute(insert(model), _db_rows(model, rows))
+            self._log_change(conn, name, key_col, [row.get(key_col) for row in rows])
+
+    def update(self, name, key, values, key_col='ID', expected_version=None):
+        """Update one key; with expected_version, only if the row still has that Row_Version
+
+        Returns the keys whose version did not match (nothing is written then).
+        """
+        return self.update_many(name, {key: values}, key_col,
+                                None if expected_version is None else {key: expected_version})
+
+    def update_many(self, name, changes, key_col='ID', expected_versions=None):
+        """Apply {key: values} in one transaction, one executemany per set of changed columns
+
+        With expected_versions ({key: Row_Version}) each row is only updated
+        if it still has that version; returns the keys that did not, and
+        writes nothing if there are any.
+        """
+        model = TABLE_MODELS.get(name)
+        if model is None:
+            return []
+        try:
+            with self.engine.begin() as conn:
+                _execute_updates(conn, model, changes, key_col, expected_versions)
+                self._log_change(conn, name, key_col, list(changes))
+        except _StaleRows as e:
+            return e.keys
+        return []
+
+    def merge(self, name, rows, changes, key_col='ID', expected_versions=None):
+        """Insert rows and apply {key: values} in one transaction; returns stale keys as update_many"""
+        model = TABLE_MODELS.get(name)
+        if model is None:
+            return []
+        try:
+            with self.engine.begin() as conn:
+                if rows:
+                    conn.execute(insert(model), _db_rows(model, rows))
+                    row_key = _key_column(model)
+                    self._log_change(conn, name, row_key, [row.get(row_key) for row in rows])
+                if changes:
+                    _execute_updates(conn, model, changes, key_col, expected_versions)
+                    self._log_change(conn, name, key_col, list(changes))
+        except _StaleRows as e:
+            return e.keys
+        return []
+
+    # ------------------------------------------------------------------------
+    # Changes from other processes
+    # ------------------------------------------------------------------------
+
+    def changes_since(self):
+        """[(table, key column, keys)] committed by other processes since the last call"""
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                select(StoreChange.Seq, StoreChange.Table_Name, StoreChange.Key_Column, StoreChange.Keys)
+                .where(StoreChange.Seq > self._cursor - self.CHANGE_WINDOW)
+                .order_by(StoreChange.Seq)
+            ).all()
+
+        changes = []
+        with self._lock:
+            for seq, name, key_col, keys in result:
+                if seq in self._seen or seq <= self._cursor - self.CHANGE_WINDOW:
+                    continue
+                self._seen.add(seq)
+                changes.append((name, key_col, json.loads(keys)))
+            if result:
+                self._cursor = max(self._cursor, result[-1][0])
+            floor = self._cursor - self.CHANGE_WINDOW
+            self._seen = {seq for seq in self._seen if seq > floor}
+        return changes
+
+    def fetch(self, name, keys, key_col='ID', chunk_size=500):
+        """Current database rows (as dicts) for the given keys"""
+        model = TABLE_MODELS[name]
+        column = getattr(model, key_col)
+        rows = []
+        with self.engine.connect() as conn:
+            for start in range(0, len(keys), chunk_size):
+                stmt = select(model.__table__).where(column.in_(keys[start:start + chunk_size]))
+                rows.extend(dict(row) for row in conn.execute(stmt).mappings())
+        return rows
+
+def _key_column(model):
+    return model.__table__.primary_key.columns.values()[0].name
+
+class _StaleRows(Exception):
+    """Raised inside a transaction to roll it back when version checks fail"""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+def _execute_updates(conn, model, changes, key_col, expected_versions=None):
+    """One executemany per set of changed columns
+
+    With expected_versions, rows are updated one statement at a time under a
+    Row_Version condition (executemany row counts are not reliable on every
+    driver), and _StaleRows lists the keys whose version had moved on.
+    """
+    batches = {}
+    for key, row in zip(changes, _db_rows(model, list(changes.values()))):
+        params = {f'new_{col}': val for col, val in row.items()}
+        params['key'] = _db_value(key)
+        if expected_versions is not None:
+            params['expected'] = _db_value(expected_versions[key])
+        batches.setdefault(tuple(sorted(row)), []).append(params)
+
+    stale = []
+    for columns, params in batches.items():
+        stmt = (
+            update(model)
+            .where(getattr(model, key_col) == bindparam('key'))
+            .values({col: bindparam(f'new_{col}') for col in columns})
+        )
+        if expected_versions is None:
+            conn.execute(stmt, params)
+            continue
+        stmt = stmt.where(model.Row_Version == bindparam('expected'))
+        for row_params in params:
+            if conn.execute(stmt, row_params).rowcount == 0:
+                stale.append(row_params['key'])
+    if stale:
+        raise _StaleRows(stale)
@@ -0,0 +1,21 @@
+"""
+Shared fixtures: a fresh in-memory store over the demo tables for every test
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import DataStore
+from seed_data import build_tables
+
+@pytest.fixture
+def tables():
+    return build_tables(seed=7)
+
+@pytest.fixture
+def store(tables):
+    return DataStore(tables)
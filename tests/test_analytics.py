@@ -0,0 +1,67 @@
+"""
+Incrementally maintained dashboard views agree with a rebuild after writes
+"""
+
+import pandas as pd
+
+from analytics import (COUNTER_DIMENSIONS, ROLLUP_DIMENSIONS, DailyRollup, SupplyRequestView, WorkOrderCounters,
+                       daily_rollup, supply_request_view, work_order_counters)
+from data_store import DataStore
+from services import create_supply_request, update_records
+
+def _counts(counters):
+    return {by: counters.counts(by).to_dict() for by in COUNTER_DIMENSIONS}
+
+def test_counters_with_a_missing_dimension_match_a_rebuild(tables):
+    wo_id = int(tables['work_orders']['ID'].iloc[0])
+    tables['work_orders'].loc[tables['work_orders']['ID'] == wo_id, 'Malfunction_Type'] = None
+    store = DataStore(tables)
+    counters = work_order_counters(store)
+
+    store.update('work_orders', wo_id, {'Work_Order_Status': 'In Progress'})
+    store.update('work_orders', wo_id, {'Work_Order_Status': 'Completed'})
+
+    assert all(n >= 0 for n in counters._counts.values())
+    assert _counts(counters) == _counts(WorkOrderCounters(store))
+
+def test_supply_request_view_matches_a_rebuild(store):
+    view = supply_request_view(store)
+
+    sr = create_supply_request(store, 3, 4, 6)
+    create_supply_request(store, 1, 2, 1)
+    update_records(store, 'supply_request', {sr['ID']: {'Status': 'Approved'}})
+    store.update('supply_request', sr['ID'], {'Quantity_Requested': 2})
+    vehicle = store.table('vehicle')['Vehicle_Number'].iloc[1]
+    store.update('work_orders', 3, {'Workshop_Name': 'Workshop Beta', 'Vehicle_Number': vehicle})
+    store.update('work_orders', 3, {'Comments': 'no view column changes'})
+    store.update('part', 4, {'English_Description': 'Renamed part'})
+
+    incremental = view.frame()
+    rebuilt = SupplyRequestView(store).frame()
+    assert incremental.loc[incremental['ID'] == sr['ID'], 'English_Description'].item() == 'Renamed part'
+    pd.testing.assert_frame_equal(incremental, rebuilt, check_dtype=False, check_categorical=False)
+
+def _rollup(rollup):
+    """Non-zero rollup rows in key order (the maintained table keeps emptied keys at zero)"""
+    df = rollup.frame()
+    df = df[(df['Created'] != 0) | (df['Completed'] != 0)]
+    df = df.astype({col: object for col in ROLLUP_DIMENSIONS}).fillna({col: '' for col in ROLLUP_DIMENSIONS})
+    return df.sort_values(['Date'] + ROLLUP_DIMENSIONS).reset_index(drop=True)
+
+def test_daily_rollup_matches_a_rebuild(store):
+    rollup = daily_rollup(store)
+    df_wo = store.table('work_orders')
+    open_id = int(df_wo.loc[df_wo['Work_Order_Status'] != 'Completed', 'ID'].iloc[0])
+    done_id = int(df_wo.loc[df_wo['Work_Order_Status'] == 'Completed', 'ID'].iloc[0])
+
+    new = dict(store.get('work_orders', 1), ID=store.next_id('work_orders'), Row_Version=1,
+               MNG_Work_Order_Creation_Date=pd.Timestamp('2024-05-02'), Work_Order_Status='Open')
+    store.append('work_orders', new)
+    store.update('work_orders', open_id, {'Work_Order_Status': 'Completed',
+                                          'Work_Order_Completion_Date': pd.Timestamp('2024-05-03')})
+    store.update('work_orders', done_id, {'Work_Order_Status': 'In Progress'})
+    store.update('work_orders', new['ID'], {'Workshop_Name': 'Workshop Gamma', 'Malfunction_Type': None})
+    store.update('work_orders', 1, {'MNG_Work_Order_Creation_Date': pd.Timestamp('2024-04-30')})
+    store.update('work_orders', 2, {'Comments': 'not counted'})
+
+    pd.testing.assert_frame_equal(_rollup(rollup), _rollup(DailyRollup(store)), check_dtype=False)
@@ -0,0 +1,61 @@
+"""
+HTTP API: compare-and-swap conflicts answer 409, oversized batches 413
+"""
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient
+
+import api
+from data_store import set_store
+
+@pytest.fixture
+def client(store):
+    set_store(store)
+    try:
+        with TestClient(api.app) as client:
+            yield client
+    finally:
+        set_store(None)
+
+def test_stale_row_version_is_a_conflict(client, store):
+    version = int(store.get('work_orders', 1)['Row_Version'])
+
+    response = client.patch('/work-orders/1', json={'Comments': 'first', 'Row_Version': version})
+    assert response.status_code == 200
+    assert response.json()['Row_Version'] == version + 1
+
+    response = client.patch('/work-orders/1', json={'Comments': 'second', 'Row_Version': version})
+    assert response.status_code == 409
+    assert response.json()['conflicts'] == [1]
+    assert store.get('work_orders', 1)['Comments'] == 'first'
+
+def test_conflict_in_a_batch_writes_nothing(client, store):
+    current = int(store.get('work_orders', 2)['Row_Version'])
+    stale = int(store.get('work_orders', 3)['Row_Version']) - 1
+    before = store.version('work_orders')
+
+    response = client.patch('/work-orders', json=[
+        {'ID': 2, 'Comments': 'batch', 'Row_Version': current},
+        {'ID': 3, 'Comments': 'batch', 'Row_Version': stale},
+    ])
+
+    assert response.status_code == 409
+    assert response.json()['conflicts'] == [3]
+    assert store.version('work_orders') == before
+
+def test_batches_over_the_limit_are_refused(client, store, monkeypatch):
+    monkeypatch.setattr(api, 'MAX_BATCH', 2)
+    count = len(store.table('supply_request'))
+    item = {'Work_Order_ID': 1, 'Part_ID': 1, 'Quantity_Requested': 1, 'Status': 'Pending'}
+
+    response = client.post('/supply-requests/batch', json=[item] * 3)
+    assert response.status_code == 413
+    assert len(store.table('supply_request')) == count
+
+    response = client.post('/supply-requests/batch', json={'items': [item] * 2})
+    assert response.status_code == 200
+    assert len(response.json()['created']) == 2
+    assert len(store.table('supply_request')) == count + 2
@@ -0,0 +1,46 @@
+"""
+AppendTable hash indexes: lookups after writes agree with a scan of the column
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_store import AppendTable
+
+def _tables():
+    df = pd.DataFrame({
+        'ID': np.arange(1, 2001, dtype=np.int32),
+        'Vehicle_Number': pd.Series([f"V{i % 50}" for i in range(2000)], dtype=object),
+        'Part_Number': pd.array([i % 7 if i % 11 else None for i in range(2000)], dtype='Int32'),
+    })
+    # Same table and writes, one answering from hash indexes and one scanning
+    return AppendTable(df, ['ID', 'Vehicle_Number', 'Part_Number']), AppendTable(df)
+
+def _assert_same(indexed, scanned, col, keys):
+    for key in keys:
+        np.testing.assert_array_equal(indexed.positions(col, key), scanned.positions(col, key))
+    np.testing.assert_array_equal(indexed.positions_many(col, keys), scanned.positions_many(col, keys))
+
+def test_index_lookups_match_a_scan_after_writes():
+    indexed, scanned = _tables()
+    rng = np.random.default_rng(3)
+
+    for i in range(50):
+        positions = np.sort(rng.choice(len(indexed), size=5, replace=False))
+        for table in (indexed, scanned):
+            table.append([{'ID': 3000 + i, 'Vehicle_Number': f"V{i % 60}", 'Part_Number': None}])
+            table.set(positions[:2], {'Vehicle_Number': f"V{i % 60}", 'Part_Number': i % 9})
+            table.set_many(positions[2:], [{'Vehicle_Number': 'V1'}, {'Part_Number': None}, {'ID': 5000 + i}])
+
+    _assert_same(indexed, scanned, 'ID', [1, 2000, 3010, 5049, 99999])
+    _assert_same(indexed, scanned, 'Vehicle_Number', [f"V{i}" for i in range(62)])
+    _assert_same(indexed, scanned, 'Part_Number', list(range(10)))
+
+def test_missing_values_are_not_indexed():
+    indexed, _ = _tables()
+
+    assert len(indexed.positions('Part_Number', 3)) > 0
+    indexed.set(indexed.positions('Part_Number', 3), {'Part_Number': None})
+
+    assert len(indexed.positions('Part_Number', 3)) == 0
+    assert indexed.positions_many('Part_Number', [3])[0] == -1
@@ -0,0 +1,48 @@
+"""
+Batch status editor: the grid diff and the single compare-and-swap write it feeds
+"""
+
+import pandas as pd
+import pytest
+
+from app import BULK_EDIT_COLUMNS, collect_bulk_changes
+from data_store import ConflictError
+from services import update_records
+
+def _grid(store):
+    df = store.table('work_orders')
+    df = df[df['Work_Order_Status'] != 'Completed'].head(4)
+    grid = df[['ID'] + BULK_EDIT_COLUMNS].reset_index(drop=True)
+    grid = grid.astype({'Work_Order_Status': object})
+    grid.insert(0, 'Select', False)
+    return df, grid
+
+def test_only_selected_and_edited_rows_change(store):
+    _, original = _grid(store)
+    edited = original.copy()
+    edited.loc[[0, 1], 'Select'] = True
+    edited.loc[2, 'Comments'] = 'Waiting for parts'
+    today = pd.Timestamp('2024-06-01')
+
+    changes = collect_bulk_changes(original, edited, bulk_status='Completed', completion_date=today)
+
+    ids = original['ID'].tolist()
+    assert set(changes) == set(ids[:3])
+    for wo_id in ids[:2]:
+        assert changes[wo_id] == {'Work_Order_Status': 'Completed', 'Work_Order_Completion_Date': today}
+    assert changes[ids[2]] == {'Comments': 'Waiting for parts'}
+
+def test_batch_is_one_write_and_refused_when_stale(store):
+    df, original = _grid(store)
+    edited = original.assign(Select=True)
+    changes = collect_bulk_changes(original, edited, bulk_status='In Progress')
+    versions = dict(zip(df['ID'], df['Row_Version']))
+    before = store.version('work_orders')
+
+    update_records(store, 'work_orders', changes, expected_versions=versions)
+
+    assert store.version('work_orders') == before + 1
+    assert set(store.table('work_orders').set_index('ID').loc[list(changes), 'Work_Order_Status']) == {'In Progress'}
+    with pytest.raises(ConflictError):
+        update_records(store, 'work_orders', {wo_id: {'Comments': 'stale'} for wo_id in changes},
+                       expected_versions=versions)
@@ -0,0 +1,42 @@
+"""
+Failure catalogue index: the cascading options and details a scan of the catalogue gives
+"""
+
+import pandas as pd
+
+from catalogue_index import CatalogueIndex
+
+def test_options_match_a_scan_of_the_catalogue(tables):
+    df = tables['failure_catalogue']
+    index = CatalogueIndex(df)
+
+    assert index.options() == sorted(df['System'].unique())
+    for system in index.options():
+        rows = df[df['System'] == system]
+        assert index.options(system) == sorted(rows['Subsystem'].unique())
+        for subsystem in index.options(system):
+            rows_sub = rows[rows['Subsystem'] == subsystem]
+            assert index.options(system, subsystem) == sorted(rows_sub['Component'].unique())
+    assert index.options('No such system') == []
+    assert len(index) == len(df.drop_duplicates(['System', 'Subsystem', 'Component', 'Failure_Mode']))
+
+def test_details_are_the_first_matching_entry(tables):
+    df = tables['failure_catalogue']
+    first = df.iloc[0].to_dict()
+    duplicate = dict(first, Malfunction_Code='DUPLICATE')
+    index = CatalogueIndex(pd.concat([df, pd.DataFrame([duplicate])], ignore_index=True))
+
+    path = (first['System'], first['Subsystem'], first['Component'], first['Failure_Mode'])
+    assert index.details(*path)['Malfunction_Code'] == first['Malfunction_Code']
+    assert index.details('HVAC', 'No', 'Such', 'Path') is None
+
+def test_store_rebuilds_the_index_when_the_catalogue_changes(store):
+    build = lambda: store.derived('catalogue_index', ('failure_catalogue',), CatalogueIndex)
+    index = build()
+    assert build() is index
+
+    first = store.table('failure_catalogue').iloc[0].to_dict()
+    store.append('failure_catalogue', dict(first, System='Zz New System', Malfunction_Code='ZZ-001'))
+
+    assert build() is not index
+    assert 'Zz New System' in build().options()
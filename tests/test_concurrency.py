@@ -0,0 +1,82 @@
+"""
+Concurrent writers and the views maintained from store writes
+"""
+
+import threading
+
+from analytics import daily_rollup, supply_request_view, work_order_counters
+from journal import JournalBackend
+from data_store import DataStore
+from services import create_supply_request, update_records
+
+ROUNDS = 200
+TIMEOUT = 30
+
+def _run(*targets):
+    """Run targets on their own threads; returns the ones still running after TIMEOUT"""
+    errors = []
+
+    def wrap(target):
+        def run():
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+        return run
+
+    threads = [threading.Thread(target=wrap(target), daemon=True) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert not errors, errors
+    return [thread for thread in threads if thread.is_alive()]
+
+def _writers(store):
+    work_order_id = int(store.table('work_orders')['ID'].iloc[0])
+    part_id = int(store.table('part')['ID'].iloc[0])
+
+    def update_work_orders():
+        for i in range(ROUNDS):
+            update_records(store, 'work_orders', {work_order_id: {'Comments': f"round {i}"}})
+
+    def request_parts():
+        for _ in range(ROUNDS):
+            create_supply_request(store, work_order_id, part_id, 1)
+
+    def move_workshop():
+        workshop = store.table('workshop').iloc[0]
+        for i in range(ROUNDS):
+            store.update('workshop', workshop['Workshop_Name'], {'Region': ('Central', 'Eastern')[i % 2]},
+                         key_col='Workshop_Name')
+
+    return update_work_orders, request_parts, move_workshop
+
+def test_listeners_do_not_deadlock_writers(store):
+    # Views whose listeners read other tables than the one written
+    view = supply_request_view(store)
+    counters = work_order_counters(store)
+    daily_rollup(store)
+    supply_requests = len(store.table('supply_request'))
+
+    assert not _run(*_writers(store)), 'writers deadlocked'
+
+    assert len(view.frame()) == supply_requests + ROUNDS
+    assert counters.counts('Workshop_Name').sum() == len(store.table('work_orders'))
+    regions = store.table('workshop').set_index('Workshop_Name')['Region']
+    by_region = store.table('work_orders')['Workshop_Name'].map(regions).value_counts()
+    assert counters.counts('Region').sort_index().tolist() == by_region.sort_index().tolist()
+
+def test_checkpoint_does_not_deadlock_writers(tables, tmp_path):
+    backend = JournalBackend(str(tmp_path / 'journal'))
+    backend.seed(tables)
+    store = DataStore(tables, backend)
+    backend.recover(store)
+    supply_request_view(store)
+    work_order_counters(store)
+
+    def checkpoint():
+        for _ in range(20):
+            store.checkpoint()
+
+    assert not _run(*_writers(store), checkpoint), 'writers or checkpoint deadlocked'
@@ -0,0 +1,89 @@
+"""
+DataStore writes: compare-and-swap updates and stable views
+"""
+
+import pandas as pd
+import pytest
+
+import data_store
+from data_store import ConflictError, load_store
+from journal import JournalBackend
+from services import update_work_order
+from snapshot import save_tables
+from storage import SqlBackend, get_engine
+
+def _first_id(store):
+    return int(store.table('work_orders')['ID'].iloc[0])
+
+def test_stale_version_is_refused(store):
+    wo_id = _first_id(store)
+    version = store.get('work_orders', wo_id)['Row_Version']
+
+    update_work_order(store, wo_id, {'Comments': 'first'}, expected_version=version)
+    with pytest.raises(ConflictError) as e:
+        update_work_order(store, wo_id, {'Comments': 'stale'}, expected_version=version)
+
+    assert e.value.keys == [wo_id]
+    row = store.get('work_orders', wo_id)
+    assert row['Comments'] == 'first'
+    assert row['Row_Version'] == version + 1
+
+def test_conflicting_batch_writes_nothing(store):
+    ids = store.table('work_orders')['ID'].head(3).tolist()
+    versions = {key: store.get('work_orders', key)['Row_Version'] for key in ids}
+    store.update('work_orders', ids[1], {'Comments': 'theirs'})
+
+    with pytest.raises(ConflictError) as e:
+        store.update_many('work_orders', {key: {'Comments': 'mine'} for key in ids}, expected_versions=versions)
+
+    assert e.value.keys == [ids[1]]
+    assert [store.get('work_orders', key)['Comments'] for key in ids].count('mine') == 0
+
+
+def test_views_do_not_change_after_writes(store):
+    ids = store.table('work_orders')['ID'].head(2).tolist()
+    view = store.table('work_orders')
+    expected = view.copy(deep=True)
+
+    store.update('work_orders', ids[0], {'Work_Order_Status': 'Completed', 'Comments': 'done',
+                                         'Work_Order_Completion_Date': pd.Timestamp('2030-01-01'),
+                                         'Employee_ID': None})
+    store.update_many('work_orders', {ids[1]: {'Technician_Name': 'Someone New', 'Comments': 'x'}})
+    store.append('work_orders', dict(store.get('work_orders', ids[0]), ID=store.next_id('work_orders')))
+
+    pd.testing.assert_frame_equal(view, expected)
+    current = store.get('work_orders', ids[0])
+    assert current['Comments'] == 'done' and current['Work_Order_Status'] == 'Completed'
+    assert pd.isna(current['Employee_ID'])
+    assert store.get('work_orders', ids[1])['Technician_Name'] == 'Someone New'
+    assert len(store.table('work_orders')) == len(view) + 1
+
+def test_write_from_another_process_is_a_conflict(tmp_path):
+    url = f"sqlite:///{tmp_path / 'amic.db'}"
+    a = load_store(SqlBackend(get_engine(url)))
+    b = load_store(SqlBackend(get_engine(url)))
+    wo_id = _first_id(a)
+
+    update_work_order(a, wo_id, {'Comments': 'from a'})
+    with pytest.raises(ConflictError):
+        update_work_order(b, wo_id, {'Comments': 'from b'})
+
+    b.sync()
+    assert b.get('work_orders', wo_id)['Comments'] == 'from a'
+    update_work_order(b, wo_id, {'Comments': 'from b'}, expected_version=b.get('work_orders', wo_id)['Row_Version'])
+
+def test_restoring_a_store_does_not_build_the_demo_tables(tables, tmp_path, monkeypatch):
+    path = str(tmp_path / 'snapshot')
+    save_tables(tables, path)
+    load_store(JournalBackend(str(tmp_path / 'journal'))).backend.close()
+
+    def build_tables(seed=None):
+        raise AssertionError("demo tables built")
+
+    monkeypatch.setattr(data_store, 'build_tables', build_tables)
+    assert len(load_store(snapshot=path).table('work_orders')) == len(tables['work_orders'])
+    backend = JournalBackend(str(tmp_path / 'journal'))
+    try:
+        assert len(load_store(backend).table('work_orders')) == len(tables['work_orders'])
+    finally:
+        backend.close()
@@ -0,0 +1,47 @@
+"""
+Export jobs: temporary files never outlive the job
+"""
+
+import gc
+import os
+import threading
+
+import pandas as pd
+
+from export import ExportJob
+
+def _frame(rows=100):
+    return pd.DataFrame({'ID': range(rows), 'Comments': ['x'] * rows})
+
+def test_read_deletes_the_file():
+    job = ExportJob(_frame, 'csv', 'work_orders')
+    job.wait(10)
+
+    assert job.read().decode('utf-8-sig').startswith('ID,Comments')
+    assert not os.path.exists(job.path)
+
+def test_cleanup_of_a_running_job_deletes_the_file_when_it_stops():
+    release = threading.Event()
+
+    def build():
+        release.wait(10)
+        return _frame(50000)
+
+    job = ExportJob(build, 'csv', 'work_orders', chunk_size=1000)
+    job.cleanup()
+    assert os.path.exists(job.path)
+
+    release.set()
+    job.wait(10)
+    assert not os.path.exists(job.path)
+    assert job.error is None and job.rows_written < 50000
+
+def test_abandoned_job_deletes_the_file():
+    job = ExportJob(_frame, 'xlsx', 'work_orders')
+    job.wait(10)
+    path = job.path
+    job._thread.join(10)
+
+    del job
+    gc.collect()
+    assert not os.path.exists(path)
@@ -0,0 +1,60 @@
+"""
+Bulk import: header matching, row validation, duplicate keys and the single merge
+"""
+
+import io
+
+from openpyxl import Workbook
+
+from importer import apply_import, plan_import
+
+def _csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+def test_plan_reports_bad_and_duplicate_rows(store):
+    existing = store.table('part')['Part_Number'].iloc[0]
+    sheet = _csv(
+        "Part Number,part_quantity,English Description,Notes\n"
+        f"{existing},12,,ignored\n"
+        "PN-NEW-1,-1,Bad quantity,\n"
+        "PN-NEW-2,4,Gasket,\n"
+        "PN-NEW-3,1,First copy,\n"
+        "PN-NEW-3,2,Second copy,\n"
+        ",,,\n"
+    )
+
+    plan = plan_import('part', sheet, 'parts.csv')
+
+    assert plan.ignored_columns == ['Notes']
+    assert plan.rows_read == 5
+    assert [record['Part_Number'] for record in plan.records] == [existing, 'PN-NEW-2']
+    assert [(row, column) for row, column, _ in plan.errors] == [
+        (3, 'Part_Quantity'), (5, 'Part_Number'), (6, 'Part_Number')]
+
+def test_missing_required_column_stops_the_plan():
+    plan = plan_import('part', _csv("English Description\nGasket\n"), 'parts.csv')
+
+    assert plan.records == []
+    assert plan.errors == [(1, 'Part_Number', 'Required column missing from the header row')]
+
+def test_apply_inserts_new_keys_and_updates_existing_ones(store):
+    before = store.get('part', store.table('part')['Part_Number'].iloc[0], key_col='Part_Number')
+    wb = Workbook()
+    wb.active.append(['Part_Number', 'Part_Quantity', 'English_Description'])
+    wb.active.append([before['Part_Number'], 12, None])
+    wb.active.append(['PN-NEW-2', None, 'Gasket'])
+    file = io.BytesIO()
+    wb.save(file)
+    file.seek(0)
+    plan = plan_import('part', file, 'parts.xlsx')
+    version = store.version('part')
+
+    assert apply_import(store, plan) == (1, 1, 0)
+
+    assert store.version('part') == version + 1
+    updated = store.get('part', before['Part_Number'], key_col='Part_Number')
+    assert updated['Part_Quantity'] == 12
+    assert updated['English_Description'] == before['English_Description']
+    inserted = store.get('part', 'PN-NEW-2', key_col='Part_Number')
+    assert inserted['ID'] > before['ID'] and inserted['Part_Quantity'] == 0
+    assert apply_import(store, plan, update_existing=False) == (0, 0, 2)
@@ -0,0 +1,54 @@
+"""
+Parts netting: open demand against stock on hand and in-transit orders
+"""
+
+import pandas as pd
+
+from procurement import net_requirements, part_shortages, rank_shortages
+
+def _fixture():
+    df_part = pd.DataFrame({
+        'ID': [1, 2, 3, 4],
+        'Part_Number': ['P1', 'P2', 'P3', 'P4'],
+        'English_Description': ['Filter', 'Pump', 'Belt', 'Seal'],
+        'Part_Quantity': pd.array([5, 0, 10, None], dtype='Int32'),
+    })
+    df_sr = pd.DataFrame({
+        'ID': [1, 2, 3, 4, 5, 6, 7],
+        'Part_ID': [1, 1, 2, 2, 3, 4, 4],
+        'Quantity_Requested': [4, 3, 6, 2, 4, 1, 3],
+        'Status': ['Pending', 'Approved', 'Pending', 'Issued', 'Pending', 'Cancelled', 'Pending'],
+    })
+    df_pr = pd.DataFrame({'ID': [10, 11], 'Supply_Request_ID': [3, 2]})
+    # Request 3 is on its way; request 2's order has already been delivered
+    df_orders = pd.DataFrame({'ID': [100, 101], 'PR_ID': [10, 11], 'Status': ['Ordered', 'Delivered']})
+    return df_sr, df_part, df_pr, df_orders
+
+def test_net_requirements_by_hand():
+    net = net_requirements(*_fixture()).set_index('Part_Number')
+
+    expected = pd.DataFrame({
+        'Open_Requests': [2, 1, 1, 1],
+        'Demand': [7, 6, 4, 3],
+        'On_Hand': [5, 0, 10, 0],
+        'In_Transit': [0, 6, 0, 0],
+        'Shortage': [2, 0, 0, 3],
+    }, index=pd.Index(['P1', 'P2', 'P3', 'P4'], name='Part_Number'))
+    pd.testing.assert_frame_equal(net[expected.columns], expected, check_dtype=False)
+
+def test_shortages_are_ranked_largest_first():
+    ranked = rank_shortages(net_requirements(*_fixture()))
+
+    assert ranked['Part_Number'].tolist() == ['P4', 'P1']
+    assert ranked['Shortage'].tolist() == [3, 2]
+
+def test_store_shortages_follow_order_status(store):
+    # Demo data: order 1 fills purchase request 1 for supply request 1 (part 1, 2 pending)
+    assert store.get('orders', 1)['Status'] == 'In Transit'
+    store.update('part', 1, {'Part_Quantity': 0})
+    assert 1 not in part_shortages(store)['Part_ID'].tolist()
+
+    store.update('orders', 1, {'Status': 'Delivered'})
+
+    shortages = part_shortages(store).set_index('Part_ID')
+    assert shortages.loc[1, 'Shortage'] == store.get('supply_request', 1)['Quantity_Requested']
@@ -0,0 +1,49 @@
+"""
+Rerun profiling: spans nest under their rerun, totals add up, disabled costs nothing
+"""
+
+import logging
+
+from profiling import Profiler
+
+def test_spans_are_recorded_per_rerun_with_their_depth(caplog):
+    profiler = Profiler(enabled=True, slow_rerun_ms=0)
+
+    @profiler.timed('query')
+    def query():
+        return 42
+
+    with caplog.at_level(logging.INFO, logger='amic.profiling'):
+        with profiler.rerun('Manager') as record:
+            with profiler.span('page_dashboard', 'page'):
+                assert query() == 42
+                query()
+
+    spans = [(s['name'], s['kind'], s['depth']) for s in record['spans']]
+    assert spans == [('query', 'query', 1), ('query', 'query', 1), ('page_dashboard', 'page', 0)]
+    assert record['total_ms'] >= record['spans'][-1]['ms']
+    assert list(profiler.reruns) == [record]
+    # Slower than the (zero) threshold: logged as a warning
+    assert caplog.records[-1].levelno == logging.WARNING
+
+    totals = {(kind, name): calls for kind, name, calls, _, _ in profiler.span_totals()}
+    assert totals == {('query', 'query'): 2, ('page', 'page_dashboard'): 1}
+    text = profiler.prometheus_text({'query_cache_entries': 3})
+    assert 'amic_reruns_total 1' in text
+    assert 'amic_slow_reruns_total 1' in text
+    assert 'amic_span_calls_total{kind="query",name="query"} 2' in text
+    assert 'amic_query_cache_entries 3' in text
+
+def test_nothing_is_recorded_outside_a_rerun_or_when_disabled():
+    profiler = Profiler(enabled=True)
+    with profiler.span('background'):
+        pass
+
+    disabled = Profiler(enabled=False)
+    with disabled.rerun() as record:
+        with disabled.span('page'):
+            pass
+
+    assert record is None
+    assert profiler.span_totals() == [] and disabled.span_totals() == []
+    assert len(profiler.reruns) == 0 and len(disabled.reruns) == 0
@@ -0,0 +1,41 @@
+"""
+Query cache sizing: memory shared with the store is not charged to entries
+"""
+
+from query_cache import QueryCache, estimate_size
+
+def test_store_views_are_not_charged(store):
+    df = store.table('work_orders')
+    shared = store._buffer_ids()
+
+    assert estimate_size(df, shared) < 1024
+    assert estimate_size(df.copy(), shared) >= estimate_size(df)
+    assert estimate_size(df[df['ID'] > 5], shared) > estimate_size(df, shared)
+
+def test_whole_table_result_stays_cached(store):
+    store.cache = QueryCache(max_bytes=2048, shared=store._buffer_ids)
+    calls = []
+
+    def compute(df):
+        calls.append(1)
+        return {'work_orders': df}
+
+    for _ in range(3):
+        store.cached_query('everything', ('work_orders',), (), compute)
+    assert len(calls) == 1
+
+def test_entries_are_charged_for_columns_a_write_copied(store):
+    store.cache = QueryCache(shared=store._buffer_ids)
+    df = store.cached_query('everything', ('work_orders',), (), lambda df: df)
+    before = store.cache.stats()['bytes']
+
+    wo_id = int(df['ID'].iloc[0])
+    store.update('work_orders', wo_id, {'Work_Order_Status': 'Completed'})
+
+    status = df['Work_Order_Status'].array.codes.nbytes
+    assert store.cache.stats()['bytes'] >= before + status
+
+    # A budget the old columns no longer fit in evicts the entry
+    store.cache.max_bytes = before + status // 2
+    store.cache.put('other', 1)
+    assert store.cache.get(('everything', (0,), ()))[0] is False
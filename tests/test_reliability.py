@@ -0,0 +1,73 @@
+"""
+Reliability: MTBF, MTTR and repeat failures against a fixture worked out by hand
+"""
+
+import pandas as pd
+import pytest
+
+from data_store import DataStore
+from reliability import (failure_events, mean_time_between_failures, mean_time_to_repair, reliability_report,
+                         repeat_failures)
+
+def _fixture():
+    day = pd.Timestamp
+    df_wo = pd.DataFrame({
+        'ID': [1, 2, 3, 4, 5, 6, 7],
+        'Vehicle_Number': ['V1', 'V1', 'V1', 'V2', 'V2', 'V3', 'V4'],
+        'Workshop_Name': ['Workshop Alpha', 'Workshop Alpha', 'Workshop Beta', 'Workshop Beta', 'Workshop Beta',
+                          'Workshop Alpha', 'Workshop Alpha'],
+        'Malfunction_Date': [day('2024-01-01'), day('2024-01-11'), day('2024-02-10'), day('2024-01-05'),
+                             day('2024-03-05'), day('2024-01-01'), None],
+        'MNG_Work_Order_Creation_Date': [day('2024-01-01'), day('2024-01-11'), day('2024-02-10'), day('2024-01-05'),
+                                         day('2024-03-05'), day('2024-01-01'), day('2024-01-01')],
+        'Work_Order_Completion_Date': [day('2024-01-03'), day('2024-01-15'), None, day('2024-01-06'),
+                                       day('2024-03-11'), day('2024-01-08'), day('2024-01-02')],
+        'Work_Order_Status': ['Completed', 'Completed', 'Open', 'Completed', 'Completed', 'Completed', 'Completed'],
+    })
+    df_malfunction = pd.DataFrame({
+        'Work_Order_ID': [1, 2, 3, 4, 5, 6, 7],
+        'Malfunction_Code': ['C1', 'C1', 'C2', 'C2', 'C2', 'C1', 'C1'],
+    })
+    df_catalogue = pd.DataFrame({
+        'Malfunction_Code': ['C1', 'C2'],
+        'System': ['HVAC', 'Engine'],
+        'Component': ['Compressor', 'Pump'],
+        'Failure_Mode': ['Seizure', 'Leak'],
+    })
+    return df_wo, df_malfunction, df_catalogue
+
+def _rows(df):
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+def test_mtbf_and_mttr_by_hand():
+    events = failure_events(*_fixture())
+    # Work order 7 has no malfunction date
+    assert sorted(events['ID']) == [1, 2, 3, 4, 5, 6]
+
+    # V1 fails on days 0, 10 and 40: gaps 10 and 30; V2 once after 60 days; V3 only once
+    assert _rows(mean_time_between_failures(events, 'Vehicle_Number')) == [('V1', 3, 20.0), ('V2', 2, 60.0)]
+    # Gaps per component stay on one vehicle: the compressor 10 days on V1, the pump 60 days on V2
+    assert _rows(mean_time_between_failures(events, 'Component')) == [('Compressor', 3, 10.0), ('Pump', 3, 60.0)]
+    # Alpha repairs take 2, 4 and 7 days; Beta 1 and 6 (work order 3 is still open)
+    assert _rows(mean_time_to_repair(events, 'Workshop_Name')) == [
+        ('Workshop Alpha', 3, pytest.approx(13 / 3)), ('Workshop Beta', 2, 3.5)]
+    assert _rows(mean_time_to_repair(events, 'Failure_Mode')) == [
+        ('Seizure', 3, pytest.approx(13 / 3)), ('Leak', 2, 3.5)]
+
+def test_repeat_failures_by_hand():
+    repeats = repeat_failures(failure_events(*_fixture()), window_days=30)
+
+    assert _rows(repeats[['ID', 'Previous_Work_Order_ID', 'Days_Since_Previous']]) == [(2, 1, 10.0)]
+    assert len(repeat_failures(failure_events(*_fixture()), window_days=60)) == 2
+
+def test_report_fleet_figures(tables):
+    tables['work_orders'], tables['malfunction'], tables['failure_catalogue'] = _fixture()
+    report = reliability_report(DataStore(tables))
+
+    assert report['failures'] == 6
+    # Gaps 10, 30 and 60 days; repairs 2, 4, 7, 1 and 6 days
+    assert report['fleet_mtbf'] == pytest.approx(100 / 3)
+    assert report['fleet_mttr'] == pytest.approx(4.0)
+
+    alpha = reliability_report(DataStore(tables), workshop='Workshop Alpha')
+    assert alpha['failures'] == 3 and alpha['fleet_mtbf'] == pytest.approx(10.0)
@@ -0,0 +1,44 @@
+"""
+Work order search: Arabic folding and diacritics, codes by prefix, index kept current by writes
+"""
+
+from search import SearchIndex, normalize, search_index, search_work_orders, tokenize
+
+def test_arabic_variants_normalize_alike():
+    assert normalize('الضَّاغِط') == normalize('الضاغط')
+    assert normalize('أعطال') == normalize('اعطال') == normalize('إعطال')
+    assert normalize('مكيّف') == normalize('مكيف')
+    assert normalize('فـــلتر') == normalize('فلتر')
+    assert normalize('صيانة') == normalize('صيانه')
+    assert normalize('VEH-٠١٢') == normalize('veh-012')
+    assert tokenize('المضخة') == tokenize('مضخة')
+
+def test_arabic_search_ignores_diacritics_and_letter_variants(store):
+    store.update('malfunction', 1, {'Description_Arabic': 'انحشار ميكانيكي للضاغط في المكيّف'})
+    wo_id = store.get('malfunction', 1)['Work_Order_ID']
+
+    for query in ['ميكانيكي', 'مِيكَانِيكِي', 'المكيف', 'مكيف', 'ميكانيكي مكيف', 'ميكا']:
+        assert wo_id in search_work_orders(store, query), query
+    assert wo_id not in search_work_orders(store, 'ميكانيكي هيدروليك')
+
+def test_codes_match_by_prefix_in_any_digits(store):
+    wo = store.get('work_orders', 1)
+    number = wo['AIC_Work_Order_Number']
+    arabic_digits = number.translate(str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩'))
+
+    assert 1 in search_work_orders(store, number.lower())
+    assert 1 in search_work_orders(store, arabic_digits)
+    assert 1 in search_work_orders(store, number[:-1])
+
+def test_incremental_index_matches_a_rebuild(store):
+    index = search_index(store)
+    old_vehicle = store.get('work_orders', 2)['Vehicle_Number']
+
+    store.update('work_orders', 2, {'Comments': 'تسريب زيت من المحرّك'})
+    store.update('malfunction', 3, {'Description_Arabic': 'عطل في نظام التبريد'})
+    store.update('work_orders', 2, {'Vehicle_Number': store.get('work_orders', 5)['Vehicle_Number']})
+
+    rebuilt = SearchIndex(store)
+    for query in ['زيت', 'المحرك', 'التبريد', 'تبريد عطل', old_vehicle, store.get('work_orders', 5)['Vehicle_Number'],
+                  store.get('work_orders', 2)['AIC_Work_Order_Number'], 'Fuel System']:
+        assert index.search(query).tolist() == rebuilt.search(query).tolist(), query
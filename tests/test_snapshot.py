@@ -0,0 +1,76 @@
+"""
+Snapshots: every table comes back with its declared dtypes
+"""
+
+import pandas as pd
+import pytest
+
+from analytics import DASHBOARD_COLUMNS, recent_work_orders, work_order_counters, work_order_trends
+from data_store import DataStore, load_store
+from schema import SCHEMAS, apply_schema
+from snapshot import load_tables, read_manifest, save_tables
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_round_trip_keeps_declared_dtypes(tables, tmp_path, fmt):
+    path = str(tmp_path / 'snapshot')
+    # An empty table and an all-missing column still have their declared types
+    assert len(tables['audit_log']) == 0
+    tables['work_orders']['Work_Order_Completion_Date'] = pd.NaT
+
+    save_tables(tables, path, format=fmt)
+    loaded = load_tables(path)
+
+    assert read_manifest(path)['format'] == fmt
+    assert list(loaded) == list(tables)
+    for name, df in tables.items():
+        expected = apply_schema(name, df.reset_index(drop=True))
+        for col in SCHEMAS.get(name, {}):
+            if col in expected.columns:
+                assert loaded[name][col].dtype == expected[col].dtype, (name, col)
+        pd.testing.assert_frame_equal(loaded[name], expected, check_categorical=False)
+
+def test_store_round_trip(store, tmp_path):
+    path = str(tmp_path / 'snapshot')
+    save_tables({name: store.table(name) for name in store.table_names()}, path)
+
+    restored = DataStore(load_tables(path))
+    for name in store.table_names():
+        pd.testing.assert_frame_equal(restored.table(name), store.table(name), check_categorical=False)
+
+def test_failed_save_keeps_the_previous_snapshot(tables, tmp_path):
+    path = str(tmp_path / 'snapshot')
+    save_tables(tables, path)
+    broken = dict(tables, work_orders=tables['work_orders'].assign(ID='not a number'))
+
+    with pytest.raises(Exception):
+        save_tables(broken, path)
+
+    assert load_tables(path)['work_orders']['ID'].tolist() == tables['work_orders']['ID'].tolist()
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_projected_load_reads_only_those_columns(tables, tmp_path, fmt):
+    path = str(tmp_path / 'snapshot')
+    save_tables(tables, path, format=fmt)
+
+    loaded = load_tables(path, {'work_orders': ['ID', 'Work_Order_Status']})
+
+    assert list(loaded['work_orders'].columns) == ['ID', 'Work_Order_Status']
+    assert list(loaded['user'].columns) == list(tables['user'].columns)
+
+def test_dashboard_store_matches_the_full_store(store, tmp_path):
+    path = str(tmp_path / 'snapshot')
+    save_tables({name: store.table(name) for name in store.table_names()}, path)
+
+    dashboard = load_store(snapshot=path, columns=DASHBOARD_COLUMNS)
+
+    assert dashboard.read_only
+    assert set(dashboard.table('work_orders').columns) < set(store.table('work_orders').columns)
+    for by in ['Work_Order_Status', 'Workshop_Name']:
+        pd.testing.assert_series_equal(work_order_counters(dashboard).counts(by),
+                                       work_order_counters(store).counts(by))
+    pd.testing.assert_frame_equal(work_order_trends(dashboard, '2024-01-01', '2024-12-31'),
+                                  work_order_trends(store, '2024-01-01', '2024-12-31'))
+    pd.testing.assert_frame_equal(recent_work_orders(dashboard), recent_work_orders(store),
+                                  check_categorical=False)
+    with pytest.raises(PermissionError):
+        dashboard.update('work_orders', 1, {'Work_Order_Status': 'Completed'})
@@ -0,0 +1,70 @@
+"""
+Validated writes: rejected records and batches leave the store untouched
+"""
+
+import pytest
+
+from services import ValidationFailed, create_work_orders, insert_records, update_records
+
+def _work_order(store):
+    wo = store.table('work_orders').iloc[0]
+    code = store.table('failure_catalogue')['Malfunction_Code'].iloc[0]
+    work_order = {
+        'Employee_ID': int(wo['Employee_ID']),
+        'Workshop_Name': wo['Workshop_Name'],
+        'Vehicle_Number': wo['Vehicle_Number'],
+        'AlKhorayef_Reception_Date': '2026-01-02',
+        'Malfunction_Date': '2026-01-02',
+    }
+    return work_order, {'Malfunction_Code': code}
+
+def _sizes(store):
+    return {name: len(store.table(name)) for name in ('work_orders', 'malfunction')}
+
+def test_rejected_batch_writes_nothing(store):
+    good = _work_order(store)
+    bad_vehicle = (dict(good[0], Vehicle_Number='NO-SUCH-VEHICLE'), good[1])
+    bad_code = (good[0], {'Malfunction_Code': 'NO-SUCH-CODE'})
+    before = _sizes(store)
+
+    with pytest.raises(ValidationFailed) as e:
+        create_work_orders(store, [good, bad_vehicle, bad_code], all_or_nothing=True)
+
+    assert sorted(e.value.errors) == [1, 2]
+    assert ('Vehicle_Number', "No vehicle with Vehicle_Number 'NO-SUCH-VEHICLE'") in e.value.errors[1]
+    assert any(field == 'malfunction.Malfunction_Code' for field, _ in e.value.errors[2])
+    assert _sizes(store) == before
+
+def test_partial_batch_writes_only_valid_records(store):
+    good = _work_order(store)
+    bad_date = (dict(good[0], Malfunction_Date='not a date'), good[1])
+    before = _sizes(store)
+
+    created, errors = create_work_orders(store, [bad_date, good])
+
+    assert list(created) == [1] and list(errors) == [0]
+    assert errors[0][0][0] == 'Malfunction_Date'
+    assert _sizes(store) == {name: n + 1 for name, n in before.items()}
+    malfunction = store.get('malfunction', created[1]['ID'], key_col='Work_Order_ID')
+    assert malfunction['Malfunction_Code'] == good[1]['Malfunction_Code']
+
+def test_rejected_update_batch_changes_nothing(store):
+    ids = store.table('work_orders')['ID'].head(2).tolist()
+    before = [store.get('work_orders', key) for key in ids]
+
+    with pytest.raises(ValidationFailed) as e:
+        update_records(store, 'work_orders', {ids[0]: {'Comments': 'ok'}, ids[1]: {'Work_Order_Status': 'Lost'}})
+
+    assert list(e.value.errors) == [ids[1]]
+    assert [store.get('work_orders', key) for key in ids] == before
+
+def test_dangling_reference_is_rejected(store):
+    part_id = int(store.table('part')['ID'].iloc[0])
+    missing = int(store.table('work_orders')['ID'].max()) + 100
+
+    created, errors = insert_records(store, 'supply_request', [
+        {'Work_Order_ID': missing, 'Part_ID': part_id, 'Quantity_Requested': 1, 'Status': 'Pending'},
+    ])
+
+    assert created == {}
+    assert errors[0] == [('Work_Order_ID', f"No work_orders with ID {missing}")]